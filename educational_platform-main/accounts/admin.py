@@ -4,12 +4,15 @@ from .models import (
     CustomUser,
     UserProfile,
     UserToken,
+    TokenLedgerEntry,
     Course,
+    Tag,
     CourseTopic,
     Lesson,
     LessonContent,
     PurchasedLesson,
     LessonProgress,
+    OpenAnswerAttempt,
 )
 
 # Регистрируем кастомную модель пользователя с настройками отображения
@@ -49,15 +52,39 @@ class UserTokenAdmin(admin.ModelAdmin):
     list_display = ("user", "balance")
     search_fields = ("user__email",)
 
+# Журнал операций с токенами — только для просмотра
+@admin.register(TokenLedgerEntry)
+class TokenLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ("user", "amount", "balance_after", "reason", "created_at")
+    list_filter = ("reason",)
+    search_fields = ("user__email",)
+    raw_id_fields = ("user", "lesson")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 
 # Регистрируем курсы
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
     list_display = ('title', 'subject', 'level', 'editor', 'is_draft', 'is_approved')
     list_filter = ('subject', 'level', 'is_draft', 'is_approved')
-    search_fields = ('title', 'description', 'tags')
+    search_fields = ('title', 'description', '=tag_objects__slug')
     ordering = ('title',)
 
+# Регистрируем теги
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug')
+    search_fields = ('^slug',)
+    ordering = ('slug',)
+
 # Регистрируем темы курса
 @admin.register(CourseTopic)
 class CourseTopicAdmin(admin.ModelAdmin):
@@ -104,7 +131,15 @@ class PurchasedLessonAdmin(admin.ModelAdmin):
 
 @admin.register(LessonProgress)
 class LessonProgressAdmin(admin.ModelAdmin):
-    list_display = ('user', 'lesson', 'total_score', 'is_completed', 'last_accessed')
+    list_display = ('user', 'lesson', 'completed_count', 'total_blocks', 'total_score', 'is_completed', 'last_accessed')
     list_filter = ('is_completed', 'last_accessed')
     search_fields = ('user__email', 'lesson__title')
     raw_id_fields = ('user', 'lesson')
+
+
+@admin.register(OpenAnswerAttempt)
+class OpenAnswerAttemptAdmin(admin.ModelAdmin):
+    list_display = ('user', 'content', 'attempt_number', 'status', 'total_score', 'created_at', 'graded_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('user__email', 'content__open_title')
+    raw_id_fields = ('user', 'content', 'graded_by')
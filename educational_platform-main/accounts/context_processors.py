@@ -0,0 +1,8 @@
+from django.utils.functional import SimpleLazyObject
+
+from .services.entitlements import get_entitlements
+
+
+def entitlements(request):
+    """Купленные уроки в шаблонах: {% if lesson.id in entitlements %}."""
+    return {'entitlements': SimpleLazyObject(lambda: get_entitlements(request))}
@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from accounts.services.uploads import cleanup_stale_uploads
+
+
+class Command(BaseCommand):
+    help = 'Удаляет брошенные загрузки PDF частями и их временные файлы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help='Сколько часов загрузка может простаивать')
+
+    def handle(self, *args, **options):
+        count = cleanup_stale_uploads(timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(f'Удалено загрузок: {count}'))
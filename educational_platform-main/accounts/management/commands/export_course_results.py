@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Course
+from accounts.services.export import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, export_lines
+
+
+class Command(BaseCommand):
+    help = 'Выгружает ответы, попытки и прогресс учеников курса в CSV или JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_id', type=int)
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--output', help='Файл для записи; по умолчанию stdout')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if not Course.objects.filter(id=options['course_id']).exists():
+            raise CommandError(f'Курс {options["course_id"]} не найден')
+
+        lines = export_lines(options['course_id'], options['format'], chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
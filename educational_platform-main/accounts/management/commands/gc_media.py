@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from accounts.services.media import adopt_legacy_files, collect_garbage
+
+
+class Command(BaseCommand):
+    help = 'Удаляет файлы блоков, копии картинок и превью PDF, на которые не осталось ссылок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=int, default=24,
+                            help='Не трогать файлы моложе этого возраста')
+        parser.add_argument('--adopt-legacy', action='store_true',
+                            help='Сначала перенести старые файлы из lesson_pdfs/, task_images/, open_answers/ в blobs/')
+        parser.add_argument('--dry-run', action='store_true', help='Только показать, что будет сделано')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        prefix = 'Будет: ' if dry_run else ''
+        if options['adopt_legacy']:
+            updated, removed = adopt_legacy_files(dry_run=dry_run)
+            self.stdout.write(f'{prefix}переписано ссылок: {updated}, удалено старых файлов: {removed}')
+        count, freed = collect_garbage(options['grace_hours'] * 60 * 60, dry_run=dry_run)
+        self.stdout.write(self.style.SUCCESS(f'{prefix}удалено файлов: {count}, {freed / 1024 / 1024:.1f} МБ'))
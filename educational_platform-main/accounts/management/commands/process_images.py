@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from accounts.services.images import pending_image_contents, process_content_images
+
+
+class Command(BaseCommand):
+    help = 'Строит недостающие копии картинок блоков (например, после перезапуска с очередью в памяти)'
+
+    def handle(self, *args, **options):
+        processed = failed = 0
+        for content_id in pending_image_contents():
+            try:
+                process_content_images(content_id)
+                processed += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f'Блок {content_id}: {e}')
+        self.stdout.write(self.style.SUCCESS(f'Обработано блоков: {processed}, с ошибками: {failed}'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from accounts.services.pdf_preview import pending_pdf_contents, process_pdf_preview
+
+
+class Command(BaseCommand):
+    help = 'Строит недостающие превью и текст страниц PDF-блоков (например, после перезапуска с очередью в памяти)'
+
+    def handle(self, *args, **options):
+        processed = failed = 0
+        for content_id in pending_pdf_contents():
+            try:
+                if process_pdf_preview(content_id):
+                    processed += 1
+                else:
+                    failed += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f'Блок {content_id}: {e}')
+        self.stdout.write(self.style.SUCCESS(f'Обработано блоков: {processed}, с ошибками: {failed}'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from accounts.services.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Полностью перестраивает поисковый индекс курсов, уроков и блоков'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        total = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Проиндексировано документов: {total}'))
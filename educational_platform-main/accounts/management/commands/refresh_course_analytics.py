@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from accounts.services.analytics import refresh_analytics
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводки аналитики курсов по данным с последнего запуска'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Пересчитать все уроки и блоки')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        lessons, blocks = refresh_analytics(full=options['full'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Обновлено уроков: {lessons}, блоков: {blocks}'))
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.20 on 2026-10-18 08:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_tokenpurchase_delete_openquestionanswer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Изменение баланса')),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Баланс после операции')),
+                ('reason', models.CharField(choices=[('token_purchase', 'Покупка токенов'), ('lesson_purchase', 'Покупка урока')], max_length=20, verbose_name='Операция')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата операции')),
+                ('lesson', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='accounts.lesson', verbose_name='Урок')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='token_ledger', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Операция с токенами',
+                'verbose_name_plural': 'Операции с токенами',
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+    ]
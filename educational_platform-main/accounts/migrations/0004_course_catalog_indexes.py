@@ -0,0 +1,29 @@
+# Generated by Django 4.2.20 on 2026-10-18 08:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_tokenledgerentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['subject', 'level', 'id'], name='course_subject_level_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['level', 'id'], name='course_level_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['is_draft', 'is_approved', 'id'], name='course_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['editor', 'id'], name='course_editor_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.20 on 2026-10-18 08:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_course_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Тег')),
+                ('slug', models.CharField(max_length=255, unique=True, verbose_name='Нормализованный тег')),
+            ],
+            options={
+                'verbose_name': 'Тег',
+                'verbose_name_plural': 'Теги',
+                'ordering': ['slug'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CourseTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_tags', to='accounts.course')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_tags', to='accounts.tag')),
+            ],
+            options={
+                'ordering': ['position'],
+            },
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='tag_objects',
+            field=models.ManyToManyField(blank=True, related_name='courses', through='accounts.CourseTag', to='accounts.tag'),
+        ),
+        migrations.AddIndex(
+            model_name='coursetag',
+            index=models.Index(fields=['tag', 'course'], name='coursetag_tag_course_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='coursetag',
+            constraint=models.UniqueConstraint(fields=('course', 'tag'), name='unique_course_tag'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+def normalize(name):
+    return ' '.join(name.split()).casefold()
+
+
+def populate_course_tags(apps, schema_editor):
+    Course = apps.get_model('accounts', 'Course')
+    Tag = apps.get_model('accounts', 'Tag')
+    CourseTag = apps.get_model('accounts', 'CourseTag')
+
+    tag_ids = {}
+    links = []
+    for course_id, raw in Course.objects.values_list('id', 'tags').iterator():
+        seen = set()
+        for name in (raw or '').split(','):
+            name = ' '.join(name.split())
+            slug = normalize(name)
+            if not slug or slug in seen:
+                continue
+            seen.add(slug)
+            if slug not in tag_ids:
+                tag_ids[slug] = Tag.objects.create(slug=slug, name=name).id
+            links.append(CourseTag(course_id=course_id, tag_id=tag_ids[slug], position=len(seen) - 1))
+    CourseTag.objects.bulk_create(links, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_course_tags'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_course_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE accounts_search_fts USING fts5(
+        title_stems, body_stems,
+        content='accounts_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER accounts_search_fts_ai AFTER INSERT ON accounts_searchdocument BEGIN
+        INSERT INTO accounts_search_fts(rowid, title_stems, body_stems)
+        VALUES (new.id, new.title_stems, new.body_stems);
+    END
+    """,
+    """
+    CREATE TRIGGER accounts_search_fts_ad AFTER DELETE ON accounts_searchdocument BEGIN
+        INSERT INTO accounts_search_fts(accounts_search_fts, rowid, title_stems, body_stems)
+        VALUES ('delete', old.id, old.title_stems, old.body_stems);
+    END
+    """,
+    """
+    CREATE TRIGGER accounts_search_fts_au AFTER UPDATE ON accounts_searchdocument BEGIN
+        INSERT INTO accounts_search_fts(accounts_search_fts, rowid, title_stems, body_stems)
+        VALUES ('delete', old.id, old.title_stems, old.body_stems);
+        INSERT INTO accounts_search_fts(rowid, title_stems, body_stems)
+        VALUES (new.id, new.title_stems, new.body_stems);
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS accounts_search_fts_au",
+    "DROP TRIGGER IF EXISTS accounts_search_fts_ad",
+    "DROP TRIGGER IF EXISTS accounts_search_fts_ai",
+    "DROP TABLE IF EXISTS accounts_search_fts",
+]
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE accounts_searchdocument ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(body, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX accounts_searchdocument_vector_idx ON accounts_searchdocument USING GIN (search_vector)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS accounts_searchdocument_vector_idx",
+    "ALTER TABLE accounts_searchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        for sql in statements.get(vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+    """
+    Полнотекстовый индекс зависит от СУБД: FTS5 в SQLite, tsvector в Postgres.
+    Для остальных баз поиск работает через icontains без отдельного индекса.
+    Внимание: при пересоздании таблицы accounts_searchdocument в SQLite
+    (ALTER в будущих миграциях) триггеры нужно создать заново.
+    """
+
+    dependencies = [
+        ('accounts', '0007_searchdocument'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
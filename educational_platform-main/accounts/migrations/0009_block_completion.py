@@ -0,0 +1,68 @@
+# Generated by Django 4.2.20 on 2026-10-18 08:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def migrate_completed_blocks(apps, schema_editor):
+    LessonProgress = apps.get_model('accounts', 'LessonProgress')
+    LessonContent = apps.get_model('accounts', 'LessonContent')
+    BlockCompletion = apps.get_model('accounts', 'BlockCompletion')
+
+    for progress in LessonProgress.objects.iterator():
+        lesson_blocks = set(LessonContent.objects.filter(lesson_id=progress.lesson_id).values_list('id', flat=True))
+        completed = set()
+        for block_id in progress.completed_blocks or []:
+            try:
+                block_id = int(block_id)
+            except (TypeError, ValueError):
+                continue
+            if block_id in lesson_blocks:
+                completed.add(block_id)
+        BlockCompletion.objects.bulk_create([
+            BlockCompletion(user_id=progress.user_id, lesson_id=progress.lesson_id, content_id=block_id)
+            for block_id in completed
+        ], ignore_conflicts=True)
+        LessonProgress.objects.filter(pk=progress.pk).update(
+            completed_count=len(completed),
+            total_blocks=len(lesson_blocks),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_search_index_backend'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonprogress',
+            name='completed_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Пройдено блоков'),
+        ),
+        migrations.AddField(
+            model_name='lessonprogress',
+            name='total_blocks',
+            field=models.PositiveIntegerField(default=0, verbose_name='Всего блоков'),
+        ),
+        migrations.CreateModel(
+            name='BlockCompletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_at', models.DateTimeField(auto_now_add=True)),
+                ('content', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='completions', to='accounts.lessoncontent')),
+                ('lesson', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.lesson')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='block_completions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'lesson'], name='blockcompletion_user_lesson')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='blockcompletion',
+            constraint=models.UniqueConstraint(fields=('user', 'content'), name='unique_block_completion'),
+        ),
+        migrations.RunPython(migrate_completed_blocks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-18 08:30
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_block_completion'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='lessonprogress',
+            name='completed_blocks',
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.20 on 2026-10-18 08:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def number_attempts(apps, schema_editor):
+    """Нумерует старые попытки по времени; уже оценённые помечает проверенными."""
+    OpenAnswerAttempt = apps.get_model('accounts', 'OpenAnswerAttempt')
+
+    numbers = {}
+    changed = []
+    for attempt in OpenAnswerAttempt.objects.order_by('created_at', 'id').iterator():
+        key = (attempt.user_id, attempt.content_id)
+        numbers[key] = numbers.get(key, 0) + 1
+        attempt.attempt_number = numbers[key]
+        if attempt.scores:
+            attempt.status = 'graded'
+        changed.append(attempt)
+    OpenAnswerAttempt.objects.bulk_update(changed, ['attempt_number', 'status'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_remove_lessonprogress_completed_blocks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='openanswerattempt',
+            name='attempt_number',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='openanswerattempt',
+            name='graded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='openanswerattempt',
+            name='graded_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='openanswerattempt',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Ожидает проверки'), ('graded', 'Проверен')], default='pending', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='openanswerattempt',
+            name='scores',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name='openanswerattempt',
+            name='total_score',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(number_attempts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='openanswerattempt',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='openattempt_status_created'),
+        ),
+        migrations.AddConstraint(
+            model_name='openanswerattempt',
+            constraint=models.UniqueConstraint(fields=('user', 'content', 'attempt_number'), name='unique_open_answer_attempt'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.20 on 2026-10-18 08:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_open_answer_grading_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BlockStats',
+            fields=[
+                ('content', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='accounts.lessoncontent')),
+                ('answers', models.PositiveIntegerField(default=0, verbose_name='Ответов')),
+                ('checked', models.PositiveIntegerField(default=0, verbose_name='Проверено')),
+                ('correct', models.PositiveIntegerField(default=0, verbose_name='Верных')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LessonStats',
+            fields=[
+                ('lesson', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='accounts.lesson')),
+                ('purchases', models.PositiveIntegerField(default=0, verbose_name='Покупок')),
+                ('learners', models.PositiveIntegerField(default=0, verbose_name='Начали урок')),
+                ('completed', models.PositiveIntegerField(default=0, verbose_name='Прошли все блоки')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='lessonprogress',
+            index=models.Index(fields=['last_accessed'], name='lessonprogress_last_accessed'),
+        ),
+        migrations.AddIndex(
+            model_name='purchasedlesson',
+            index=models.Index(fields=['purchased_at'], name='purchasedlesson_purchased_at'),
+        ),
+        migrations.AddIndex(
+            model_name='useranswer',
+            index=models.Index(fields=['updated_at'], name='useranswer_updated_at'),
+        ),
+        migrations.AddField(
+            model_name='lessonstats',
+            name='course',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lesson_stats', to='accounts.course'),
+        ),
+        migrations.AddField(
+            model_name='lessonstats',
+            name='topic',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.coursetopic'),
+        ),
+        migrations.AddField(
+            model_name='blockstats',
+            name='course',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='block_stats', to='accounts.course'),
+        ),
+        migrations.AddField(
+            model_name='blockstats',
+            name='lesson',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.lesson'),
+        ),
+    ]
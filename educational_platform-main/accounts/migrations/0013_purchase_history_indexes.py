@@ -0,0 +1,21 @@
+# Generated by Django 4.2.20 on 2026-10-18 08:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_course_analytics'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchasedlesson',
+            index=models.Index(fields=['user', '-purchased_at', '-id'], name='purchasedlesson_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tokenpurchase',
+            index=models.Index(fields=['user', '-purchased_at', '-id'], name='tokenpurchase_user_date_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-18 08:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_purchase_history_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessoncontent',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.20 on 2026-10-18 08:48
+
+import accounts.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_chunkedupload'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lessoncontent',
+            name='open_image',
+            field=models.ImageField(blank=True, max_length=255, null=True, storage=accounts.storage.get_content_storage, upload_to='open_answers/'),
+        ),
+        migrations.AlterField(
+            model_name='lessoncontent',
+            name='pdf_file',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=accounts.storage.get_content_storage, upload_to='lesson_pdfs/'),
+        ),
+        migrations.AlterField(
+            model_name='lessoncontent',
+            name='task_image',
+            field=models.ImageField(blank=True, help_text='Загрузите изображение для задачи', max_length=255, null=True, storage=accounts.storage.get_content_storage, upload_to='task_images/'),
+        ),
+    ]
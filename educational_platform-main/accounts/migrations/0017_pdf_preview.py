@@ -0,0 +1,35 @@
+# Generated by Django 4.2.20 on 2026-10-18 08:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_content_addressed_media'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessoncontent',
+            name='pdf_preview',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.CreateModel(
+            name='LessonPdfPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('text', models.TextField(blank=True)),
+                ('content', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pdf_pages', to='accounts.lessoncontent')),
+            ],
+            options={
+                'ordering': ['content', 'number'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='lessonpdfpage',
+            constraint=models.UniqueConstraint(fields=('content', 'number'), name='unique_pdf_page'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+ANSWERABLE_TYPES = ('quiz', 'task', 'open')
+
+
+def count_answerable_blocks(apps, schema_editor):
+    """Пересчитывает счётчики прогресса по блокам, на которые отвечают."""
+    LessonProgress = apps.get_model('accounts', 'LessonProgress')
+    LessonContent = apps.get_model('accounts', 'LessonContent')
+    BlockCompletion = apps.get_model('accounts', 'BlockCompletion')
+
+    total = LessonContent.objects.filter(
+        lesson_id=OuterRef('lesson_id'), content_type__in=ANSWERABLE_TYPES
+    ).order_by().values('lesson_id').annotate(total=Count('id')).values('total')
+    completed = BlockCompletion.objects.filter(
+        user_id=OuterRef('user_id'), lesson_id=OuterRef('lesson_id'), content__content_type__in=ANSWERABLE_TYPES
+    ).order_by().values('lesson_id').annotate(total=Count('id')).values('total')
+    LessonProgress.objects.update(
+        total_blocks=Coalesce(Subquery(total), 0),
+        completed_count=Coalesce(Subquery(completed), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0017_pdf_preview'),
+    ]
+
+    operations = [
+        migrations.RunPython(count_answerable_blocks, migrations.RunPython.noop),
+    ]
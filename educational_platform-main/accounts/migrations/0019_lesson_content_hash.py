@@ -0,0 +1,23 @@
+# Generated by Django 4.2.20 on 2026-10-18 09:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0018_count_answerable_blocks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='content_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+from django.db.models import F, Q
+
+
+def fill_is_completed(apps, schema_editor):
+    """is_completed раньше не обновлялся: выставляем его по счётчикам."""
+    LessonProgress = apps.get_model('accounts', 'LessonProgress')
+
+    completed = Q(total_blocks__gt=0, completed_count__gte=F('total_blocks'))
+    LessonProgress.objects.filter(completed).update(is_completed=True)
+    LessonProgress.objects.exclude(completed).update(is_completed=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_lesson_content_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_is_completed, migrations.RunPython.noop),
+    ]
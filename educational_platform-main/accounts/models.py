@@ -1,9 +1,18 @@
-from django.db import models
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import IntegrityError, models, transaction
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.db.models.signals import post_save
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.db.models import JSONField
+from django.db.models import Count, ExpressionWrapper, F, JSONField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .storage import get_content_storage
 
 # --------------------------------------
 # 👤 Кастомная модель пользователя
@@ -107,6 +116,44 @@ class TokenPurchase(models.Model):
         verbose_name = "Покупка токенов"
         verbose_name_plural = "Покупки токенов"
         ordering = ['-purchased_at']
+        indexes = [
+            # История покупок пользователя страницами по курсору (purchased_at, id)
+            models.Index(fields=['user', '-purchased_at', '-id'], name='tokenpurchase_user_date_idx'),
+        ]
+
+# --------------------------------------
+# 📒 Журнал движения токенов (только добавление)
+# --------------------------------------
+class TokenLedgerEntry(models.Model):
+    REASON_CHOICES = [
+        ('token_purchase', 'Покупка токенов'),
+        ('lesson_purchase', 'Покупка урока'),
+    ]
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='token_ledger',
+        verbose_name="Пользователь"
+    )
+    amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Изменение баланса")
+    balance_after = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Баланс после операции")
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES, verbose_name="Операция")
+    lesson = models.ForeignKey(
+        'Lesson',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name="Урок"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата операции")
+
+    def __str__(self):
+        return f"{self.user.email}: {self.amount:+} ({self.get_reason_display()})"
+
+    class Meta:
+        verbose_name = "Операция с токенами"
+        verbose_name_plural = "Операции с токенами"
+        ordering = ['-created_at', '-id']
 
 # Существующие модели (без изменений)
 class Course(models.Model):
@@ -129,13 +176,59 @@ class Course(models.Model):
     description = models.TextField(blank=True, null=True)
     is_draft = models.BooleanField(default=True)
     is_approved = models.BooleanField(default=False)
+    # Нормализованные теги; заполняются из поля tags при сохранении курса
+    tag_objects = models.ManyToManyField('Tag', through='CourseTag', related_name='courses', blank=True)
 
     def tag_list(self):
+        # Если теги подгружены через prefetch_related('course_tags__tag'), строку не разбираем
+        prefetched = getattr(self, '_prefetched_objects_cache', {}).get('course_tags')
+        if prefetched is not None:
+            return [course_tag.tag.name for course_tag in prefetched]
         return [tag.strip() for tag in self.tags.split(',')]
 
     def __str__(self):
         return self.title
 
+    class Meta:
+        # Индексы под фильтры каталога с keyset-пагинацией по id
+        indexes = [
+            models.Index(fields=['subject', 'level', 'id'], name='course_subject_level_idx'),
+            models.Index(fields=['level', 'id'], name='course_level_idx'),
+            models.Index(fields=['is_draft', 'is_approved', 'id'], name='course_status_idx'),
+            models.Index(fields=['editor', 'id'], name='course_editor_idx'),
+        ]
+
+class Tag(models.Model):
+    name = models.CharField(max_length=255, verbose_name="Тег")
+    slug = models.CharField(max_length=255, unique=True, verbose_name="Нормализованный тег")
+
+    @staticmethod
+    def normalize(name):
+        return ' '.join(name.split()).casefold()
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = "Тег"
+        verbose_name_plural = "Теги"
+        ordering = ['slug']
+
+class CourseTag(models.Model):
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='course_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='course_tags')
+    position = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        ordering = ['position']
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'tag'], name='unique_course_tag'),
+        ]
+        # Фильтр каталога по тегу идёт от тега к курсам
+        indexes = [
+            models.Index(fields=['tag', 'course'], name='coursetag_tag_course_idx'),
+        ]
+
 class CourseTopic(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='topics')
     title = models.CharField(max_length=255)
@@ -152,6 +245,10 @@ class Lesson(models.Model):
     title = models.CharField(max_length=255)
     price_in_tokens = models.PositiveIntegerField()
     order = models.PositiveIntegerField(default=0)
+    # Хэш JSON урока с ответами и время, когда он последний раз изменился
+    # (services/lesson_payload.py): Last-Modified не зависит от воркера и сброса кэша
+    content_hash = models.CharField(max_length=64, blank=True)
+    content_updated_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['order']
@@ -174,13 +271,17 @@ class LessonContent(models.Model):
         ('task', 'Задача'),
         ('open', 'Открытый ответ'),
     ]
+    # Блоки, на которые отвечают: только они входят в прогресс урока
+    ANSWERABLE_TYPES = ('quiz', 'task', 'open')
     content_type = models.CharField(
         max_length=10,
         choices=CONTENT_TYPES
     )
     text = models.TextField(blank=True, null=True)
     pdf_title = models.CharField(max_length=255, blank=True, null=True)
-    pdf_file = models.FileField(upload_to='lesson_pdfs/', blank=True, null=True)
+    # Файлы блоков лежат в хранилище без дублей (accounts/storage.py); upload_to
+    # больше не определяет каталог, имя вида blobs/<ab>/<sha256>/<имя файла>
+    pdf_file = models.FileField(upload_to='lesson_pdfs/', storage=get_content_storage, max_length=255, blank=True, null=True)
     video_title = models.CharField(max_length=255, blank=True, null=True)
     video_url = models.URLField(blank=True, null=True)
     video_description = models.TextField(blank=True, null=True)
@@ -191,7 +292,7 @@ class LessonContent(models.Model):
     quiz_correct_answer = models.CharField(max_length=255, blank=True, null=True)
     task_title = models.CharField(max_length=255, blank=True, null=True)
     task_description = models.TextField(blank=True, null=True)
-    task_image = models.ImageField(upload_to='task_images/', blank=True, null=True, help_text="Загрузите изображение для задачи")
+    task_image = models.ImageField(upload_to='task_images/', storage=get_content_storage, max_length=255, blank=True, null=True, help_text="Загрузите изображение для задачи")
     task_image_description = models.TextField(blank=True, null=True)
     TASK_ANSWER_TYPES = [
         ('text', 'Текстовый'),
@@ -210,6 +311,8 @@ class LessonContent(models.Model):
     open_description = models.TextField(blank=True, null=True)
     open_image = models.ImageField(
         upload_to='open_answers/',
+        storage=get_content_storage,
+        max_length=255,
         blank=True,
         null=True
     )
@@ -222,6 +325,12 @@ class LessonContent(models.Model):
         default=1,
         help_text='Сколько раз пользователь может отправить ответ'
     )
+    # Уменьшенные копии task_image/open_image (services/images.py):
+    # {"task_image": {"source": ..., "webp": {"320": имя файла, ...}, "jpeg": {...}}}
+    image_renditions = models.JSONField(default=dict, blank=True)
+    # Превью PDF (services/pdf_preview.py): {"source": имя файла, "pages": 12,
+    # "thumbnail": имя картинки первой страницы или null}; текст страниц — в LessonPdfPage
+    pdf_preview = models.JSONField(default=dict, blank=True)
 
     class Meta:
         ordering = ['order']
@@ -229,14 +338,142 @@ class LessonContent(models.Model):
     def __str__(self):
         return f"{self.lesson.title} — {self.get_content_type_display()}"
 
+    def image_srcset(self, field, image_format='webp'):
+        """Строка для атрибута srcset: "url 320w, url 640w"."""
+        renditions = (self.image_renditions or {}).get(field, {})
+        if renditions.get('source') != getattr(self, field).name:
+            return ''
+        widths = sorted(renditions.get(image_format, {}).items(), key=lambda item: int(item[0]))
+        return ', '.join(f'{default_storage.url(name)} {width}w' for width, name in widths)
+
+    def _image_sources(self, field):
+        webp, jpeg = self.image_srcset(field, 'webp'), self.image_srcset(field, 'jpeg')
+        if not webp or not jpeg:
+            return None
+        # Запасной src — самая широкая JPEG-копия
+        largest = max(self.image_renditions[field]['jpeg'].items(), key=lambda item: int(item[0]))[1]
+        return {'webp': webp, 'jpeg': jpeg, 'src': default_storage.url(largest)}
+
+    @property
+    def task_image_sources(self):
+        return self._image_sources('task_image')
+
+    @property
+    def open_image_sources(self):
+        return self._image_sources('open_image')
+
+    @property
+    def pdf_preview_data(self):
+        """Число страниц и URL картинки первой страницы, если превью готово для текущего файла."""
+        preview = self.pdf_preview or {}
+        if not self.pdf_file or preview.get('source') != self.pdf_file.name or 'pages' not in preview:
+            return None
+        thumbnail = preview.get('thumbnail')
+        return {'pages': preview['pages'], 'thumbnail': default_storage.url(thumbnail) if thumbnail else None}
+
+
+class LessonPdfPage(models.Model):
+    """Текст одной страницы PDF-блока: попадает в поисковый документ блока."""
+    content = models.ForeignKey(LessonContent, on_delete=models.CASCADE, related_name='pdf_pages')
+    number = models.PositiveIntegerField()
+    text = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['content', 'number']
+        constraints = [
+            models.UniqueConstraint(fields=['content', 'number'], name='unique_pdf_page'),
+        ]
+
+    def __str__(self):
+        return f"{self.content_id}: стр. {self.number}"
+
+# --------------------------------------
+# 🔎 Документы поискового индекса
+# --------------------------------------
+class SearchDocument(models.Model):
+    """
+    Плоская копия индексируемого текста курса, урока или блока.
+    Полнотекстовый индекс строится поверх этой таблицы:
+    FTS5 в SQLite, tsvector + GIN в Postgres (см. миграцию search_index_backend).
+    """
+    KIND_CHOICES = [
+        ('course', 'Курс'),
+        ('lesson', 'Урок'),
+        ('content', 'Блок урока'),
+    ]
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='+')
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    content = models.ForeignKey(LessonContent, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    title = models.TextField(blank=True)
+    body = models.TextField(blank=True)
+    # Основы слов для SQLite FTS5, у которого нет русского стеммера
+    title_stems = models.TextField(blank=True)
+    body_stems = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_document'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.title}"
+
+class ChunkedUpload(models.Model):
+    """Загрузка файла частями; удаляется после завершения."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='+')
+    file_name = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    # Ожидаемый SHA-256 всего файла (hex), если клиент его прислал
+    sha256 = models.CharField(max_length=64, blank=True)
+    received = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.file_name}: {self.received}/{self.size}"
+
 class OpenAnswerAttempt(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Ожидает проверки'),
+        ('graded', 'Проверен'),
+    ]
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     content = models.ForeignKey(LessonContent, on_delete=models.CASCADE)
+    # Номер попытки: лимит open_max_attempts проверяется по последнему номеру, без COUNT
+    attempt_number = models.PositiveIntegerField(default=1)
     answer_text = models.TextField()
-    scores = JSONField()
-    total_score = models.IntegerField()
+    # Баллы по критериям open_criteria, в том же порядке
+    scores = JSONField(default=list)
+    total_score = models.IntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    graded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    graded_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'content', 'attempt_number'], name='unique_open_answer_attempt'),
+        ]
+        indexes = [
+            # Очередь проверки: непроверенные ответы в порядке поступления
+            models.Index(fields=['status', 'created_at', 'id'], name='openattempt_status_created'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.content_id} #{self.attempt_number}"
+
 class PurchasedLesson(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -248,6 +485,12 @@ class PurchasedLesson(models.Model):
 
     class Meta:
         unique_together = ('user', 'lesson')
+        indexes = [
+            # Инкрементальный пересчёт аналитики: покупки после отметки
+            models.Index(fields=['purchased_at'], name='purchasedlesson_purchased_at'),
+            # Купленные уроки пользователя страницами по курсору
+            models.Index(fields=['user', '-purchased_at', '-id'], name='purchasedlesson_user_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.lesson.title}"
@@ -268,29 +511,97 @@ class OpenQuestion(models.Model):
 class LessonProgress(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE)
-    completed_blocks = models.JSONField(default=list, help_text="Список ID завершенных блоков")
+    # Счётчики вместо подсчёта блоков на каждый ответ
+    completed_count = models.PositiveIntegerField(default=0, verbose_name="Пройдено блоков")
+    total_blocks = models.PositiveIntegerField(default=0, verbose_name="Всего блоков")
     total_score = models.IntegerField(default=0)
     is_completed = models.BooleanField(default=False)
     last_accessed = models.DateTimeField(auto_now=True)
 
+    # Значение is_completed по счётчикам: урок пройден, когда отмечены все блоки с ответом.
+    # Пишется отдельным UPDATE после счётчиков — в SET видны их старые значения
+    COMPLETED = ExpressionWrapper(
+        Q(total_blocks__gt=0, completed_count__gte=F('total_blocks')), output_field=models.BooleanField()
+    )
+
     class Meta:
         unique_together = ['user', 'lesson']
+        indexes = [
+            models.Index(fields=['last_accessed'], name='lessonprogress_last_accessed'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.lesson.title}"
 
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.total_blocks:
+            self.total_blocks = LessonContent.objects.filter(
+                lesson_id=self.lesson_id, content_type__in=LessonContent.ANSWERABLE_TYPES
+            ).count()
+        super().save(*args, **kwargs)
+
     def calculate_progress(self):
-        total_blocks = self.lesson.content_blocks.count()
-        if total_blocks == 0:
+        if not self.total_blocks:
             return 0
-        return round((len(self.completed_blocks) / total_blocks) * 100)
+        return min(100, round((self.completed_count / self.total_blocks) * 100))
 
     def update_progress(self, block_id):
-        if block_id not in self.completed_blocks:
-            self.completed_blocks.append(block_id)
-            self.save()
-            return True
-        return False
+        """
+        Отмечает блок пройденным одним INSERT в BlockCompletion.
+        Повторный вызов для того же блока ничего не меняет.
+        Вызывается только для блоков из LessonContent.ANSWERABLE_TYPES.
+        """
+        try:
+            with transaction.atomic():
+                BlockCompletion.objects.create(
+                    user_id=self.user_id,
+                    lesson_id=self.lesson_id,
+                    content_id=block_id
+                )
+        except IntegrityError:
+            return False
+        # update() не трогает auto_now, а по last_accessed пересчитывается аналитика
+        LessonProgress.objects.filter(pk=self.pk).update(
+            completed_count=F('completed_count') + 1,
+            last_accessed=timezone.now()
+        )
+        LessonProgress.objects.filter(pk=self.pk).update(is_completed=LessonProgress.COMPLETED)
+        self.completed_count += 1
+        self.is_completed = bool(self.total_blocks) and self.completed_count >= self.total_blocks
+        return True
+
+    @classmethod
+    def refresh_counters(cls, lesson_id):
+        """Пересчитывает счётчики урока после изменения набора блоков."""
+        completed = BlockCompletion.objects.filter(
+            user_id=OuterRef('user_id'),
+            lesson_id=lesson_id,
+            content__content_type__in=LessonContent.ANSWERABLE_TYPES
+        ).order_by().values('user_id').annotate(total=Count('id')).values('total')
+        cls.objects.filter(lesson_id=lesson_id).update(
+            total_blocks=LessonContent.objects.filter(
+                lesson_id=lesson_id, content_type__in=LessonContent.ANSWERABLE_TYPES
+            ).count(),
+            completed_count=Coalesce(Subquery(completed), 0),
+        )
+        cls.objects.filter(lesson_id=lesson_id).update(is_completed=cls.COMPLETED)
+
+class BlockCompletion(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='block_completions')
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='+')
+    content = models.ForeignKey(LessonContent, on_delete=models.CASCADE, related_name='completions')
+    completed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'content'], name='unique_block_completion'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'lesson'], name='blockcompletion_user_lesson'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.content_id}"
 
 class UserAnswer(models.Model):
     user = models.ForeignKey(
@@ -311,6 +622,194 @@ class UserAnswer(models.Model):
     class Meta:
         unique_together = ('user', 'content')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['updated_at'], name='useranswer_updated_at'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.content}"
+
+
+# --------------------------------------
+# 📊 Аналитика курсов (пересчитывается командой refresh_course_analytics)
+# --------------------------------------
+class LessonStats(models.Model):
+    lesson = models.OneToOneField(Lesson, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='lesson_stats')
+    topic = models.ForeignKey(CourseTopic, on_delete=models.CASCADE, related_name='+')
+    purchases = models.PositiveIntegerField(default=0, verbose_name="Покупок")
+    learners = models.PositiveIntegerField(default=0, verbose_name="Начали урок")
+    completed = models.PositiveIntegerField(default=0, verbose_name="Прошли все блоки")
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"{self.user.username} - {self.content}"
\ No newline at end of file
+        return f"{self.lesson_id}: {self.purchases} покупок"
+
+class BlockStats(models.Model):
+    content = models.OneToOneField(LessonContent, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='block_stats')
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='+')
+    answers = models.PositiveIntegerField(default=0, verbose_name="Ответов")
+    checked = models.PositiveIntegerField(default=0, verbose_name="Проверено")
+    correct = models.PositiveIntegerField(default=0, verbose_name="Верных")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.content_id}: {self.correct}/{self.checked}"
+
+class AnalyticsWatermark(models.Model):
+    """До какого момента исходные таблицы уже учтены в сводках."""
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+# --------------------------------------
+# 🔔 Сигналы: сброс кэша структуры курса
+# --------------------------------------
+# Внутри bulk_content_changes() удаление блоков, уроков и тем не сбрасывает кэш
+# и счётчики по одному разу на строку: вызывающий код делает это один раз сам
+_bulk_content_changes = ContextVar('bulk_content_changes', default=False)
+
+
+@contextmanager
+def bulk_content_changes():
+    token = _bulk_content_changes.set(True)
+    try:
+        yield
+    finally:
+        _bulk_content_changes.reset(token)
+
+
+def _outline_course_id(instance):
+    if isinstance(instance, Course):
+        return instance.pk
+    if isinstance(instance, CourseTopic):
+        return instance.course_id
+    if isinstance(instance, LessonContent):
+        if not LessonContent.lesson.is_cached(instance):
+            return Lesson.objects.filter(id=instance.lesson_id).values_list('topic__course_id', flat=True).first()
+        instance = instance.lesson
+    if Lesson.topic.is_cached(instance):
+        return instance.topic.course_id
+    return CourseTopic.objects.filter(id=instance.topic_id).values_list('course_id', flat=True).first()
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=CourseTopic)
+@receiver(post_delete, sender=CourseTopic)
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+@receiver(post_save, sender=LessonContent)
+@receiver(post_delete, sender=LessonContent)
+def invalidate_course_outline_cache(sender, instance, **kwargs):
+    from .services.outline import invalidate_course_outline
+
+    if _bulk_content_changes.get():
+        return
+    course_id = _outline_course_id(instance)
+    if course_id is not None:
+        invalidate_course_outline(course_id)
+
+
+# --------------------------------------
+# 🔔 Сигналы: сброс кэша купленных уроков
+# --------------------------------------
+@receiver(post_save, sender=PurchasedLesson)
+@receiver(post_delete, sender=PurchasedLesson)
+def invalidate_entitlements_cache(sender, instance, **kwargs):
+    from .services.entitlements import invalidate_entitlements
+
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_entitlements(user_id))
+
+
+# --------------------------------------
+# 🔔 Сигналы: сброс кэша баланса после коммита любого изменения UserToken
+# --------------------------------------
+@receiver(post_save, sender=UserToken)
+@receiver(post_delete, sender=UserToken)
+def invalidate_token_balance_cache(sender, instance, **kwargs):
+    from .services.tokens import invalidate_balance
+
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_balance(user_id))
+
+
+# --------------------------------------
+# 🔔 Сигналы: сброс кэша доступа к файлам блока
+# --------------------------------------
+# Кэш media_lessons хранится по имени файла. Старое имя заменённого файла
+# здесь неизвестно и остаётся в кэше до MEDIA_ACCESS_CACHE_TIMEOUT; редактор
+# уроков (save_lesson_content) сбрасывает и старые имена сам
+@receiver(post_save, sender=LessonContent)
+@receiver(post_delete, sender=LessonContent)
+def invalidate_media_access_cache(sender, instance, **kwargs):
+    from .services.media import content_media_names, invalidate_media_lessons
+
+    names = content_media_names(instance)
+    if names:
+        transaction.on_commit(lambda: invalidate_media_lessons(names))
+
+
+# --------------------------------------
+# 🔔 Сигналы: синхронизация тегов курса
+# --------------------------------------
+@receiver(post_save, sender=Course)
+def sync_course_tag_objects(sender, instance, **kwargs):
+    from .services.tags import sync_course_tags
+
+    sync_course_tags(instance)
+
+
+# --------------------------------------
+# 🔔 Сигналы: инкрементальная переиндексация поиска
+# --------------------------------------
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Lesson)
+@receiver(post_save, sender=LessonContent)
+def update_search_index(sender, instance, **kwargs):
+    from .services.search import index_objects
+
+    transaction.on_commit(lambda: index_objects([instance]))
+
+
+# --------------------------------------
+# 🔔 Сигналы: счётчики прогресса при изменении блоков урока
+# --------------------------------------
+@receiver(post_save, sender=LessonContent)
+@receiver(post_delete, sender=LessonContent)
+def refresh_lesson_progress_counters(sender, instance, **kwargs):
+    # Пересчёт и при правке блока: у него мог смениться content_type,
+    # а это один UPDATE по прогрессам урока
+    if _bulk_content_changes.get():
+        return
+    lesson_id = instance.lesson_id
+    transaction.on_commit(lambda: LessonProgress.refresh_counters(lesson_id))
+
+
+# --------------------------------------
+# 🔔 Сигналы: копии картинок блока в фоне
+# --------------------------------------
+@receiver(post_save, sender=LessonContent)
+def schedule_image_renditions(sender, instance, **kwargs):
+    from .services.images import enqueue_renditions, needs_renditions
+
+    if instance.content_type in ('task', 'open') and needs_renditions(instance):
+        content_id = instance.id
+        transaction.on_commit(lambda: enqueue_renditions([content_id]))
+
+
+# --------------------------------------
+# 🔔 Сигналы: превью и текст страниц PDF в фоне
+# --------------------------------------
+@receiver(post_save, sender=LessonContent)
+def schedule_pdf_preview(sender, instance, **kwargs):
+    from .services.pdf_preview import enqueue_pdf_previews, needs_pdf_preview
+
+    if needs_pdf_preview(instance):
+        content_id = instance.id
+        transaction.on_commit(lambda: enqueue_pdf_previews([content_id]))
@@ -0,0 +1,214 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from ..models import (
+    AnalyticsWatermark,
+    BlockStats,
+    Lesson,
+    LessonContent,
+    LessonProgress,
+    LessonStats,
+    PurchasedLesson,
+    UserAnswer,
+)
+
+
+# --------------------------------------
+# 📊 Сводки по курсам
+# --------------------------------------
+# Сводка по уроку или блоку всегда пересчитывается целиком одним GROUP BY,
+# а инкрементальность в том, что пересчитываются только уроки и блоки,
+# у которых после отметки появились покупки, прогресс или ответы.
+# Поэтому повторный пересчёт безопасен, а перезаписанный ответ
+# (UserAnswer обновляется, а не добавляется) не посчитается дважды.
+# Удалённые покупки и правки структуры урока по отметке не видны —
+# их подхватывает полный пересчёт (full=True).
+
+WATERMARK = 'course_analytics'
+# Перекрытие окна: строки, закоммиченные чуть позже своего времени, не потеряются
+WATERMARK_OVERLAP = timedelta(minutes=5)
+ANSWER_BLOCK_TYPES = ('quiz', 'task')
+
+
+def _batches(ids, size):
+    ids = sorted(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def refresh_lesson_stats(lesson_ids):
+    lessons = list(Lesson.objects.filter(id__in=lesson_ids).values_list('id', 'topic_id', 'topic__course_id'))
+    purchases = dict(
+        PurchasedLesson.objects.filter(lesson_id__in=lesson_ids).order_by()
+        .values('lesson_id').annotate(total=Count('id')).values_list('lesson_id', 'total')
+    )
+    progress = {
+        row['lesson_id']: row
+        for row in LessonProgress.objects.filter(lesson_id__in=lesson_ids).order_by()
+        .values('lesson_id').annotate(
+            learners=Count('id'),
+            completed=Count('id', filter=Q(total_blocks__gt=0, completed_count__gte=F('total_blocks'))),
+        )
+    }
+    LessonStats.objects.bulk_create(
+        [
+            LessonStats(
+                lesson_id=lesson_id,
+                topic_id=topic_id,
+                course_id=course_id,
+                purchases=purchases.get(lesson_id, 0),
+                learners=progress.get(lesson_id, {}).get('learners', 0),
+                completed=progress.get(lesson_id, {}).get('completed', 0),
+                updated_at=timezone.now(),
+            )
+            for lesson_id, topic_id, course_id in lessons
+        ],
+        update_conflicts=True,
+        unique_fields=['lesson'],
+        update_fields=['topic', 'course', 'purchases', 'learners', 'completed', 'updated_at'],
+    )
+    return len(lessons)
+
+
+def refresh_block_stats(content_ids):
+    blocks = list(
+        LessonContent.objects.filter(id__in=content_ids, content_type__in=ANSWER_BLOCK_TYPES)
+        .values_list('id', 'lesson_id', 'lesson__topic__course_id')
+    )
+    answers = {
+        row['content_id']: row
+        for row in UserAnswer.objects.filter(content_id__in=content_ids).order_by()
+        .values('content_id').annotate(
+            answers=Count('id'),
+            checked=Count('id', filter=Q(is_correct__isnull=False)),
+            correct=Count('id', filter=Q(is_correct=True)),
+        )
+    }
+    empty = {'answers': 0, 'checked': 0, 'correct': 0}
+    BlockStats.objects.bulk_create(
+        [
+            BlockStats(
+                content_id=content_id,
+                lesson_id=lesson_id,
+                course_id=course_id,
+                answers=answers.get(content_id, empty)['answers'],
+                checked=answers.get(content_id, empty)['checked'],
+                correct=answers.get(content_id, empty)['correct'],
+                updated_at=timezone.now(),
+            )
+            for content_id, lesson_id, course_id in blocks
+        ],
+        update_conflicts=True,
+        unique_fields=['content'],
+        update_fields=['lesson', 'course', 'answers', 'checked', 'correct', 'updated_at'],
+    )
+    return len(blocks)
+
+
+def refresh_analytics(full=False, batch_size=500):
+    """
+    Пересчитывает сводки с последней отметки (или все при full=True).
+    Возвращает (число уроков, число блоков).
+    """
+    started_at = timezone.now()
+    watermark = AnalyticsWatermark.objects.filter(name=WATERMARK).values_list('value', flat=True).first()
+
+    if full or watermark is None:
+        lesson_ids = set(Lesson.objects.values_list('id', flat=True))
+        content_ids = set(
+            LessonContent.objects.filter(content_type__in=ANSWER_BLOCK_TYPES).values_list('id', flat=True)
+        )
+    else:
+        since = watermark - WATERMARK_OVERLAP
+        lesson_ids = set(
+            PurchasedLesson.objects.filter(purchased_at__gte=since).order_by()
+            .values_list('lesson_id', flat=True).distinct()
+        )
+        lesson_ids |= set(
+            LessonProgress.objects.filter(last_accessed__gte=since).order_by()
+            .values_list('lesson_id', flat=True).distinct()
+        )
+        content_ids = set(
+            UserAnswer.objects.filter(updated_at__gte=since).order_by()
+            .values_list('content_id', flat=True).distinct()
+        )
+
+    lessons = blocks = 0
+    for batch in _batches(lesson_ids, batch_size):
+        with transaction.atomic():
+            lessons += refresh_lesson_stats(batch)
+    for batch in _batches(content_ids, batch_size):
+        with transaction.atomic():
+            blocks += refresh_block_stats(batch)
+
+    AnalyticsWatermark.objects.update_or_create(name=WATERMARK, defaults={'value': started_at})
+    return lessons, blocks
+
+
+# --------------------------------------
+# 📈 Чтение сводок
+# --------------------------------------
+def _rate(part, whole):
+    return round(part / whole * 100, 1) if whole else None
+
+
+def course_analytics(outline):
+    """
+    Сводка курса для дашборда: по урокам, темам и блокам.
+    outline — структура курса из get_course_outline (названия и порядок).
+    """
+    lesson_stats = {stats.lesson_id: stats for stats in LessonStats.objects.filter(course_id=outline.course_id)}
+    block_stats = BlockStats.objects.filter(course_id=outline.course_id).select_related('content').only(
+        'content_id', 'lesson_id', 'answers', 'checked', 'correct', 'updated_at',
+        'content__content_type', 'content__order',
+    ).order_by('lesson_id', 'content__order', 'content_id')
+
+    topics, lessons = [], []
+    for topic in outline.topics:
+        learners = completed = 0
+        for lesson in topic.lessons:
+            stats = lesson_stats.get(lesson.id)
+            purchases = stats.purchases if stats else 0
+            lesson_learners = stats.learners if stats else 0
+            lesson_completed = stats.completed if stats else 0
+            learners += lesson_learners
+            completed += lesson_completed
+            lessons.append({
+                'lesson_id': lesson.id,
+                'topic_id': topic.id,
+                'title': lesson.title,
+                'purchases': purchases,
+                'learners': lesson_learners,
+                'completed': lesson_completed,
+                'completion_rate': _rate(lesson_completed, lesson_learners),
+            })
+        topics.append({
+            'topic_id': topic.id,
+            'title': topic.title,
+            'learners': learners,
+            'completed': completed,
+            'completion_rate': _rate(completed, learners),
+        })
+
+    blocks = [
+        {
+            'block_id': stats.content_id,
+            'lesson_id': stats.lesson_id,
+            'block_type': stats.content.content_type,
+            'answers': stats.answers,
+            'checked': stats.checked,
+            'correct': stats.correct,
+            'accuracy': _rate(stats.correct, stats.checked),
+        }
+        for stats in block_stats
+    ]
+    updated = [stats.updated_at for stats in lesson_stats.values()]
+    return {
+        'topics': topics,
+        'lessons': lessons,
+        'blocks': blocks,
+        'updated_at': max(updated).isoformat() if updated else None,
+    }
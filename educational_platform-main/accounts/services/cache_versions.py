@@ -0,0 +1,28 @@
+import time
+
+from django.core.cache import cache
+
+
+# --------------------------------------
+# 🏷️ Версии ключей кэша
+# --------------------------------------
+# Запись кэшируется под текущей версией, а сброс поднимает версию, а не
+# удаляет запись. Загрузка, прочитавшая базу до изменения, положит результат
+# под старую версию, и его никто не прочитает; с простым delete она записала
+# бы устаревшее значение уже после сброса.
+
+def get_version(key):
+    """Текущая версия; если ключ вытеснен из кэша, начинаем с метки времени, чтобы не попасть на старые записи."""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    """Поднимает версию: все записи под предыдущей устаревают."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from educational_platform.db_router import primary_reads
+
+from ..models import PurchasedLesson
+from .cache_versions import bump_version, get_version
+
+
+# --------------------------------------
+# 🔑 Доступ пользователя к урокам
+# --------------------------------------
+class Entitlements:
+    """
+    Купленные пользователем уроки: lesson_id → course_id.
+    Проверки has_access и `lesson.id in entitlements` не ходят в базу.
+    """
+
+    def __init__(self, lesson_courses):
+        self._lesson_courses = lesson_courses
+
+    def has_access(self, lesson_id):
+        return lesson_id in self._lesson_courses
+
+    def __contains__(self, lesson_id):
+        return self.has_access(lesson_id)
+
+    def __len__(self):
+        return len(self._lesson_courses)
+
+    @property
+    def lesson_ids(self):
+        return frozenset(self._lesson_courses)
+
+    @property
+    def course_ids(self):
+        return sorted(set(self._lesson_courses.values()))
+
+
+# --------------------------------------
+# ⚡ Кэш купленных уроков с версионированием
+# --------------------------------------
+# Покупка поднимает версию (services/cache_versions.py), поэтому загрузка,
+# прочитавшая базу до покупки, не перезапишет её сброс.
+
+def _version_key(user_id):
+    return f'entitlements_version:{user_id}'
+
+
+def _load_lesson_courses(user_id):
+    with primary_reads():
+        return dict(
+            PurchasedLesson.objects.filter(user_id=user_id).values_list('lesson_id', 'lesson__topic__course_id')
+        )
+
+
+def load_entitlements(user):
+    """Один запрос на пользователя, дальше — из кэша до следующей покупки."""
+    if not user.is_authenticated:
+        return Entitlements({})
+    # Версия читается до базы: покупка после этого момента сделает запись ненужной
+    key = f'entitlements:{user.id}:v{get_version(_version_key(user.id))}'
+    lesson_courses = cache.get(key)
+    if lesson_courses is None:
+        lesson_courses = _load_lesson_courses(user.id)
+        cache.set(key, lesson_courses, timeout=settings.ENTITLEMENTS_CACHE_TIMEOUT)
+    return Entitlements(lesson_courses)
+
+
+def get_entitlements(request):
+    """Entitlements текущего пользователя, загружаются один раз за запрос."""
+    if not hasattr(request, '_entitlements'):
+        request._entitlements = load_entitlements(request.user)
+    return request._entitlements
+
+
+def invalidate_entitlements(user_id):
+    bump_version(_version_key(user_id))
@@ -0,0 +1,160 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from ..models import LessonContent, LessonProgress, OpenAnswerAttempt, UserAnswer
+
+
+# --------------------------------------
+# 📤 Выгрузка результатов учеников по курсу
+# --------------------------------------
+# Строки читаются через values_list().iterator(): без моделей в памяти,
+# порциями по chunk_size (на Postgres — серверным курсором), поэтому память
+# не зависит от числа ответов в курсе.
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+DEFAULT_CHUNK_SIZE = 2000
+
+FIELDS = [
+    'record',
+    'user_id',
+    'user_email',
+    'lesson_id',
+    'lesson_title',
+    'block_id',
+    'block_type',
+    'answer',
+    'is_correct',
+    'attempt',
+    'status',
+    'score',
+    'completed_count',
+    'total_blocks',
+    'progress',
+    'is_completed',
+    'updated_at',
+]
+
+
+def _record(record, **values):
+    row = dict.fromkeys(FIELDS)
+    row['record'] = record
+    row.update(values)
+    return row
+
+
+def export_rows(course_id, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Генератор словарей с полями FIELDS: ответы на quiz/task, попытки открытых
+    ответов и прогресс по урокам курса.
+    """
+    # Блоков в курсе немного — справочник держим целиком
+    blocks = {
+        block_id: (lesson_id, lesson_title, content_type)
+        for block_id, lesson_id, lesson_title, content_type in LessonContent.objects.filter(
+            lesson__topic__course_id=course_id
+        ).values_list('id', 'lesson_id', 'lesson__title', 'content_type').iterator(chunk_size=chunk_size)
+    }
+    lesson_titles = {lesson_id: title for lesson_id, title, _ in blocks.values()}
+
+    answers = UserAnswer.objects.filter(content__lesson__topic__course_id=course_id).order_by('id').values_list(
+        'user_id', 'user__email', 'content_id', 'answer', 'is_correct', 'updated_at'
+    )
+    for user_id, email, block_id, answer, is_correct, updated_at in answers.iterator(chunk_size=chunk_size):
+        lesson_id, lesson_title, block_type = blocks.get(block_id, (None, '', ''))
+        yield _record(
+            'answer',
+            user_id=user_id,
+            user_email=email,
+            lesson_id=lesson_id,
+            lesson_title=lesson_title,
+            block_id=block_id,
+            block_type=block_type,
+            answer=answer,
+            is_correct=is_correct,
+            updated_at=updated_at,
+        )
+
+    attempts = OpenAnswerAttempt.objects.filter(content__lesson__topic__course_id=course_id).order_by('id').values_list(
+        'user_id', 'user__email', 'content_id', 'answer_text', 'attempt_number', 'status', 'total_score', 'created_at'
+    )
+    for user_id, email, block_id, answer, attempt, status, score, created_at in attempts.iterator(chunk_size=chunk_size):
+        lesson_id, lesson_title, block_type = blocks.get(block_id, (None, '', ''))
+        yield _record(
+            'open_attempt',
+            user_id=user_id,
+            user_email=email,
+            lesson_id=lesson_id,
+            lesson_title=lesson_title,
+            block_id=block_id,
+            block_type=block_type,
+            answer=answer,
+            attempt=attempt,
+            status=status,
+            score=score if status == 'graded' else None,
+            updated_at=created_at,
+        )
+
+    progress = LessonProgress.objects.filter(lesson__topic__course_id=course_id).order_by('id').values_list(
+        'user_id', 'user__email', 'lesson_id', 'completed_count', 'total_blocks', 'total_score',
+        'is_completed', 'last_accessed'
+    )
+    for row in progress.iterator(chunk_size=chunk_size):
+        user_id, email, lesson_id, completed, total, score, is_completed, last_accessed = row
+        yield _record(
+            'progress',
+            user_id=user_id,
+            user_email=email,
+            lesson_id=lesson_id,
+            lesson_title=lesson_titles.get(lesson_id, ''),
+            score=score,
+            completed_count=completed,
+            total_blocks=total,
+            progress=min(100, round(completed / total * 100)) if total else 0,
+            is_completed=is_completed,
+            updated_at=last_accessed,
+        )
+
+
+# --------------------------------------
+# 🧾 Форматы
+# --------------------------------------
+class _Echo:
+    """Псевдофайл для csv.writer: writerow возвращает готовую строку."""
+
+    def write(self, value):
+        return value
+
+
+# Ячейки, которые табличные редакторы примут за формулу
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield '﻿' + writer.writerow(FIELDS)  # BOM: Excel иначе не узнаёт UTF-8
+    for row in rows:
+        yield writer.writerow([_csv_value(row[field]) for field in FIELDS])
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def export_lines(course_id, export_format='csv', chunk_size=DEFAULT_CHUNK_SIZE):
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Неизвестный формат: {export_format}')
+    rows = export_rows(course_id, chunk_size=chunk_size)
+    return csv_lines(rows) if export_format == 'csv' else jsonl_lines(rows)
@@ -0,0 +1,247 @@
+import ast
+import math
+import re
+from functools import lru_cache
+
+
+# --------------------------------------
+# ✅ Проверка ответов на сервере
+# --------------------------------------
+# Правильный ответ каждого блока разбирается один раз: проверяющая функция
+# кэшируется по (id блока, тип, правильный ответ), поэтому правка ответа
+# в редакторе автоматически даёт новую запись кэша.
+
+REL_TOLERANCE = 1e-6
+ABS_TOLERANCE = 1e-9
+MAX_EXPONENT = 100
+MAX_FORMULA_LENGTH = 200
+# Точки, в которых сравниваются формулы; для каждой переменной — свой сдвиг
+SAMPLE_POINTS = (0.37, 1.19, 2.71, -0.83, 3.3, 0.61)
+
+
+class FormulaError(ValueError):
+    pass
+
+
+def normalize_text(value):
+    value = ' '.join(str(value).replace('ё', 'е').replace('Ё', 'Е').split()).casefold()
+    return value.rstrip('.;')
+
+
+# --------------------------------------
+# 🧮 Безопасный разбор формул
+# --------------------------------------
+FUNCTIONS = {
+    'sin': math.sin,
+    'cos': math.cos,
+    'tan': math.tan,
+    'tg': math.tan,
+    'asin': math.asin,
+    'acos': math.acos,
+    'atan': math.atan,
+    'sqrt': math.sqrt,
+    'log': math.log,
+    'ln': math.log,
+    'exp': math.exp,
+    'abs': abs,
+}
+CONSTANTS = {'pi': math.pi, 'e': math.e}
+
+BINARY_OPERATORS = {
+    ast.Add: lambda a, b: a + b,
+    ast.Sub: lambda a, b: a - b,
+    ast.Mult: lambda a, b: a * b,
+    ast.Div: lambda a, b: a / b,
+}
+UNARY_OPERATORS = {
+    ast.UAdd: lambda a: a,
+    ast.USub: lambda a: -a,
+}
+
+IDENTIFIER = re.compile(r'[a-zA-Z_]+')
+IMPLICIT_MULTIPLICATION = [
+    (re.compile(r'(\d)\s*([a-zA-Z_(])'), r'\1*\2'),   # 2x, 2(x+1)
+    (re.compile(r'\)\s*([a-zA-Z_\d(])'), r')*\1'),    # (x+1)(x-1), (x)2
+]
+
+
+def _split_identifier(match):
+    # Переменные однобуквенные, как в школьной записи: xy → x*y
+    name = match.group(0)
+    if name.lower() in FUNCTIONS or name.lower() in CONSTANTS:
+        return name
+    return '*'.join(name)
+
+
+def _safe_pow(base, exponent):
+    if abs(exponent) > MAX_EXPONENT:
+        raise FormulaError('Слишком большая степень')
+    return base ** exponent
+
+
+def _compile_node(node, variables):
+    """Переводит проверенный AST в дерево замыканий f(values)."""
+    if isinstance(node, ast.Expression):
+        return _compile_node(node.body, variables)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        value = float(node.value)
+        return lambda values: value
+    if isinstance(node, ast.Name):
+        name = node.id.lower()
+        if name in CONSTANTS:
+            value = CONSTANTS[name]
+            return lambda values: value
+        if name in FUNCTIONS:
+            # sin без аргумента — не переменная
+            raise FormulaError('Функция без аргумента')
+        variables.add(name)
+        return lambda values: values[name]
+    if isinstance(node, ast.BinOp):
+        left = _compile_node(node.left, variables)
+        right = _compile_node(node.right, variables)
+        if isinstance(node.op, ast.Pow):
+            return lambda values: _safe_pow(left(values), right(values))
+        operator = BINARY_OPERATORS.get(type(node.op))
+        if operator is None:
+            raise FormulaError('Недопустимая операция')
+        return lambda values: operator(left(values), right(values))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+        operator = UNARY_OPERATORS[type(node.op)]
+        operand = _compile_node(node.operand, variables)
+        return lambda values: operator(operand(values))
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+            and node.func.id.lower() in FUNCTIONS and len(node.args) == 1 and not node.keywords):
+        function = FUNCTIONS[node.func.id.lower()]
+        argument = _compile_node(node.args[0], variables)
+        return lambda values: function(argument(values))
+    raise FormulaError('Недопустимое выражение')
+
+
+@lru_cache(maxsize=10000)
+def compile_formula(source):
+    """Строка → (функция от словаря переменных, множество переменных)."""
+    source = str(source).strip()
+    if not source or len(source) > MAX_FORMULA_LENGTH:
+        raise FormulaError('Пустая или слишком длинная формула')
+    source = source.replace('^', '**').replace(',', '.').replace('×', '*').replace('·', '*').replace('−', '-')
+    source = IDENTIFIER.sub(_split_identifier, source)
+    for pattern, replacement in IMPLICIT_MULTIPLICATION:
+        source = pattern.sub(replacement, source)
+    try:
+        tree = ast.parse(source, mode='eval')
+    except SyntaxError:
+        raise FormulaError('Не удалось разобрать формулу')
+    variables = set()
+    return _compile_node(tree, variables), frozenset(variables)
+
+
+def _close(a, b):
+    return math.isclose(a, b, rel_tol=REL_TOLERANCE, abs_tol=ABS_TOLERANCE)
+
+
+def _evaluate(function, values):
+    try:
+        result = function(values)
+    except (ArithmeticError, ValueError, TypeError):
+        return None
+    if isinstance(result, complex) or math.isnan(result) or math.isinf(result):
+        return None
+    return result
+
+
+def formulas_equivalent(expected, actual):
+    """Сравнивает формулы по значениям в наборе точек."""
+    expected_function, expected_variables = expected
+    actual_function, actual_variables = actual
+    if not actual_variables <= expected_variables:
+        return False
+    names = sorted(expected_variables)
+    checked = 0
+    for i, point in enumerate(SAMPLE_POINTS):
+        values = {name: point + 0.53 * (i + 1) * j for j, name in enumerate(names)}
+        a, b = _evaluate(expected_function, values), _evaluate(actual_function, values)
+        if a is None and b is None:
+            continue
+        if a is None or b is None or not _close(a, b):
+            return False
+        checked += 1
+    return checked >= 2 or (checked == 1 and not names)
+
+
+# --------------------------------------
+# 🔢 Числа
+# --------------------------------------
+TOLERANCE_SEPARATOR = re.compile(r'\s*(?:±|\+-|\+/-)\s*')
+
+
+def parse_number(value):
+    text = str(value).strip().replace(' ', '').replace(' ', '').replace(',', '.')
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    function, variables = compile_formula(text)
+    if variables:
+        raise FormulaError('В числовом ответе не должно быть переменных')
+    result = _evaluate(function, {})
+    if result is None:
+        raise FormulaError('Не удалось вычислить число')
+    return result
+
+
+def _number_checker(correct):
+    parts = TOLERANCE_SEPARATOR.split(str(correct), maxsplit=1)
+    expected = parse_number(parts[0])
+    tolerance = abs(parse_number(parts[1])) if len(parts) == 2 else None
+
+    def check(answer):
+        actual = parse_number(answer)
+        if tolerance is not None:
+            return abs(actual - expected) <= tolerance + ABS_TOLERANCE
+        return _close(actual, expected)
+    return check
+
+
+def _text_checker(correct):
+    expected = normalize_text(correct)
+    return lambda answer: normalize_text(answer) == expected
+
+
+def _formula_checker(correct):
+    expected = compile_formula(correct)
+    return lambda answer: formulas_equivalent(expected, compile_formula(answer))
+
+
+CHECKERS = {
+    'text': _text_checker,
+    'number': _number_checker,
+    'formula': _formula_checker,
+}
+
+
+@lru_cache(maxsize=10000)
+def _checker(content_id, answer_type, correct):
+    try:
+        return CHECKERS.get(answer_type, _text_checker)(correct)
+    except FormulaError:
+        # Некорректный правильный ответ в редакторе: сравниваем как текст
+        return _text_checker(correct)
+
+
+def grade(content, answer):
+    """
+    True/False для блоков quiz и task с заданным правильным ответом,
+    None — если проверять нечего. Некорректный ответ ученика считается неверным.
+    """
+    if content.content_type == 'quiz':
+        answer_type, correct = 'text', content.quiz_correct_answer
+    elif content.content_type == 'task':
+        answer_type, correct = content.task_answer_type or 'text', content.task_correct_answer
+    else:
+        return None
+    if not correct or answer is None:
+        return None
+    try:
+        return bool(_checker(content.id, answer_type, correct)(answer))
+    except FormulaError:
+        return False
@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from PIL import Image, ImageOps
+
+from ..models import LessonContent
+from ..storage import storage_name
+from .outline import invalidate_course_outline
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------------------------
+# 🖼️ Уменьшенные копии картинок заданий
+# --------------------------------------
+# Оригинал сохраняется как есть, а копии фиксированной ширины в WebP и JPEG
+# строятся в фоновом потоке после коммита. Имена копий зависят от хэша
+# исходного файла, ширины и качества, поэтому одинаковые загрузки
+# не пересчитываются и не дублируются в хранилище.
+
+IMAGE_FIELDS = ('task_image', 'open_image')
+RENDITION_FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PIPELINE_WORKERS,
+            thread_name_prefix='image-pipeline',
+        )
+    return _executor
+
+
+def _resize(image, width):
+    if image.width <= width:
+        return image
+    if settings.IMAGE_RESIZE_METHOD == 'resize':
+        # Честный LANCZOS по всему изображению: медленнее, чуть чётче
+        return image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+    # 'thumbnail': сначала грубое уменьшение в целое число раз, затем LANCZOS
+    resized = image.copy()
+    resized.thumbnail((width, image.height), Image.LANCZOS, reducing_gap=3.0)
+    return resized
+
+
+def _encode(image, image_format):
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        # У JPEG нет прозрачности: подкладываем белый фон
+        background = Image.new('RGB', image.size, 'white')
+        rgba = image.convert('RGBA')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=settings.IMAGE_QUALITY, optimize=image_format == 'JPEG')
+    return buffer.getvalue()
+
+
+def build_renditions(file):
+    """Строит копии для файла из ImageField и возвращает их описание."""
+    with default_storage.open(storage_name(file.name), 'rb') as source:
+        data = source.read()
+    digest = hashlib.sha256(data).hexdigest()
+
+    image = Image.open(BytesIO(data))
+    if settings.IMAGE_EXIF_ORIENTATION:
+        image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+
+    result = {'source': file.name, 'hash': digest, 'width': image.width, 'height': image.height}
+    for key in RENDITION_FORMATS:
+        result[key] = {}
+    # Шире оригинала не растягиваем: вместо больших ширин — одна копия в исходном размере
+    widths = sorted({min(width, image.width) for width in settings.IMAGE_RENDITION_WIDTHS})
+    for width in widths:
+        resized = None
+        for key, (image_format, extension) in RENDITION_FORMATS.items():
+            name = f'renditions/{digest[:2]}/{digest}/{width}w_q{settings.IMAGE_QUALITY}.{extension}'
+            if default_storage.exists(name):
+                # Свежая дата защищает копию от gc_media, пока ссылка на неё не сохранена
+                os.utime(default_storage.path(name))
+            else:
+                if resized is None:
+                    resized = _resize(image, width)
+                name = default_storage.save(name, ContentFile(_encode(resized, image_format)))
+            result[key][str(width)] = name
+    return result
+
+
+def needs_renditions(content):
+    renditions = content.image_renditions or {}
+    for field in IMAGE_FIELDS:
+        file = getattr(content, field)
+        source = renditions.get(field, {}).get('source')
+        if (file.name or None) != source:
+            return True
+    return False
+
+
+def process_content_images(content_id):
+    """Пересобирает копии блока, если картинки изменились. True — если что-то обновлено."""
+    content = LessonContent.objects.select_related('lesson__topic').filter(id=content_id).first()
+    if content is None or not needs_renditions(content):
+        return False
+
+    renditions = dict(content.image_renditions or {})
+    for field in IMAGE_FIELDS:
+        file = getattr(content, field)
+        if not file:
+            renditions.pop(field, None)
+        elif renditions.get(field, {}).get('source') != file.name:
+            try:
+                renditions[field] = build_renditions(file)
+            except Exception as e:
+                # Запоминаем ошибку, чтобы не открывать тот же файл при каждом сохранении
+                logger.exception('Не удалось построить копии картинки %s блока %s', field, content_id)
+                renditions[field] = {'source': file.name, 'error': str(e)[:200]}
+
+    # Только это поле: правки блока, сделанные пока шла обработка, не затираются
+    LessonContent.objects.filter(id=content_id).update(image_renditions=renditions)
+    invalidate_course_outline(content.lesson.topic.course_id)
+    return True
+
+
+def _run_job(content_id):
+    try:
+        process_content_images(content_id)
+    except Exception:
+        logger.exception('Не удалось обработать картинки блока %s', content_id)
+    finally:
+        # У потока свои соединения с базой — закрываем, чтобы не копились
+        connections.close_all()
+
+
+def enqueue_renditions(content_ids):
+    executor = _get_executor()
+    for content_id in content_ids:
+        executor.submit(_run_job, content_id)
+
+
+def pending_image_contents():
+    """Блоки с картинками, у которых копии отсутствуют или устарели."""
+    contents = LessonContent.objects.filter(content_type__in=('task', 'open')).only(
+        'id', 'task_image', 'open_image', 'image_renditions'
+    )
+    return [content.id for content in contents.iterator(chunk_size=500) if needs_renditions(content)]
+
+
+def enqueue_lesson_images(lesson_id):
+    contents = LessonContent.objects.filter(lesson_id=lesson_id, content_type__in=('task', 'open')).only(
+        'id', 'task_image', 'open_image', 'image_renditions'
+    )
+    enqueue_renditions([content.id for content in contents if needs_renditions(content)])
@@ -0,0 +1,127 @@
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from ..models import Lesson, LessonContent
+from .outline import cached_for_course
+
+
+# --------------------------------------
+# 📦 JSON-представление урока для плеера и редактора
+# --------------------------------------
+@dataclass(frozen=True)
+class LessonPayload:
+    body: bytes
+    etag: str
+    last_modified: datetime
+
+
+def _file_url(field):
+    return field.url if field else ''
+
+
+def serialize_block(content, include_answers=False):
+    data = {}
+    if content.content_type == 'text':
+        data = {'text': content.text or ''}
+    elif content.content_type == 'pdf':
+        data = {
+            'title': content.pdf_title or '',
+            'file': _file_url(content.pdf_file),
+            'preview': content.pdf_preview_data,
+        }
+    elif content.content_type == 'video':
+        data = {
+            'title': content.video_title or '',
+            'url': content.video_url or '',
+            'description': content.video_description or '',
+        }
+    elif content.content_type == 'quiz':
+        data = {
+            'title': content.quiz_title or '',
+            'question': content.quiz_question or '',
+            'options': content.quiz_options or [],
+            'explanation': content.quiz_explanation or '',
+        }
+        if include_answers:
+            data['correctAnswer'] = content.quiz_correct_answer or ''
+    elif content.content_type == 'task':
+        data = {
+            'title': content.task_title or '',
+            'description': content.task_description or '',
+            'image': _file_url(content.task_image),
+            'imageSources': content.task_image_sources,
+            'imageDescription': content.task_image_description or '',
+            'answerType': content.task_answer_type or '',
+            'hint': content.task_hint or '',
+        }
+        if include_answers:
+            data['correctAnswer'] = content.task_correct_answer or ''
+    elif content.content_type == 'open':
+        data = {
+            'title': content.open_title or '',
+            'description': content.open_description or '',
+            'image': _file_url(content.open_image),
+            'imageSources': content.open_image_sources,
+            'criteria': content.open_criteria or [],
+            'maxAttempts': content.open_max_attempts,
+        }
+    return {
+        'id': content.id,
+        'content_type': content.content_type,
+        'order': content.order,
+        'title': data.get('title', ''),
+        'data': data,
+    }
+
+
+def _serialize(lesson, contents, include_answers):
+    return json.dumps(
+        {
+            'success': True,
+            'lesson': {'id': lesson.id, 'title': lesson.title, 'topic_id': lesson.topic_id},
+            'content': [serialize_block(content, include_answers) for content in contents],
+        },
+        cls=DjangoJSONEncoder,
+        ensure_ascii=False,
+        sort_keys=True,
+    ).encode()
+
+
+def _content_updated_at(lesson_id, content_hash):
+    """
+    Время последнего изменения урока. Сдвигается, только когда меняется хэш
+    сохранённого содержимого, поэтому пересборка кэша в любом воркере
+    даёт тот же Last-Modified.
+    """
+    Lesson.objects.filter(id=lesson_id).exclude(content_hash=content_hash).update(
+        content_hash=content_hash,
+        content_updated_at=timezone.now().replace(microsecond=0),
+    )
+    return Lesson.objects.filter(id=lesson_id).values_list('content_updated_at', flat=True).get()
+
+
+def build_lesson_payload(lesson, include_answers=False):
+    contents = list(LessonContent.objects.filter(lesson=lesson).order_by('order', 'id'))
+    # Хэш урока считается по версии с ответами: правка ответа тоже изменение
+    full_body = _serialize(lesson, contents, include_answers=True)
+    body = full_body if include_answers else _serialize(lesson, contents, include_answers=False)
+    # Хэш зависит только от содержимого, поэтому ETag совпадает во всех воркерах
+    return LessonPayload(
+        body=body,
+        etag='"%s"' % hashlib.sha256(body).hexdigest(),
+        last_modified=_content_updated_at(lesson.id, hashlib.sha256(full_body).hexdigest()),
+    )
+
+
+def get_lesson_payload(lesson, include_answers=False):
+    """
+    Сериализованный урок из кэша; пересобирается, только когда меняется
+    структура курса. Урок должен быть загружен с select_related('topic').
+    """
+    name = f'lesson_payload:{lesson.id}:{"full" if include_answers else "learner"}'
+    return cached_for_course(lesson.topic.course_id, name, lambda: build_lesson_payload(lesson, include_answers))
@@ -0,0 +1,190 @@
+import os
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from ..models import LessonContent
+from ..storage import BLOB_DIR, content_storage, storage_name
+from .images import RENDITION_FORMATS
+from .outline import invalidate_course_outline
+
+
+# --------------------------------------
+# 🧹 Ссылки на файлы блоков и сборка мусора
+# --------------------------------------
+# Счётчик ссылок не хранится, а считается по LessonContent при каждом запуске:
+# так он не расходится с данными после правок в обход модели
+# (bulk_create/update в редакторе, удаления каскадом).
+# Кроме загруженных файлов (blobs/) собираются и производные: копии картинок
+# (renditions/, ссылки в image_renditions) и превью PDF (pdf_previews/).
+
+FILE_FIELDS = ('pdf_file', 'task_image', 'open_image')
+RENDITION_DIR = 'renditions'
+PDF_PREVIEW_DIR = 'pdf_previews'
+GC_DIRS = (BLOB_DIR, RENDITION_DIR, PDF_PREVIEW_DIR)
+
+
+def blob_references():
+    """Counter: имя файла в хранилище → сколько полей LessonContent на него ссылается."""
+    references = Counter()
+    rows = LessonContent.objects.values_list(*FILE_FIELDS).order_by()
+    for names in rows.iterator(chunk_size=2000):
+        for name in names:
+            if name:
+                references[storage_name(name)] += 1
+    return references
+
+
+def derived_references():
+    """Counter: имя копии картинки или превью PDF → сколько блоков на него ссылается."""
+    references = Counter()
+    rows = LessonContent.objects.values_list('image_renditions', 'pdf_preview').order_by()
+    for renditions, preview in rows.iterator(chunk_size=2000):
+        for rendition in (renditions or {}).values():
+            for image_format in RENDITION_FORMATS:
+                for name in rendition.get(image_format, {}).values():
+                    references[name] += 1
+        thumbnail = (preview or {}).get('thumbnail')
+        if thumbnail:
+            references[thumbnail] += 1
+    return references
+
+
+def _media_lessons_key(name):
+    return f'media_lessons:{name}'
+
+
+def media_lessons(name):
+    """
+    Множество (lesson_id, editor_id) уроков, блоки которых ссылаются на файл
+    name в хранилище: сам файл блока или превью PDF. По нему /media/ решает,
+    кому отдавать файл. Кэшируется на MEDIA_ACCESS_CACHE_TIMEOUT: файл по
+    хэшу может появиться в другом уроке, а проверять каждый запрос по базе дорого.
+    """
+    key = _media_lessons_key(name)
+    lessons = cache.get(key)
+    if lessons is None:
+        # Редактор сохраняет в поле URL (/media/...), а не имя — ищем обе формы
+        stored = [name, settings.MEDIA_URL + name, settings.MEDIA_URL.lstrip('/') + name]
+        condition = Q(pdf_preview__thumbnail=name) if name.startswith(PDF_PREVIEW_DIR + '/') else Q()
+        for field in FILE_FIELDS:
+            condition |= Q(**{f'{field}__in': stored})
+        lessons = set(
+            LessonContent.objects.filter(condition).values_list('lesson_id', 'lesson__topic__course__editor_id')
+        )
+        # Пустой результат не кэшируем: файл, только что загруженный в редакторе,
+        # сохраняется в блок следующим запросом и сразу должен открыться ученикам
+        if lessons:
+            cache.set(key, lessons, timeout=settings.MEDIA_ACCESS_CACHE_TIMEOUT)
+    return lessons
+
+
+def content_media_names(content):
+    """Файлы блока, доступ к которым решает media_lessons: поля с файлами и превью PDF."""
+    names = [storage_name(getattr(content, field).name) for field in FILE_FIELDS]
+    names.append((content.pdf_preview or {}).get('thumbnail'))
+    return {name for name in names if name}
+
+
+def invalidate_media_lessons(names):
+    keys = [_media_lessons_key(storage_name(name)) for name in names if name]
+    if keys:
+        cache.delete_many(keys)
+
+
+def _stored_files():
+    for directory_name in GC_DIRS:
+        root = content_storage.path(directory_name)
+        for directory, _, files in os.walk(root):
+            for file_name in files:
+                path = os.path.join(directory, file_name)
+                yield path, os.path.relpath(path, content_storage.location).replace(os.sep, '/')
+
+
+def collect_garbage(grace_seconds=24 * 60 * 60, dry_run=False):
+    """
+    Удаляет файлы из blobs/, renditions/ и pdf_previews/, на которые не ссылается
+    ни один блок. Файлы моложе grace_seconds не трогаются: ссылка на только что
+    загруженный файл или построенную копию могла ещё не сохраниться.
+    Возвращает (число файлов, освобождено байт).
+    """
+    references = blob_references() + derived_references()
+    deadline = time.time() - grace_seconds
+    removed = freed = 0
+    for path, name in _stored_files():
+        if name in references:
+            continue
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        if stat.st_mtime > deadline:
+            continue
+        removed += 1
+        freed += stat.st_size
+        if dry_run:
+            continue
+        os.remove(path)
+        try:
+            # Каталог хэша больше не нужен, если в нём ничего не осталось
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            pass
+    return removed, freed
+
+
+def adopt_legacy_files(dry_run=False):
+    """
+    Переносит файлы блоков, загруженные до хранилища без дублей
+    (lesson_pdfs/, task_images/, open_answers/), в blobs/ и переписывает ссылки.
+    Старые файлы удаляются, когда на них не остаётся ссылок.
+    Возвращает (число переписанных полей, число удалённых старых файлов).
+    """
+    contents = LessonContent.objects.select_related('lesson__topic').only(
+        'id', 'image_renditions', 'lesson__topic__course_id', *FILE_FIELDS
+    ).order_by('id')
+    adopted = {}
+    updated = 0
+    courses = set()
+    # Без iterator(): строки обновляются по ходу обхода
+    for content in contents:
+        changes = {}
+        renditions = dict(content.image_renditions or {})
+        for field in FILE_FIELDS:
+            old_name = storage_name(getattr(content, field).name)
+            if not old_name or old_name.startswith(BLOB_DIR + '/') or not content_storage.exists(old_name):
+                continue
+            if old_name not in adopted:
+                if dry_run:
+                    adopted[old_name] = old_name
+                else:
+                    max_length = LessonContent._meta.get_field(field).max_length
+                    with content_storage.open(old_name, 'rb') as file:
+                        adopted[old_name] = content_storage.save(old_name, file, max_length=max_length)
+            changes[field] = adopted[old_name]
+            if field in renditions:
+                # Содержимое то же, копии пересчитывать не нужно
+                renditions[field] = {**renditions[field], 'source': adopted[old_name]}
+        if not changes:
+            continue
+        updated += len(changes)
+        courses.add(content.lesson.topic.course_id)
+        if not dry_run:
+            LessonContent.objects.filter(id=content.id).update(image_renditions=renditions, **changes)
+            invalidate_media_lessons(changes.values())
+
+    if dry_run:
+        # Все ссылки на старые файлы были бы переписаны
+        return updated, len(adopted)
+    references = blob_references()
+    removed = 0
+    for old_name in adopted:
+        if old_name not in references:
+            content_storage.delete(old_name)
+            removed += 1
+    for course_id in courses:
+        invalidate_course_outline(course_id)
+    return updated, removed
@@ -0,0 +1,156 @@
+from django.core.exceptions import PermissionDenied
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from ..models import LessonProgress, OpenAnswerAttempt
+from .pagination import paginate_keyset
+from .progress import create_missing_progress
+
+
+class AttemptsExhausted(Exception):
+    pass
+
+
+class AttemptConflict(Exception):
+    """Номер попытки не удалось занять за SUBMIT_ATTEMPTS раз."""
+
+
+class GradingError(ValueError):
+    pass
+
+
+SUBMIT_ATTEMPTS = 3
+
+
+# --------------------------------------
+# ✍️ Отправка ответа
+# --------------------------------------
+def submit_open_answer(user, content, answer_text):
+    """
+    Создаёт очередную попытку. Лимит open_max_attempts проверяется по номеру
+    последней попытки (поиск по уникальному индексу), а уникальность
+    (user, content, attempt_number) не даёт параллельным запросам его обойти.
+    """
+    for _ in range(SUBMIT_ATTEMPTS):
+        last_number = (
+            OpenAnswerAttempt.objects.filter(user=user, content=content)
+            .order_by('-attempt_number').values_list('attempt_number', flat=True).first()
+        ) or 0
+        if last_number >= content.open_max_attempts:
+            raise AttemptsExhausted('Попытки закончились')
+        try:
+            with transaction.atomic():
+                return OpenAnswerAttempt.objects.create(
+                    user=user,
+                    content=content,
+                    attempt_number=last_number + 1,
+                    answer_text=answer_text,
+                )
+        except IntegrityError:
+            # Этот номер только что занял параллельный запрос — берём следующий.
+            # Другая ошибка целостности повторится и после нескольких попыток
+            continue
+    raise AttemptConflict('Не удалось сохранить ответ, попробуйте ещё раз')
+
+
+# --------------------------------------
+# 📥 Очередь проверки
+# --------------------------------------
+def pending_attempts(teacher):
+    """Непроверенные ответы по всем курсам редактора (суперпользователь видит все)."""
+    attempts = OpenAnswerAttempt.objects.filter(status='pending').select_related(
+        'user', 'content__lesson__topic__course'
+    )
+    if not teacher.is_superuser:
+        attempts = attempts.filter(content__lesson__topic__course__editor=teacher)
+    return attempts
+
+
+def grading_queue_page(teacher, cursor=None, page_size=20):
+    return paginate_keyset(pending_attempts(teacher), ['created_at', 'id'], cursor=cursor, page_size=page_size)
+
+
+# --------------------------------------
+# 💯 Выставление оценок
+# --------------------------------------
+def validate_scores(criteria, scores):
+    """Баллы — список целых по критериям open_criteria, каждый от 0 до максимума."""
+    criteria = criteria or []
+    if not isinstance(scores, list) or len(scores) != len(criteria):
+        raise GradingError(f'Нужно {len(criteria)} оценок — по одной на критерий')
+    for criterion, score in zip(criteria, scores):
+        if not isinstance(score, int) or isinstance(score, bool):
+            raise GradingError('Оценка должна быть целым числом')
+        max_points = int(criterion.get('points') or 0)
+        if not 0 <= score <= max_points:
+            raise GradingError(
+                f'Оценка {score} вне диапазона 0..{max_points} для критерия «{criterion.get("criterion", "")}»'
+            )
+    return scores
+
+
+def _recalculate_scores(pairs):
+    """
+    LessonProgress.total_score = сумма лучших проверенных попыток по открытым
+    блокам урока. Пересчёт для всех пар (user_id, lesson_id) сразу.
+    """
+    user_ids = {user_id for user_id, _ in pairs}
+    lesson_ids = {lesson_id for _, lesson_id in pairs}
+    best = (
+        OpenAnswerAttempt.objects.filter(
+            status='graded',
+            user_id__in=user_ids,
+            content__lesson_id__in=lesson_ids,
+        )
+        .order_by()
+        .values('user_id', 'content__lesson_id', 'content_id')
+        .annotate(best=Max('total_score'))
+    )
+    totals = dict.fromkeys(pairs, 0)
+    for row in best:
+        key = (row['user_id'], row['content__lesson_id'])
+        if key in totals:
+            totals[key] += row['best']
+
+    create_missing_progress(pairs)
+    progress = [
+        item for item in LessonProgress.objects.filter(user_id__in=user_ids, lesson_id__in=lesson_ids)
+        if (item.user_id, item.lesson_id) in totals
+    ]
+    for item in progress:
+        item.total_score = totals[(item.user_id, item.lesson_id)]
+    LessonProgress.objects.bulk_update(progress, ['total_score'])
+
+
+def grade_attempts(teacher, grades):
+    """
+    Выставляет оценки пачкой: grades = {attempt_id: [баллы по критериям]}.
+    Всё в одной транзакции: при любой ошибке не сохраняется ничего.
+    Возвращает список оценённых попыток.
+    """
+    with transaction.atomic():
+        attempts = (
+            OpenAnswerAttempt.objects.select_for_update(of=('self',))
+            .select_related('content__lesson__topic__course')
+            .in_bulk(grades.keys())
+        )
+        missing = grades.keys() - attempts.keys()
+        if missing:
+            raise OpenAnswerAttempt.DoesNotExist(f'Ответы не найдены: {sorted(missing)}')
+
+        now = timezone.now()
+        for attempt_id, attempt in attempts.items():
+            if not teacher.is_superuser and attempt.content.lesson.topic.course.editor_id != teacher.id:
+                raise PermissionDenied(f'Нет прав на проверку ответа {attempt_id}')
+            attempt.scores = validate_scores(attempt.content.open_criteria, grades[attempt_id])
+            attempt.total_score = sum(attempt.scores)
+            attempt.status = 'graded'
+            attempt.graded_by = teacher
+            attempt.graded_at = now
+
+        OpenAnswerAttempt.objects.bulk_update(
+            attempts.values(), ['scores', 'total_score', 'status', 'graded_by', 'graded_at']
+        )
+        _recalculate_scores({(attempt.user_id, attempt.content.lesson_id) for attempt in attempts.values()})
+    return list(attempts.values())
@@ -0,0 +1,157 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from educational_platform.db_router import primary_reads
+
+from ..models import Course, CourseTopic, Lesson, LessonContent
+from .cache_versions import bump_version, get_version
+
+
+# --------------------------------------
+# 🗂 Структура курса (курс → темы → уроки → блоки)
+# --------------------------------------
+@dataclass(frozen=True)
+class LessonOutline:
+    id: int
+    topic_id: int
+    title: str
+    price_in_tokens: int
+    order: int
+    contents: Tuple[LessonContent, ...] = ()
+
+
+@dataclass(frozen=True)
+class TopicOutline:
+    id: int
+    title: str
+    order: int
+    lessons: Tuple[LessonOutline, ...] = ()
+
+
+@dataclass(frozen=True)
+class CourseOutline:
+    """
+    Неизменяемое дерево курса для шаблонов.
+    Загружается целиком фиксированным числом запросов, поэтому
+    в шаблонах вместо topic.lessons.all используется topic.lessons.
+    """
+    course_id: int
+    topics: Tuple[TopicOutline, ...] = ()
+
+    @property
+    def lessons(self):
+        return tuple(lesson for topic in self.topics for lesson in topic.lessons)
+
+    @property
+    def lesson_count(self):
+        return sum(len(topic.lessons) for topic in self.topics)
+
+    @property
+    def first_lesson(self):
+        if self.topics and self.topics[0].lessons:
+            return self.topics[0].lessons[0]
+        return None
+
+    def get_lesson(self, lesson_id) -> Optional[LessonOutline]:
+        for lesson in self.lessons:
+            if lesson.id == lesson_id:
+                return lesson
+        return None
+
+
+def load_course_outline(course, with_contents=False):
+    """
+    Собирает CourseOutline за 2 запроса (темы, уроки)
+    и ещё один, если нужны блоки уроков (with_contents=True).
+    Принимает объект Course или его id.
+    """
+    course_id = course.id if isinstance(course, Course) else course
+
+    contents_by_lesson = defaultdict(list)
+    if with_contents:
+        contents = LessonContent.objects.filter(
+            lesson__topic__course_id=course_id
+        ).order_by('order', 'id')
+        for content in contents:
+            contents_by_lesson[content.lesson_id].append(content)
+
+    lessons_by_topic = defaultdict(list)
+    lesson_rows = Lesson.objects.filter(
+        topic__course_id=course_id
+    ).order_by('order', 'id').values_list('id', 'topic_id', 'title', 'price_in_tokens', 'order')
+    for lesson_id, topic_id, title, price, order in lesson_rows:
+        lessons_by_topic[topic_id].append(LessonOutline(
+            id=lesson_id,
+            topic_id=topic_id,
+            title=title,
+            price_in_tokens=price,
+            order=order,
+            contents=tuple(contents_by_lesson.get(lesson_id, ())),
+        ))
+
+    topic_rows = CourseTopic.objects.filter(
+        course_id=course_id
+    ).order_by('order', 'id').values_list('id', 'title', 'order')
+    topics = tuple(
+        TopicOutline(
+            id=topic_id,
+            title=title,
+            order=order,
+            lessons=tuple(lessons_by_topic.get(topic_id, ())),
+        )
+        for topic_id, title, order in topic_rows
+    )
+
+    return CourseOutline(course_id=course_id, topics=topics)
+
+
+# --------------------------------------
+# ⚡ Кэш структуры курса с версионированием
+# --------------------------------------
+def _version_key(course_id):
+    return f'course_outline_version:{course_id}'
+
+
+def get_outline_version(course_id):
+    """Текущая версия структуры курса."""
+    return get_version(_version_key(course_id))
+
+
+def invalidate_course_outline(course_id):
+    """Поднимает версию курса: все закэшированные записи по нему устаревают."""
+    bump_version(_version_key(course_id))
+
+
+def cached_for_course(course_id, name, loader):
+    """Значение из кэша под текущей версией курса; устаревает вместе со структурой."""
+    key = f'course_outline:{course_id}:v{get_outline_version(course_id)}:{name}'
+    value = cache.get(key)
+    if value is None:
+        # Из основной базы: отставшая реплика закэшировала бы старую структуру под новой версией
+        with primary_reads():
+            value = loader()
+        cache.set(key, value, timeout=settings.COURSE_OUTLINE_CACHE_TIMEOUT)
+    return value
+
+
+def get_course_outline(course, with_contents=False):
+    """Кэширующая обёртка над load_course_outline."""
+    course_id = course.id if isinstance(course, Course) else course
+    name = 'full' if with_contents else 'short'
+    return cached_for_course(course_id, name, lambda: load_course_outline(course_id, with_contents))
+
+
+def get_lesson_contents(lesson):
+    """
+    Блоки урока из кэша (версия общая с курсом).
+    Урок должен быть загружен вместе с темой: select_related('topic').
+    """
+    return cached_for_course(
+        lesson.topic.course_id,
+        f'lesson:{lesson.id}',
+        lambda: tuple(LessonContent.objects.filter(lesson=lesson).order_by('order', 'id')),
+    )
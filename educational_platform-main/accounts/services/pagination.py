@@ -0,0 +1,125 @@
+import base64
+import datetime
+import json
+from functools import reduce
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+# --------------------------------------
+# 📑 Keyset-пагинация (по курсору, без OFFSET)
+# --------------------------------------
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    """
+    Страница выдачи. Повторяет интерфейс django Page там, где это возможно
+    (итерация, has_next/has_previous), но вместо номеров страниц — курсоры.
+    """
+
+    def __init__(self, items, has_next, has_previous, next_cursor=None, previous_cursor=None):
+        self.object_list = items
+        self.has_next_page = has_next
+        self.has_previous_page = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.has_next_page
+
+    def has_previous(self):
+        return self.has_previous_page
+
+    def has_other_pages(self):
+        return self.has_next_page or self.has_previous_page
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder обрезает время до миллисекунд, а граница курсора должна быть точной
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _encode_cursor(values, direction):
+    payload = json.dumps({'v': values, 'd': direction}, cls=CursorEncoder)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(model, ordering, cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values, direction = payload['v'], payload['d']
+        if direction not in ('next', 'prev') or len(values) != len(ordering):
+            raise ValueError
+        values = [
+            model._meta.get_field(name.lstrip('-')).to_python(value)
+            for name, value in zip(ordering, values)
+        ]
+    except Exception:
+        raise InvalidCursor('Некорректный курсор')
+    return values, direction
+
+
+def _after(ordering, values):
+    """Q для строк, идущих строго после values в порядке ordering."""
+    conditions = []
+    for i, name in enumerate(ordering):
+        field = name.lstrip('-')
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        equal = {ordering[j].lstrip('-'): values[j] for j in range(i)}
+        conditions.append(Q(**equal, **{f'{field}__{lookup}': values[i]}))
+    return reduce(lambda a, b: a | b, conditions)
+
+
+def _reverse(ordering):
+    return [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+
+
+def _key(obj, ordering):
+    return [getattr(obj, name.lstrip('-')) for name in ordering]
+
+
+def paginate_keyset(queryset, ordering, cursor=None, page_size=20):
+    """
+    Возвращает KeysetPage. ordering должен однозначно задавать порядок
+    (последним полем — id), а под него должен быть индекс.
+    """
+    ordering = list(ordering)
+    if not cursor:
+        items = list(queryset.order_by(*ordering)[:page_size + 1])
+        has_next = len(items) > page_size
+        items = items[:page_size]
+        has_previous = False
+    else:
+        values, direction = _decode_cursor(queryset.model, ordering, cursor)
+        if direction == 'next':
+            items = list(queryset.filter(_after(ordering, values)).order_by(*ordering)[:page_size + 1])
+            has_next = len(items) > page_size
+            items = items[:page_size]
+            has_previous = True
+        else:
+            reverse = _reverse(ordering)
+            items = list(queryset.filter(_after(reverse, values)).order_by(*reverse)[:page_size + 1])
+            has_previous = len(items) > page_size
+            items = items[:page_size][::-1]
+            has_next = True
+
+    return KeysetPage(
+        items,
+        has_next=has_next,
+        has_previous=has_previous,
+        next_cursor=_encode_cursor(_key(items[-1], ordering), 'next') if has_next and items else None,
+        previous_cursor=_encode_cursor(_key(items[0], ordering), 'prev') if has_previous and items else None,
+    )
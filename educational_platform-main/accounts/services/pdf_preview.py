@@ -0,0 +1,186 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image
+from pypdf import PdfReader
+
+from ..models import LessonContent, LessonPdfPage
+from ..storage import content_storage, file_sha256, storage_name
+from .media import invalidate_media_lessons
+from .outline import invalidate_course_outline
+from .search import index_contents
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------------------------
+# 📄 Превью и текст страниц PDF
+# --------------------------------------
+# После сохранения PDF-блока в фоне считаются число страниц, текст каждой
+# страницы (для поиска) и картинка первой страницы для плеера.
+# pypdf написан на чистом Python и не рендерит страницы, поэтому картинка
+# первой страницы — это самое крупное изображение на ней (сканы, слайды
+# с иллюстрацией). Если картинок нет, плеер показывает начало текста.
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PDF_PREVIEW_WORKERS,
+            thread_name_prefix='pdf-preview',
+        )
+    return _executor
+
+
+def _page_text(page):
+    try:
+        text = page.extract_text() or ''
+    except Exception:
+        # Битый поток страницы не должен ронять весь документ
+        logger.warning('Не удалось извлечь текст страницы', exc_info=True)
+        return ''
+    # NUL не принимает Postgres
+    return text.replace('\x00', '').strip()[:settings.PDF_PAGE_TEXT_LIMIT]
+
+
+def _largest_image(page):
+    largest = None
+    try:
+        for image_file in page.images:
+            try:
+                image = image_file.image
+            except Exception:
+                continue
+            if largest is None or image.width * image.height > largest.width * largest.height:
+                largest = image
+    except Exception:
+        logger.warning('Не удалось прочитать картинки первой страницы', exc_info=True)
+    return largest
+
+
+def _build_thumbnail(page, digest):
+    width = settings.PDF_THUMBNAIL_WIDTH
+    name = f'pdf_previews/{digest[:2]}/{digest}/page1_{width}w_q{settings.IMAGE_QUALITY}.jpg'
+    if default_storage.exists(name):
+        # Свежая дата защищает превью от gc_media, пока ссылка на него не сохранена
+        os.utime(default_storage.path(name))
+        return name
+    image = _largest_image(page)
+    if image is None:
+        return None
+    image = image.convert('RGB')
+    image.thumbnail((width, width * 4), Image.LANCZOS)
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=settings.IMAGE_QUALITY, optimize=True)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def extract_pdf_preview(name, digest):
+    """Возвращает (превью для LessonContent.pdf_preview, список текстов страниц)."""
+    with content_storage.open(storage_name(name), 'rb') as file:
+        reader = PdfReader(file)
+        if reader.is_encrypted:
+            # Пустой пароль открывает PDF, защищённые только от печати и копирования
+            reader.decrypt('')
+        pages = reader.pages
+        texts = [_page_text(page) for page in pages[:settings.PDF_PREVIEW_MAX_PAGES]]
+        thumbnail = _build_thumbnail(pages[0], digest) if len(pages) else None
+    preview = {
+        'source': name,
+        'hash': digest,
+        'pages': len(pages),
+        'thumbnail': thumbnail,
+        'excerpt': texts[0][:300] if texts else '',
+    }
+    return preview, texts
+
+
+def _twin_preview(content_id, digest):
+    """Готовое превью того же файла у другого блока: PDF не нужно разбирать заново."""
+    twin = LessonContent.objects.filter(pdf_preview__hash=digest, pdf_preview__has_key='pages').exclude(
+        id=content_id
+    ).only('id', 'pdf_preview').first()
+    if twin is None:
+        return None
+    texts = list(LessonPdfPage.objects.filter(content_id=twin.id).order_by('number').values_list('text', flat=True))
+    return twin.pdf_preview, texts
+
+
+def needs_pdf_preview(content):
+    if content.content_type != 'pdf' or not content.pdf_file:
+        return False
+    return (content.pdf_preview or {}).get('source') != content.pdf_file.name
+
+
+def _save_preview(content_id, preview, texts):
+    with transaction.atomic():
+        LessonPdfPage.objects.filter(content_id=content_id).delete()
+        LessonPdfPage.objects.bulk_create(
+            [LessonPdfPage(content_id=content_id, number=number, text=text) for number, text in enumerate(texts, 1)],
+            batch_size=500,
+        )
+        # Только это поле: правки блока, сделанные пока шла обработка, не затираются
+        LessonContent.objects.filter(id=content_id).update(pdf_preview=preview)
+        # update() не отправляет сигналов: превью должно сразу открыться купившим урок
+        transaction.on_commit(lambda: invalidate_media_lessons([preview.get('thumbnail')]))
+
+
+def process_pdf_preview(content_id):
+    """Пересобирает превью блока, если файл изменился. True — если что-то обновлено."""
+    content = LessonContent.objects.select_related('lesson__topic').filter(id=content_id).first()
+    if content is None or not needs_pdf_preview(content):
+        return False
+
+    name = content.pdf_file.name
+    try:
+        with content_storage.open(storage_name(name), 'rb') as file:
+            digest = file_sha256(file)
+        preview, texts = _twin_preview(content_id, digest) or extract_pdf_preview(name, digest)
+    except Exception as e:
+        # Запоминаем ошибку, чтобы не разбирать тот же файл при каждом сохранении
+        logger.exception('Не удалось разобрать PDF блока %s', content_id)
+        LessonContent.objects.filter(id=content_id).update(pdf_preview={'source': name, 'error': str(e)[:200]})
+        return False
+
+    _save_preview(content_id, {**preview, 'source': name}, texts)
+    index_contents([content_id])
+    invalidate_course_outline(content.lesson.topic.course_id)
+    return True
+
+
+def _run_job(content_id):
+    try:
+        process_pdf_preview(content_id)
+    except Exception:
+        logger.exception('Не удалось обработать PDF блока %s', content_id)
+    finally:
+        # У потока свои соединения с базой — закрываем, чтобы не копились
+        connections.close_all()
+
+
+def enqueue_pdf_previews(content_ids):
+    executor = _get_executor()
+    for content_id in content_ids:
+        executor.submit(_run_job, content_id)
+
+
+def pending_pdf_contents():
+    """PDF-блоки, у которых превью отсутствует или устарело."""
+    contents = LessonContent.objects.filter(content_type='pdf').only('id', 'content_type', 'pdf_file', 'pdf_preview')
+    return [content.id for content in contents.iterator(chunk_size=500) if needs_pdf_preview(content)]
+
+
+def enqueue_lesson_pdfs(lesson_id):
+    contents = LessonContent.objects.filter(lesson_id=lesson_id, content_type='pdf').only(
+        'id', 'content_type', 'pdf_file', 'pdf_preview'
+    )
+    enqueue_pdf_previews([content.id for content in contents if needs_pdf_preview(content)])
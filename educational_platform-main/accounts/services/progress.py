@@ -0,0 +1,67 @@
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models import BlockCompletion, LessonContent, LessonProgress
+
+
+# --------------------------------------
+# 📈 Пакетная запись прогресса
+# --------------------------------------
+def create_missing_progress(pairs):
+    """
+    Создаёт недостающие LessonProgress для пар (user_id, lesson_id)
+    с уже посчитанным total_blocks.
+    """
+    user_ids = {user_id for user_id, _ in pairs}
+    lesson_ids = {lesson_id for _, lesson_id in pairs}
+    existing = set(
+        LessonProgress.objects.filter(user_id__in=user_ids, lesson_id__in=lesson_ids)
+        .values_list('user_id', 'lesson_id')
+    )
+    missing = set(pairs) - existing
+    if not missing:
+        return
+    totals = dict(
+        LessonContent.objects.filter(
+            lesson_id__in={lesson_id for _, lesson_id in missing}, content_type__in=LessonContent.ANSWERABLE_TYPES
+        ).order_by()
+        .values('lesson_id').annotate(total=Count('id')).values_list('lesson_id', 'total')
+    )
+    LessonProgress.objects.bulk_create([
+        LessonProgress(user_id=user_id, lesson_id=lesson_id, total_blocks=totals.get(lesson_id, 0))
+        for user_id, lesson_id in missing
+    ], ignore_conflicts=True)
+
+
+def record_completions(user, contents):
+    """
+    Отмечает блоки пройденными и возвращает {lesson_id: LessonProgress}.
+    Количество запросов не зависит от числа блоков: по одному на создание
+    недостающих прогрессов, вставку отметок, пересчёт счётчиков и is_completed.
+    """
+    lesson_ids = {content.lesson_id for content in contents}
+    if not lesson_ids:
+        return {}
+
+    create_missing_progress({(user.id, lesson_id) for lesson_id in lesson_ids})
+
+    BlockCompletion.objects.bulk_create([
+        BlockCompletion(user=user, lesson_id=content.lesson_id, content_id=content.id)
+        for content in contents
+    ], ignore_conflicts=True)
+
+    completed = BlockCompletion.objects.filter(
+        user=user,
+        lesson_id=OuterRef('lesson_id'),
+        content__content_type__in=LessonContent.ANSWERABLE_TYPES
+    ).order_by().values('lesson_id').annotate(total=Count('id')).values('total')
+    LessonProgress.objects.filter(user=user, lesson_id__in=lesson_ids).update(
+        completed_count=Coalesce(Subquery(completed), 0),
+        last_accessed=timezone.now(),
+    )
+    LessonProgress.objects.filter(user=user, lesson_id__in=lesson_ids).update(is_completed=LessonProgress.COMPLETED)
+    return {
+        progress.lesson_id: progress
+        for progress in LessonProgress.objects.filter(user=user, lesson_id__in=lesson_ids)
+    }
@@ -0,0 +1,94 @@
+import re
+from functools import lru_cache
+
+
+# --------------------------------------
+# 🇷🇺 Стеммер русского языка (алгоритм Snowball)
+# --------------------------------------
+# Postgres умеет стемминг сам (конфигурация 'russian'), а у SQLite FTS5
+# стеммера для русского нет, поэтому в индекс кладём уже нормализованные основы.
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = re.compile(r'(?:(?:ившись|ывшись|ивши|ывши|ив|ыв)|(?<=[ая])(?:вшись|вши|в))$')
+REFLEXIVE = re.compile(r'(?:ся|сь)$')
+ADJECTIVE = re.compile(
+    r'(?:ими|ыми|его|ого|ему|ому|ее|ие|ые|ое|ей|ий|ый|ой|ем|им|ым|ом|их|ых|ую|юю|ая|яя|ою|ею)$'
+)
+PARTICIPLE = re.compile(r'(?:(?:ивш|ывш|ующ)|(?<=[ая])(?:ем|нн|вш|ющ|щ))$')
+VERB = re.compile(
+    r'(?:(?:ейте|уйте|ила|ыла|ена|ите|или|ыли|ило|ыло|ено|ует|уют|ены|ить|ыть|ишь|ей|уй|ил|ыл|им|ым|ен|ят|ит|ыт|ую|ю)'
+    r'|(?<=[ая])(?:ете|йте|ешь|нно|ла|на|ли|ем|ло|но|ет|ют|ны|ть|й|л|н))$'
+)
+NOUN = re.compile(
+    r'(?:иями|ями|ами|ией|иям|ием|иях|ев|ов|ие|ье|еи|ии|ей|ой|ий|ям|ем|ам|ом|ах|ях|ию|ью|ия|ья|а|е|и|й|о|у|ы|ь|ю|я)$'
+)
+DERIVATIONAL = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'(?:ейше|ейш)$')
+
+WORD = re.compile(r'\w+')
+CYRILLIC = re.compile(r'[а-я]')
+
+
+def _region_start(word, start=0):
+    """Позиция после первой согласной, идущей за гласной (начиная со start)."""
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _strip(pattern, rv):
+    match = pattern.search(rv)
+    if match:
+        return rv[:match.start()], True
+    return rv, False
+
+
+@lru_cache(maxsize=50000)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    if not CYRILLIC.search(word):
+        return word
+
+    rv_start = next((i + 1 for i, ch in enumerate(word) if ch in VOWELS), len(word))
+    r2_start = _region_start(word, _region_start(word))
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    # Шаг 1
+    rv, found = _strip(PERFECTIVE_GERUND, rv)
+    if not found:
+        rv, _ = _strip(REFLEXIVE, rv)
+        rv, found = _strip(ADJECTIVE, rv)
+        if found:
+            rv, _ = _strip(PARTICIPLE, rv)
+        else:
+            rv, found = _strip(VERB, rv)
+            if not found:
+                rv, _ = _strip(NOUN, rv)
+
+    # Шаг 2
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    # Шаг 3: словообразовательный суффикс только в R2
+    match = DERIVATIONAL.search(rv)
+    if match and rv_start + match.start() >= r2_start:
+        rv = rv[:match.start()]
+
+    # Шаг 4
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    else:
+        rv, found = _strip(SUPERLATIVE, rv)
+        if found and rv.endswith('нн'):
+            rv = rv[:-1]
+        elif rv.endswith('ь'):
+            rv = rv[:-1]
+
+    return prefix + rv
+
+
+def stem_text(text):
+    """Текст → строка основ через пробел."""
+    return ' '.join(stem(token) for token in WORD.findall(text or ''))
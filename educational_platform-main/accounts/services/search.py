@@ -0,0 +1,236 @@
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Q
+
+from ..models import Course, Lesson, LessonContent, SearchDocument
+from .russian_stemmer import WORD, stem, stem_text
+
+
+# --------------------------------------
+# 📝 Построение документов
+# --------------------------------------
+CONTENT_TITLE_FIELDS = ['quiz_title', 'task_title', 'pdf_title', 'video_title', 'open_title']
+CONTENT_BODY_FIELDS = [
+    'text',
+    'quiz_question',
+    'quiz_explanation',
+    'task_description',
+    'task_image_description',
+    'task_hint',
+    'video_description',
+    'open_description',
+]
+
+
+def _join(*parts):
+    return '\n'.join(part for part in parts if part)
+
+
+def _document(kind, obj, course_id, title, body, lesson_id=None, content_id=None):
+    return SearchDocument(
+        kind=kind,
+        object_id=obj.id,
+        course_id=course_id,
+        lesson_id=lesson_id,
+        content_id=content_id,
+        title=title,
+        body=body,
+        title_stems=stem_text(title),
+        body_stems=stem_text(body),
+    )
+
+
+def course_document(course):
+    return _document('course', course, course.id, course.title, _join(course.description, course.tags))
+
+
+def lesson_document(lesson):
+    return _document('lesson', lesson, lesson.topic.course_id, lesson.title, '', lesson_id=lesson.id)
+
+
+def content_document(content):
+    """Документ блока; у PDF-блока в тело попадает текст страниц (нужен prefetch_related('pdf_pages'))."""
+    title = next((getattr(content, name) for name in CONTENT_TITLE_FIELDS if getattr(content, name)), '')
+    options = content.quiz_options if isinstance(content.quiz_options, list) else []
+    pages = [page.text for page in content.pdf_pages.all()] if content.content_type == 'pdf' else []
+    body = _join(
+        *(getattr(content, name) for name in CONTENT_BODY_FIELDS),
+        *map(str, options),
+        _join(*pages)[:settings.SEARCH_PDF_TEXT_LIMIT],
+    )
+    return _document(
+        'content', content, content.lesson.topic.course_id, title or content.lesson.title, body,
+        lesson_id=content.lesson_id, content_id=content.id,
+    )
+
+
+# --------------------------------------
+# 🔄 Индексация
+# --------------------------------------
+def _replace_documents(kind, documents, object_ids):
+    """Заменяет документы объектов одной транзакцией: DELETE + bulk INSERT."""
+    with transaction.atomic():
+        SearchDocument.objects.filter(kind=kind, object_id__in=object_ids).delete()
+        SearchDocument.objects.bulk_create(documents, batch_size=500)
+
+
+def index_courses(course_ids):
+    courses = Course.objects.filter(id__in=course_ids)
+    _replace_documents('course', [course_document(course) for course in courses], course_ids)
+
+
+def index_lessons(lesson_ids):
+    lessons = Lesson.objects.filter(id__in=lesson_ids).select_related('topic')
+    _replace_documents('lesson', [lesson_document(lesson) for lesson in lessons], lesson_ids)
+
+
+def index_contents(content_ids):
+    contents = LessonContent.objects.filter(id__in=content_ids).select_related('lesson__topic').prefetch_related('pdf_pages')
+    _replace_documents('content', [content_document(content) for content in contents], content_ids)
+
+
+def index_objects(instances):
+    """Переиндексирует курсы, уроки и блоки; удалённые объекты пропускаются."""
+    indexers = {Course: index_courses, Lesson: index_lessons, LessonContent: index_contents}
+    ids = {}
+    for instance in instances:
+        ids.setdefault(type(instance), set()).add(instance.id)
+    for model, object_ids in ids.items():
+        indexers[model](object_ids)
+
+
+def index_lesson_tree(lesson_id):
+    """Урок и все его блоки — после bulk-сохранения содержимого."""
+    index_lessons([lesson_id])
+    index_contents(list(LessonContent.objects.filter(lesson_id=lesson_id).values_list('id', flat=True)))
+
+
+def index_course_tree(course_id):
+    """Курс и все его уроки — после bulk-сохранения структуры."""
+    index_courses([course_id])
+    index_lessons(list(Lesson.objects.filter(topic__course_id=course_id).values_list('id', flat=True)))
+
+
+def rebuild_index(batch_size=500):
+    """Полная перестройка индекса. Возвращает число документов."""
+    total = 0
+    with transaction.atomic():
+        SearchDocument.objects.all().delete()
+        sources = [
+            (Course.objects.order_by('id'), course_document),
+            (Lesson.objects.select_related('topic').order_by('id'), lesson_document),
+            (
+                LessonContent.objects.select_related('lesson__topic').prefetch_related('pdf_pages').order_by('id'),
+                content_document,
+            ),
+        ]
+        for queryset, build in sources:
+            batch = []
+            for obj in queryset.iterator(chunk_size=batch_size):
+                batch.append(build(obj))
+                if len(batch) >= batch_size:
+                    SearchDocument.objects.bulk_create(batch)
+                    total += len(batch)
+                    batch = []
+            SearchDocument.objects.bulk_create(batch)
+            total += len(batch)
+        connection = connections[router.db_for_write(SearchDocument)]
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("INSERT INTO accounts_search_fts(accounts_search_fts) VALUES ('rebuild')")
+    return total
+
+
+# --------------------------------------
+# 🔍 Поиск
+# --------------------------------------
+def _visibility(user):
+    """
+    Условие на курс документа (SQL с параметрами): опубликованные курсы,
+    редактору — ещё и свои черновики, суперпользователю — все.
+    """
+    if user is not None and user.is_superuser:
+        return '', []
+    condition, params = '(c.is_draft = %s AND c.is_approved = %s)', [False, True]
+    if user is not None and user.is_authenticated:
+        condition, params = f'({condition} OR c.editor_id = %s)', [*params, user.id]
+    return f'AND {condition}', params
+
+
+def _visibility_q(user):
+    if user is not None and user.is_superuser:
+        return Q()
+    condition = Q(course__is_draft=False, course__is_approved=True)
+    if user is not None and user.is_authenticated:
+        condition |= Q(course__editor_id=user.id)
+    return condition
+
+
+def _search_sqlite(connection, words, limit, user):
+    # Каждое слово — префиксный запрос по основе, слова объединяются через AND
+    match = ' '.join(f'"{stem(word)}"*' for word in words)
+    visibility, params = _visibility(user)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT d.id, bm25(accounts_search_fts, 10.0, 1.0) AS rank
+            FROM accounts_search_fts
+            JOIN accounts_searchdocument d ON d.id = accounts_search_fts.rowid
+            JOIN accounts_course c ON c.id = d.course_id
+            WHERE accounts_search_fts MATCH %s {visibility}
+            ORDER BY rank
+            LIMIT %s
+            """,
+            [match, *params, limit],
+        )
+        return [(row_id, -rank) for row_id, rank in cursor.fetchall()]
+
+
+def _search_postgres(connection, words, limit, user):
+    query = ' & '.join(f'{word}:*' for word in words)
+    visibility, params = _visibility(user)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT d.id, ts_rank_cd(d.search_vector, query) AS rank
+            FROM accounts_searchdocument d
+            JOIN accounts_course c ON c.id = d.course_id,
+            to_tsquery('russian', %s) query
+            WHERE d.search_vector @@ query {visibility}
+            ORDER BY rank DESC
+            LIMIT %s
+            """,
+            [query, *params, limit],
+        )
+        return cursor.fetchall()
+
+
+def _search_fallback(connection, words, limit, user):
+    condition = _visibility_q(user)
+    for word in words:
+        condition &= Q(title__icontains=word) | Q(body__icontains=word)
+    ids = SearchDocument.objects.using(connection.alias).filter(condition).values_list('id', flat=True)[:limit]
+    return [(document_id, 0.0) for document_id in ids]
+
+
+def search(query, limit=20, user=None):
+    """
+    Ищет по курсам, урокам и блокам. Возвращает список (SearchDocument, rank)
+    по убыванию релевантности. Черновики и неодобренные курсы видны только
+    их редактору и суперпользователю; без user — только опубликованные.
+    """
+    words = [word.lower().replace('ё', 'е') for word in WORD.findall(query or '')]
+    if not words:
+        return []
+    # Сырой SQL мимо ORM: база выбирается роутером, как для запросов к моделям
+    # (в @replica_reads — реплика), и там же читаются сами документы
+    connection = connections[router.db_for_read(SearchDocument)]
+    backend = {
+        'sqlite': _search_sqlite,
+        'postgresql': _search_postgres,
+    }.get(connection.vendor, _search_fallback)
+    ranked = backend(connection, words, limit, user)
+    documents = SearchDocument.objects.using(connection.alias).select_related('course').in_bulk(
+        [document_id for document_id, _ in ranked]
+    )
+    return [(documents[document_id], rank) for document_id, rank in ranked if document_id in documents]
@@ -0,0 +1,37 @@
+from ..models import CourseTag, Tag
+
+
+# --------------------------------------
+# 🏷 Нормализованные теги курсов
+# --------------------------------------
+def parse_tags(raw):
+    """Строка 'a, b, A' → [(slug, name), ...] без пустых и повторов."""
+    seen = {}
+    for name in (raw or '').split(','):
+        name = ' '.join(name.split())
+        slug = Tag.normalize(name)
+        if slug and slug not in seen:
+            seen[slug] = name
+    return list(seen.items())
+
+
+def sync_course_tags(course):
+    """
+    Приводит CourseTag курса в соответствие с полем tags.
+    Если набор тегов не изменился, ограничивается одним SELECT.
+    """
+    parsed = parse_tags(course.tags)
+    slugs = [slug for slug, _ in parsed]
+    current = list(
+        CourseTag.objects.filter(course=course).order_by('position').values_list('tag__slug', flat=True)
+    )
+    if current == slugs:
+        return
+
+    Tag.objects.bulk_create([Tag(slug=slug, name=name) for slug, name in parsed], ignore_conflicts=True)
+    tag_ids = dict(Tag.objects.filter(slug__in=slugs).values_list('slug', 'id'))
+    CourseTag.objects.filter(course=course).delete()
+    CourseTag.objects.bulk_create([
+        CourseTag(course=course, tag_id=tag_ids[slug], position=position)
+        for position, slug in enumerate(slugs)
+    ])
@@ -0,0 +1,133 @@
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from educational_platform.db_router import primary_reads
+
+from ..models import PurchasedLesson, TokenLedgerEntry, TokenPurchase, UserToken
+from .cache_versions import bump_version, get_version
+
+
+class InsufficientTokens(Exception):
+    pass
+
+
+class LessonAlreadyPurchased(Exception):
+    pass
+
+
+class InvalidAmount(ValueError):
+    pass
+
+
+# --------------------------------------
+# 🗄️ Кэш баланса
+# --------------------------------------
+# Баланс читается часто (фронтенд опрашивает его), а меняется редко.
+# После коммита операции кэш сбрасывается подъёмом версии
+# (services/cache_versions.py), а новое значение читается из базы при
+# следующем запросе. Запись нового баланса в кэш из on_commit могла бы
+# оставить старое значение: колбэки двух параллельных операций выполняются
+# в любом порядке.
+
+def _version_key(user_id):
+    return f'token_balance_version:{user_id}'
+
+
+def invalidate_balance(user_id):
+    bump_version(_version_key(user_id))
+
+
+def get_balance(user):
+    """Возвращает (баланс, взят_ли_из_кэша)."""
+    # Версия читается до базы: операция, закоммиченная после этого, сделает запись ненужной
+    key = f'token_balance:{user.id}:v{get_version(_version_key(user.id))}'
+    balance = cache.get(key)
+    if balance is not None:
+        return balance, True
+    with primary_reads():
+        user_token, created = UserToken.objects.get_or_create(user=user)
+    cache.set(key, user_token.balance, timeout=settings.TOKEN_BALANCE_CACHE_TIMEOUT)
+    return user_token.balance, False
+
+
+# --------------------------------------
+# 💰 Операции с балансом
+# --------------------------------------
+def _lock_balance(user):
+    """Строка баланса под select_for_update; вызывается внутри transaction.atomic."""
+    # Первым запросом транзакции — запись: на SQLite select_for_update ничего
+    # не блокирует, а транзакция, начавшая с чтения, при переходе к записи
+    # получает database is locked сразу, не дожидаясь busy_timeout
+    if not UserToken.objects.filter(user=user).update(balance=F('balance')):
+        UserToken.objects.get_or_create(user=user)
+    return UserToken.objects.select_for_update().get(user=user)
+
+
+def _apply(user_token, amount, reason, lesson=None):
+    """Меняет заблокированный баланс и пишет запись в журнал."""
+    new_balance = user_token.balance + amount
+    if new_balance < 0:
+        raise InsufficientTokens('Недостаточно токенов')
+    user_token.balance = new_balance
+    user_token.save(update_fields=['balance'])
+    TokenLedgerEntry.objects.create(
+        user_id=user_token.user_id,
+        amount=amount,
+        balance_after=new_balance,
+        reason=reason,
+        lesson=lesson,
+    )
+    # Кэш баланса сбрасывает сигнал UserToken после коммита
+    return new_balance
+
+
+# Поля сумм — DecimalField(max_digits=10, decimal_places=2)
+MAX_AMOUNT = Decimal('99999999.99')
+
+
+def _parse_amount(value, name):
+    """Сумма из запроса: число или строка с не более чем двумя знаками после запятой."""
+    if isinstance(value, bool):
+        raise InvalidAmount(f'Некорректное значение {name}')
+    try:
+        amount = Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        raise InvalidAmount(f'Некорректное значение {name}')
+    if not amount.is_finite() or amount.as_tuple().exponent < -2 or abs(amount) > MAX_AMOUNT:
+        raise InvalidAmount(f'Некорректное значение {name}')
+    return amount
+
+
+def credit_tokens(user, amount, price):
+    """Зачисляет купленные токены, возвращает новый баланс."""
+    amount = _parse_amount(amount, 'amount')
+    price = _parse_amount(price, 'price')
+    # TokenPurchase.amount целочисленное: дробное количество не округляем молча
+    if amount <= 0 or amount != amount.to_integral_value():
+        raise InvalidAmount('Количество токенов должно быть целым положительным числом')
+    if price < 0:
+        raise InvalidAmount('Стоимость не может быть отрицательной')
+    with transaction.atomic():
+        user_token = _lock_balance(user)
+        TokenPurchase.objects.create(user=user, amount=amount, price=price)
+        return _apply(user_token, amount, 'token_purchase')
+
+
+def purchase_lesson_with_tokens(user, lesson):
+    """
+    Списывает стоимость урока и открывает к нему доступ.
+    Повторная покупка и покупка без средств откатываются целиком.
+    """
+    with transaction.atomic():
+        # Блокировка баланса сериализует покупки одного пользователя,
+        # поэтому проверка после неё не гоняется с параллельным запросом
+        user_token = _lock_balance(user)
+        if PurchasedLesson.objects.filter(user=user, lesson=lesson).exists():
+            raise LessonAlreadyPurchased('Урок уже куплен')
+        new_balance = _apply(user_token, -Decimal(lesson.price_in_tokens), 'lesson_purchase', lesson=lesson)
+        PurchasedLesson.objects.create(user=user, lesson=lesson)
+        return new_balance
@@ -0,0 +1,211 @@
+import errno
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from ..models import ChunkedUpload, LessonContent
+from ..storage import content_storage
+
+
+# --------------------------------------
+# 📦 Загрузка PDF частями с докачкой
+# --------------------------------------
+# init → append (сколько угодно раз, каждая часть со своим смещением) → complete.
+# Часть сначала целиком читается небольшими блоками в свой временный файл,
+# поэтому память на загрузку не зависит от размера файла, а медленный клиент
+# не держит блокировку. Затем в одной транзакции условный UPDATE занимает
+# смещение, и часть копируется в общий файл загрузки: два запроса с одним
+# смещением не пишут в файл одновременно, а при ошибке копирования смещение
+# откатывается вместе с транзакцией. Оборванную загрузку клиент продолжает
+# с received из статуса.
+
+READ_BLOCK_SIZE = 64 * 1024
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+class UploadError(ValueError):
+    pass
+
+
+class OffsetMismatch(UploadError):
+    """Часть пришла не с того места; клиенту нужно продолжить с upload.received."""
+
+    def __init__(self, upload):
+        super().__init__(f'Ожидалось смещение {upload.received}')
+        self.upload = upload
+
+
+def temp_path(upload):
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{upload.id}.part')
+
+
+def _normalize_sha256(value):
+    value = (value or '').strip().lower()
+    if value and not SHA256_PATTERN.match(value):
+        raise UploadError('Некорректная контрольная сумма SHA-256')
+    return value
+
+
+def init_upload(user, lesson, file_name, size, sha256=''):
+    if not file_name.lower().endswith('.pdf'):
+        raise UploadError('Можно загружать только PDF')
+    if size <= 0 or size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+        raise UploadError(f'Размер файла должен быть от 1 байта до {settings.CHUNKED_UPLOAD_MAX_SIZE} байт')
+    upload = ChunkedUpload.objects.create(
+        user=user,
+        lesson=lesson,
+        file_name=get_valid_filename(os.path.basename(file_name)),
+        size=size,
+        sha256=_normalize_sha256(sha256),
+    )
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    open(temp_path(upload), 'wb').close()
+    return upload
+
+
+def append_chunk(upload, offset, stream, length, chunk_sha256=''):
+    """
+    Дописывает часть длиной length из stream (файлоподобный объект, например
+    request) начиная с offset. Возвращает новое значение received.
+    """
+    chunk_sha256 = _normalize_sha256(chunk_sha256)
+    if offset != upload.received:
+        raise OffsetMismatch(upload)
+    if length <= 0 or length > settings.CHUNKED_UPLOAD_MAX_CHUNK:
+        raise UploadError(f'Размер части должен быть от 1 до {settings.CHUNKED_UPLOAD_MAX_CHUNK} байт')
+    if offset + length > upload.size:
+        raise UploadError('Часть выходит за объявленный размер файла')
+
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    with tempfile.TemporaryFile(dir=settings.CHUNKED_UPLOAD_DIR) as chunk:
+        digest = hashlib.sha256()
+        written = 0
+        while written < length:
+            block = stream.read(min(READ_BLOCK_SIZE, length - written))
+            if not block:
+                break
+            chunk.write(block)
+            digest.update(block)
+            written += len(block)
+
+        if written != length:
+            raise UploadError('Соединение оборвалось: часть получена не полностью')
+        if chunk_sha256 and digest.hexdigest() != chunk_sha256:
+            raise UploadError('Контрольная сумма части не совпала')
+
+        with transaction.atomic():
+            # Занимаем смещение, только если его никто не сдвинул параллельно;
+            # строка (в SQLite — вся база) заблокирована до конца копирования
+            updated = ChunkedUpload.objects.filter(id=upload.id, received=offset).update(
+                received=offset + length,
+                updated_at=timezone.now(),
+            )
+            if not updated:
+                upload.refresh_from_db()
+                raise OffsetMismatch(upload)
+            chunk.seek(0)
+            with open(temp_path(upload), 'r+b') as part:
+                part.seek(offset)
+                shutil.copyfileobj(chunk, part, READ_BLOCK_SIZE)
+                # Хвост от прерванной ранее попытки не должен остаться в файле
+                part.truncate(offset + length)
+
+    upload.received = offset + length
+    return upload.received
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as part:
+        for block in iter(lambda: part.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _move_into_place(source, destination):
+    try:
+        os.replace(source, destination)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # Временный каталог на другой ФС: копируем рядом с целью и переименовываем уже там
+        staging = destination + '.part'
+        shutil.copyfile(source, staging)
+        os.replace(staging, destination)
+        os.remove(source)
+
+
+def complete_upload(upload, sha256=''):
+    """
+    Проверяет размер, контрольную сумму и сигнатуру PDF, атомарно переносит
+    файл в хранилище блоков (или берёт уже лежащий там такой же) и создаёт
+    блок урока. Возвращает LessonContent.
+    Повторный или параллельный вызов для той же загрузки (клиент повторяет
+    запрос при обрыве) получает UploadError, а не второй блок.
+    """
+    expected = _normalize_sha256(sha256) or upload.sha256
+    path = temp_path(upload)
+    try:
+        if upload.received != upload.size or os.path.getsize(path) != upload.size:
+            raise UploadError(f'Получено {upload.received} из {upload.size} байт')
+        with open(path, 'rb') as part:
+            if part.read(5) != b'%PDF-':
+                raise UploadError('Файл не похож на PDF')
+        actual = _file_sha256(path)
+    except FileNotFoundError:
+        # Файл уже перенесён параллельным complete или удалён cleanup_uploads
+        raise UploadError('Временный файл загрузки не найден')
+    if expected and actual != expected:
+        raise UploadError('Контрольная сумма файла не совпала')
+
+    with transaction.atomic():
+        # Загрузку забирает тот, кто удалил её строку; при ошибке ниже строка вернётся
+        deleted, _ = ChunkedUpload.objects.filter(id=upload.id).delete()
+        if not deleted:
+            raise UploadError('Загрузка уже завершена')
+        # Такой файл уже есть в хранилище — временный не нужен
+        name = content_storage.find_blob(actual)
+        try:
+            if name:
+                os.remove(path)
+            else:
+                name = content_storage.blob_name(
+                    actual, upload.file_name, LessonContent._meta.get_field('pdf_file').max_length
+                )
+                destination = content_storage.path(name)
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                _move_into_place(path, destination)
+        except FileNotFoundError:
+            raise UploadError('Временный файл загрузки не найден')
+        # Файл без ссылок (если запись не создастся) удалит gc_media
+        return LessonContent.objects.create(
+            lesson=upload.lesson,
+            content_type='pdf',
+            pdf_file=name,
+        )
+
+
+def discard_upload(upload):
+    try:
+        os.remove(temp_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def cleanup_stale_uploads(max_age=timedelta(days=1)):
+    """Удаляет брошенные загрузки вместе с временными файлами. Возвращает их число."""
+    stale = ChunkedUpload.objects.filter(updated_at__lt=timezone.now() - max_age)
+    count = 0
+    for upload in stale.iterator():
+        discard_upload(upload)
+        count += 1
+    return count
@@ -0,0 +1,83 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.text import get_valid_filename
+
+# --------------------------------------
+# 🗂️ Хранилище файлов блоков без дублей
+# --------------------------------------
+# Файл кладётся по хэшу содержимого: blobs/<ab>/<sha256>/<исходное имя>.
+# Если такое содержимое уже есть, save() возвращает имя существующего файла,
+# и новый блок ссылается на него. Поэтому файлы блоков нельзя удалять вместе
+# с блоком (как делает django-cleanup): их удаляет gc_media, когда на файл
+# не осталось ссылок ни из одного LessonContent.
+
+BLOB_DIR = 'blobs'
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def storage_name(name):
+    """Имя в хранилище по значению поля: редактор сохраняет туда URL (/media/...), а не имя."""
+    media_prefix = settings.MEDIA_URL.lstrip('/')
+    name = (name or '').lstrip('/')
+    while media_prefix and name.startswith(media_prefix):
+        name = name[len(media_prefix):]
+    return name
+
+
+def file_sha256(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks(HASH_BLOCK_SIZE):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def blob_dir(self, digest):
+        return f'{BLOB_DIR}/{digest[:2]}/{digest}'
+
+    def blob_name(self, digest, name, max_length=None):
+        """Имя для нового файла; исходное имя укорачивается, чтобы влезть в max_length поля."""
+        directory = self.blob_dir(digest)
+        root, ext = os.path.splitext(get_valid_filename(os.path.basename(name)) or 'file')
+        if max_length:
+            root = root[:max(1, max_length - len(directory) - 1 - len(ext))]
+        return f'{directory}/{root}{ext}'
+
+    def find_blob(self, digest):
+        """Имя уже сохранённого файла с таким хэшем или None."""
+        directory = self.blob_dir(digest)
+        try:
+            _, files = self.listdir(directory)
+        except FileNotFoundError:
+            return None
+        # .part — недокопированный файл (см. services/uploads.py)
+        files = sorted(f for f in files if not f.endswith('.part'))
+        if not files:
+            return None
+        name = f'{directory}/{files[0]}'
+        # Свежая дата защищает файл от gc_media, пока новая ссылка на него не сохранена
+        os.utime(self.path(name))
+        return name
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = file_sha256(content)
+        existing = self.find_blob(digest)
+        if existing:
+            return existing
+        return super().save(self.blob_name(digest, name, max_length), content, max_length)
+
+
+content_storage = ContentAddressedStorage()
+
+
+def get_content_storage():
+    return content_storage
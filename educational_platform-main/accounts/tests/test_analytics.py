@@ -0,0 +1,131 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import (
+    AnalyticsWatermark, BlockStats, Lesson, LessonContent, LessonProgress, LessonStats, PurchasedLesson, UserAnswer,
+)
+from ..services.analytics import WATERMARK, refresh_analytics
+from .utils import make_course, make_editor, make_user
+
+
+class AnalyticsTestCase(TestCase):
+    def setUp(self):
+        self.editor = make_editor()
+        self.course = make_course(self.editor)
+        self.lesson = Lesson.objects.get(topic__course=self.course)
+        self.block = LessonContent.objects.create(
+            lesson=self.lesson, content_type='task', task_answer_type='number', task_correct_answer='4', order=0
+        )
+        self.students = [make_user(), make_user()]
+        for student in self.students:
+            PurchasedLesson.objects.create(user=student, lesson=self.lesson)
+        LessonProgress.objects.create(user=self.students[0], lesson=self.lesson, completed_count=1)
+        UserAnswer.objects.create(user=self.students[0], content=self.block, answer='4', is_correct=True)
+        UserAnswer.objects.create(user=self.students[1], content=self.block, answer='5', is_correct=False)
+
+    def _lesson_stats(self):
+        stats = LessonStats.objects.get(lesson=self.lesson)
+        return stats.purchases, stats.learners, stats.completed
+
+    def _block_stats(self):
+        stats = BlockStats.objects.get(content=self.block)
+        return stats.answers, stats.checked, stats.correct
+
+
+class RefreshAnalyticsTests(AnalyticsTestCase):
+    def test_first_run_counts_everything(self):
+        refresh_analytics()
+        self.assertEqual(self._lesson_stats(), (2, 1, 1))
+        self.assertEqual(self._block_stats(), (2, 2, 1))
+        self.assertTrue(AnalyticsWatermark.objects.filter(name=WATERMARK).exists())
+
+    def test_repeated_runs_are_idempotent(self):
+        refresh_analytics()
+        first = (self._lesson_stats(), self._block_stats())
+        # Строки попадают в окно перекрытия и пересчитываются ещё раз
+        self.assertEqual(refresh_analytics(), (1, 1))
+        self.assertEqual((self._lesson_stats(), self._block_stats()), first)
+        refresh_analytics(full=True)
+        self.assertEqual((self._lesson_stats(), self._block_stats()), first)
+        self.assertEqual(LessonStats.objects.count(), 1)
+
+    def test_upserted_answer_is_counted_once(self):
+        refresh_analytics()
+        answer = UserAnswer.objects.get(user=self.students[1], content=self.block)
+        answer.answer, answer.is_correct = '4', True
+        answer.save()
+        refresh_analytics()
+        self.assertEqual(self._block_stats(), (2, 2, 2))
+
+    def test_new_rows_are_picked_up_incrementally(self):
+        refresh_analytics()
+        student = make_user()
+        PurchasedLesson.objects.create(user=student, lesson=self.lesson)
+        UserAnswer.objects.create(user=student, content=self.block, answer='?')
+        refresh_analytics()
+        self.assertEqual(self._lesson_stats(), (3, 1, 1))
+        # Ответ без проверки не входит в checked
+        self.assertEqual(self._block_stats(), (3, 2, 1))
+
+    def test_full_run_picks_up_deleted_purchases(self):
+        refresh_analytics()
+        # Оставшиеся строки старше окна перекрытия: урок по отметке не пересчитывается
+        hour_ago = timezone.now() - timedelta(hours=1)
+        PurchasedLesson.objects.update(purchased_at=hour_ago)
+        LessonProgress.objects.update(last_accessed=hour_ago)
+        UserAnswer.objects.update(updated_at=hour_ago)
+        PurchasedLesson.objects.filter(user=self.students[1]).delete()
+        UserAnswer.objects.filter(user=self.students[1]).delete()
+        self.assertEqual(refresh_analytics(), (0, 0))
+        # Удаление по отметке не видно
+        self.assertEqual(self._lesson_stats(), (2, 1, 1))
+
+        out = StringIO()
+        call_command('refresh_course_analytics', '--full', stdout=out)
+        self.assertIn('Обновлено уроков: 1, блоков: 1', out.getvalue())
+        self.assertEqual(self._lesson_stats(), (1, 1, 1))
+        self.assertEqual(self._block_stats(), (1, 1, 1))
+
+    def test_small_batches(self):
+        make_course(self.editor, topics=2, lessons_per_topic=2)
+        self.assertEqual(refresh_analytics(batch_size=2), (5, 1))
+        self.assertEqual(LessonStats.objects.count(), 5)
+
+
+class CourseAnalyticsApiTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        refresh_analytics()
+        self.url = reverse('course_analytics', args=[self.course.id])
+
+    def _get(self, user):
+        self.client.force_login(user)
+        return self.client.get(self.url)
+
+    def test_course_editor_sees_summary(self):
+        data = self._get(self.editor).json()
+        self.assertEqual(data['course_id'], self.course.id)
+        self.assertEqual(
+            data['lessons'],
+            [{
+                'lesson_id': self.lesson.id, 'topic_id': self.lesson.topic_id, 'title': self.lesson.title,
+                'purchases': 2, 'learners': 1, 'completed': 1, 'completion_rate': 100.0,
+            }],
+        )
+        self.assertEqual(data['topics'][0]['completion_rate'], 100.0)
+        self.assertEqual(data['blocks'][0]['accuracy'], 50.0)
+        self.assertIsNotNone(data['updated_at'])
+        self.assertEqual(self._get(make_user(is_superuser=True)).status_code, 200)
+
+    def test_access_is_limited_to_course_editor(self):
+        self.assertRedirects(self._get(self.students[0]), reverse('access_denied'), fetch_redirect_response=False)
+        self.assertEqual(self._get(make_editor()).status_code, 403)
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+        self.client.force_login(self.editor)
+        self.assertEqual(self.client.get(reverse('course_analytics', args=[0])).status_code, 404)
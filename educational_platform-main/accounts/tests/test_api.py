@@ -0,0 +1,157 @@
+import json
+from unittest import mock
+
+from django.db import IntegrityError
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Lesson, LessonContent, OpenAnswerAttempt, PurchasedLesson, UserAnswer
+from ..services.open_answers import SUBMIT_ATTEMPTS, AttemptConflict, submit_open_answer
+from .utils import make_course, make_editor, make_user
+
+
+class BatchPayloadTests(TestCase):
+    """Некорректные пачки отклоняются с 400, а не падают с 500."""
+
+    def setUp(self):
+        self.editor = make_editor()
+        self.lesson = Lesson.objects.get(topic__course=make_course(self.editor))
+        self.quiz = LessonContent.objects.create(
+            lesson=self.lesson, content_type='quiz', quiz_question='2+2?', quiz_correct_answer='4'
+        )
+        self.open_block = LessonContent.objects.create(
+            lesson=self.lesson, content_type='open', open_title='Вопрос',
+            open_criteria=[{'criterion': 'Полнота', 'points': 2}],
+        )
+        self.student = make_user()
+        PurchasedLesson.objects.create(user=self.student, lesson=self.lesson)
+
+    def _post(self, name, payload):
+        return self.client.post(reverse(name), json.dumps(payload), content_type='application/json')
+
+    def test_save_answers_rejects_malformed_items(self):
+        self.client.force_login(self.student)
+        for payload in (
+            [1, 2],
+            {'answers': 'x'},
+            {'answers': [1]},
+            {'answers': ['block']},
+            {'answers': [None]},
+            {'answers': [{'block_id': self.quiz.id}]},
+            {'answers': [{'block_id': 'abc', 'answer': '4'}]},
+        ):
+            with self.subTest(payload=payload):
+                response = self._post('save_answers_batch', payload)
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.json()['success'])
+        self.assertFalse(UserAnswer.objects.exists())
+
+    def test_save_answers(self):
+        self.client.force_login(self.student)
+        response = self._post('save_answers_batch', {'answers': [{'block_id': self.quiz.id, 'answer': '4'}]})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['results'], {str(self.quiz.id): True})
+
+    def test_save_grades_rejects_malformed_items(self):
+        attempt = OpenAnswerAttempt.objects.create(user=self.student, content=self.open_block, answer_text='Ответ')
+        self.client.force_login(self.editor)
+        for payload in (
+            [1, 2],
+            {'grades': [1]},
+            {'grades': [[attempt.id, [2]]]},
+            {'grades': [{'scores': [2]}]},
+            {'grades': [{'attempt_id': attempt.id, 'scores': [3]}]},
+            {'grades': [{'attempt_id': attempt.id, 'scores': 'x'}]},
+        ):
+            with self.subTest(payload=payload):
+                response = self._post('save_grades', payload)
+                self.assertEqual(response.status_code, 400)
+        attempt.refresh_from_db()
+        self.assertNotEqual(attempt.status, 'graded')
+
+    def test_save_grades(self):
+        attempt = OpenAnswerAttempt.objects.create(user=self.student, content=self.open_block, answer_text='Ответ')
+        self.client.force_login(self.editor)
+        response = self._post('save_grades', {'grades': [{'attempt_id': attempt.id, 'scores': [2]}]})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['total_scores'], {str(attempt.id): 2})
+
+
+class GradingPageTests(TestCase):
+    def setUp(self):
+        self.editor = make_editor()
+        lesson = Lesson.objects.get(topic__course=make_course(self.editor))
+        block = LessonContent.objects.create(
+            lesson=lesson, content_type='open', open_title='Вопрос',
+            open_criteria=[{'criterion': 'Полнота', 'points': 2}, {'criterion': 'Стиль', 'points': 1}],
+        )
+        self.attempt = OpenAnswerAttempt.objects.create(user=make_user(), content=block, answer_text='Мой ответ')
+
+    def test_editor_sees_pending_attempts(self):
+        self.client.force_login(self.editor)
+        response = self.client.get(reverse('grading_page'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([attempt.id for attempt in response.context['attempts']], [self.attempt.id])
+        self.assertContains(response, 'Мой ответ')
+        self.assertContains(response, 'class="form-control grading-input"', count=2)
+
+    def test_other_editor_sees_nothing(self):
+        self.client.force_login(make_editor())
+        response = self.client.get(reverse('grading_page'))
+        self.assertEqual(list(response.context['attempts']), [])
+
+    def test_learner_is_redirected(self):
+        self.client.force_login(make_user())
+        self.assertRedirects(self.client.get(reverse('grading_page')), reverse('access_denied'))
+
+
+class SubmitOpenAnswerTests(TestCase):
+    def setUp(self):
+        self.editor = make_editor()
+        self.lesson = Lesson.objects.get(topic__course=make_course(self.editor))
+        self.open_block = LessonContent.objects.create(
+            lesson=self.lesson, content_type='open', open_title='Вопрос',
+            open_criteria=[{'criterion': 'Полнота', 'points': 2}], open_max_attempts=3,
+        )
+        self.student = make_user()
+        PurchasedLesson.objects.create(user=self.student, lesson=self.lesson)
+
+    def _post(self):
+        self.client.force_login(self.student)
+        return self.client.post(
+            reverse('save_answer'),
+            json.dumps({'block_id': self.open_block.id, 'block_type': 'open', 'answer': 'Ответ'}),
+            content_type='application/json',
+        )
+
+    def test_transient_integrity_error_is_retried(self):
+        real_create = OpenAnswerAttempt.objects.create
+        # Первый раз номер занят параллельным запросом, второй — свободен
+        side_effects = iter([IntegrityError, None])
+
+        def create(**kwargs):
+            error = next(side_effects)
+            if error:
+                raise error
+            return real_create(**kwargs)
+
+        with mock.patch.object(OpenAnswerAttempt.objects, 'create', side_effect=create) as patched:
+            attempt = submit_open_answer(self.student, self.open_block, 'Ответ')
+        self.assertEqual(patched.call_count, 2)
+        self.assertEqual(attempt.attempt_number, 1)
+
+    def test_persistent_integrity_error_is_bounded(self):
+        with mock.patch.object(OpenAnswerAttempt.objects, 'create', side_effect=IntegrityError) as create:
+            with self.assertRaises(AttemptConflict):
+                submit_open_answer(self.student, self.open_block, 'Ответ')
+            self.assertEqual(create.call_count, SUBMIT_ATTEMPTS)
+            response = self._post()
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(response.json()['success'])
+
+    def test_attempt_limit(self):
+        for number in (1, 2, 3):
+            self.assertEqual(self._post().json()['attempt'], number)
+        response = self._post()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Попытки закончились')
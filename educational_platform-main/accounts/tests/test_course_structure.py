@@ -0,0 +1,93 @@
+import json
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import CourseTopic, Lesson, PurchasedLesson
+from .utils import make_course, make_editor, make_user
+
+# Пакетный upsert (вместе с сессией, удалением старых уроков каскадом и
+# переиндексацией): число запросов не зависит от числа тем и уроков
+SAVE_QUERIES = 35
+
+
+class SaveCourseStructureTests(TestCase):
+    def setUp(self):
+        self.editor = make_editor()
+        self.course = make_course(self.editor, topics=2, lessons_per_topic=2)
+        self.client.force_login(self.editor)
+        session = self.client.session
+        session['course_id'] = self.course.id
+        session.save()
+
+    def _post(self, topics):
+        return self.client.post(
+            reverse('save_course_structure'), json.dumps({'topics': topics}), content_type='application/json'
+        )
+
+    def _structure(self):
+        """Структура в том виде, в каком её отдаёт step2 и возвращает страница."""
+        return self.client.get(reverse('step2')).context['structure']
+
+    def test_step2_renders_structure_with_ids(self):
+        structure = self._structure()
+        topics = list(CourseTopic.objects.filter(course=self.course))
+        self.assertEqual([topic['id'] for topic in structure], [topic.id for topic in topics])
+        self.assertEqual(
+            [lesson['id'] for lesson in structure[0]['lessons']],
+            list(Lesson.objects.filter(topic=topics[0]).values_list('id', flat=True)),
+        )
+
+    def test_purchase_survives_save(self):
+        lesson = Lesson.objects.filter(topic__course=self.course).first()
+        purchase = PurchasedLesson.objects.create(user=make_user(), lesson=lesson)
+        structure = self._structure()
+        # Переименование, перестановка тем и новый урок
+        structure[0]['lessons'][0]['title'] = 'Переименованный урок'
+        structure[1]['lessons'].append({'id': None, 'title': 'Новый урок', 'price': 5})
+        structure.reverse()
+
+        response = self._post(structure)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertTrue(response.json()['success'])
+        lesson.refresh_from_db()
+        self.assertEqual(lesson.title, 'Переименованный урок')
+        self.assertEqual(lesson.topic.order, 1)
+        self.assertTrue(PurchasedLesson.objects.filter(id=purchase.id).exists())
+        self.assertEqual(Lesson.objects.filter(topic__course=self.course).count(), 5)
+
+    def test_removed_lessons_are_deleted(self):
+        structure = self._structure()
+        removed = structure[0]['lessons'].pop()
+        self.assertEqual(self._post(structure).status_code, 200)
+        self.assertFalse(Lesson.objects.filter(id=removed['id']).exists())
+
+    def test_invalid_price_is_rejected(self):
+        structure = self._structure()
+        for price in (10.5, -1, '10', None, True):
+            with self.subTest(price=price):
+                structure[0]['lessons'][0]['price'] = price
+                response = self._post(structure)
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.json()['success'])
+        # Транзакция откатилась, цены не тронуты
+        self.assertEqual(set(Lesson.objects.values_list('price_in_tokens', flat=True)), {10})
+
+    def test_integral_float_price_is_accepted(self):
+        structure = self._structure()
+        structure[0]['lessons'][0]['price'] = 25.0
+        self.assertEqual(self._post(structure).status_code, 200)
+        self.assertEqual(Lesson.objects.get(id=structure[0]['lessons'][0]['id']).price_in_tokens, 25)
+
+    def test_save_query_count_does_not_scale(self):
+        for topics, lessons in ((2, 2), (10, 5)):
+            with self.subTest(topics=topics, lessons=lessons):
+                payload = [
+                    {'title': f'Тема {t}', 'lessons': [{'title': f'Урок {l}', 'price': 1} for l in range(lessons)]}
+                    for t in range(topics)
+                ]
+                with CaptureQueriesContext(connection) as queries:
+                    self.assertEqual(self._post(payload).status_code, 200)
+                self.assertEqual(len(queries), SAVE_QUERIES)
@@ -0,0 +1,155 @@
+import shutil
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from educational_platform.db_router import PRIMARY_DB, REPLICA_DB, primary_reads, replica_reads
+
+from ..models import Course
+from ..services.search import rebuild_index, search
+from .utils import make_course, make_editor, make_user
+
+
+def _read_db():
+    return router.db_for_read(Course)
+
+
+class ReplicaRouterTests(TransactionTestCase):
+    """
+    Реплика — второй файл SQLite, снятый копией с основной базы в setUp.
+    После копии основная база меняется, поэтому по данным видно,
+    из какой базы прочитан запрос.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # Псевдоним добавляется только на время этих тестов: раннер о нём не знает
+        # и не создаёт для него тестовую базу, а остальные тесты читают из default
+        cls.databases = {DEFAULT_DB_ALIAS, REPLICA_DB}
+        cls._replica_dir = tempfile.mkdtemp()
+        replica = connections.configure_settings({
+            DEFAULT_DB_ALIAS: dict(settings.DATABASES[DEFAULT_DB_ALIAS]),
+            REPLICA_DB: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(Path(cls._replica_dir) / 'replica.sqlite3')},
+        })[REPLICA_DB]
+        settings.DATABASES[REPLICA_DB] = connections.settings[REPLICA_DB] = replica
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA_DB].close()
+        del connections[REPLICA_DB]
+        settings.DATABASES.pop(REPLICA_DB, None)
+        connections.settings.pop(REPLICA_DB, None)
+        shutil.rmtree(cls._replica_dir, ignore_errors=True)
+
+    def setUp(self):
+        self.user = make_user()
+        self.course = make_course(make_editor())
+        Course.objects.filter(id=self.course.id).update(title='Алгебра', is_draft=False, is_approved=True)
+        rebuild_index()
+        self._copy_to_replica()
+        # Этого курса в реплике нет
+        self.fresh_course = make_course(make_editor())
+        Course.objects.filter(id=self.fresh_course.id).update(title='Алгоритмы', is_draft=False, is_approved=True)
+        rebuild_index()
+
+    def _copy_to_replica(self):
+        primary = connections[PRIMARY_DB]
+        primary.ensure_connection()
+        target = sqlite3.connect(settings.DATABASES[REPLICA_DB]['NAME'])
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+        connections[REPLICA_DB].close()
+
+    def test_reads_go_to_primary_by_default(self):
+        self.assertEqual(_read_db(), PRIMARY_DB)
+        self.assertEqual(Course.objects.count(), 2)
+
+    def test_replica_reads_selects_replica(self):
+        @replica_reads
+        def view(request):
+            return _read_db(), Course.objects.count(), router.db_for_write(Course)
+
+        self.assertEqual(view(None), (REPLICA_DB, 1, PRIMARY_DB))
+        # Флаг снят после выхода из представления
+        self.assertEqual(_read_db(), PRIMARY_DB)
+
+    def test_primary_reads_overrides_replica_reads(self):
+        @replica_reads
+        def view(request):
+            with primary_reads():
+                inside = _read_db(), Course.objects.count()
+            return inside, _read_db()
+
+        self.assertEqual(view(None), ((PRIMARY_DB, 2), REPLICA_DB))
+
+    def test_replica_without_alias_falls_back_to_primary(self):
+        @replica_reads
+        def view(request):
+            return _read_db()
+
+        replica = settings.DATABASES.pop(REPLICA_DB)
+        try:
+            self.assertEqual(view(None), PRIMARY_DB)
+        finally:
+            settings.DATABASES[REPLICA_DB] = replica
+
+    def test_flag_is_reset_after_exception(self):
+        @replica_reads
+        def view(request):
+            raise ValueError
+
+        with self.assertRaises(ValueError):
+            view(None)
+        self.assertEqual(_read_db(), PRIMARY_DB)
+
+    def test_flag_does_not_leak_between_threads(self):
+        started = threading.Event()
+        release = threading.Event()
+        seen = {}
+
+        @replica_reads
+        def view(request):
+            started.set()
+            release.wait(5)
+            seen['view'] = _read_db()
+
+        def other():
+            started.wait(5)
+            seen['other'] = _read_db()
+            release.set()
+
+        threads = [threading.Thread(target=view, args=(None,)), threading.Thread(target=other)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(seen, {'view': REPLICA_DB, 'other': PRIMARY_DB})
+
+        # Поток, запущенный из представления, начинает с пустого контекста
+        @replica_reads
+        def spawning_view(request):
+            thread = threading.Thread(target=lambda: seen.update(child=_read_db()))
+            thread.start()
+            thread.join()
+
+        spawning_view(None)
+        self.assertEqual(seen['child'], PRIMARY_DB)
+
+    def test_search_runs_on_routed_connection(self):
+        self.assertEqual({document.course_id for document, _ in search('алг')}, {self.course.id, self.fresh_course.id})
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('search_api'), {'q': 'алг'})
+        self.assertEqual(response.status_code, 200)
+        # search_api помечен @replica_reads: нового курса в реплике ещё нет
+        self.assertEqual({result['course_id'] for result in response.json()['results']}, {self.course.id})
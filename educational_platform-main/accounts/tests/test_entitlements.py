@@ -0,0 +1,46 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..models import Lesson, PurchasedLesson
+from ..services import entitlements
+from ..services.entitlements import invalidate_entitlements, load_entitlements
+from .utils import make_course, make_editor, make_user
+
+
+class EntitlementsCacheTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        course = make_course(make_editor(), lessons_per_topic=2)
+        self.first, self.second = Lesson.objects.filter(topic__course=course)
+        PurchasedLesson.objects.create(user=self.user, lesson=self.first)
+        cache.clear()
+
+    def test_cached_until_purchase(self):
+        self.assertEqual(load_entitlements(self.user).lesson_ids, {self.first.id})
+        with self.assertNumQueries(0):
+            load_entitlements(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            PurchasedLesson.objects.create(user=self.user, lesson=self.second)
+        self.assertEqual(load_entitlements(self.user).lesson_ids, {self.first.id, self.second.id})
+
+    def test_purchase_during_load_is_not_overwritten(self):
+        real_load = entitlements._load_lesson_courses
+
+        def load_then_purchase(user_id):
+            # База прочитана, и сразу после этого коммитится покупка
+            stale = real_load(user_id)
+            PurchasedLesson.objects.create(user=self.user, lesson=self.second)
+            invalidate_entitlements(user_id)
+            return stale
+
+        with mock.patch.object(entitlements, '_load_lesson_courses', load_then_purchase):
+            self.assertEqual(load_entitlements(self.user).lesson_ids, {self.first.id})
+        self.assertEqual(load_entitlements(self.user).lesson_ids, {self.first.id, self.second.id})
+
+    def test_evicted_version_does_not_resurrect_old_entries(self):
+        load_entitlements(self.user)
+        cache.delete(entitlements._version_key(self.user.id))
+        PurchasedLesson.objects.create(user=self.user, lesson=self.second)
+        self.assertEqual(load_entitlements(self.user).lesson_ids, {self.first.id, self.second.id})
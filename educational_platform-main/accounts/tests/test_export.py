@@ -0,0 +1,142 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Lesson, LessonContent, LessonProgress, OpenAnswerAttempt, UserAnswer
+from ..services.export import FIELDS, export_lines, export_rows
+from .utils import make_course, make_editor, make_user
+
+
+class ExportTestCase(TestCase):
+    def setUp(self):
+        self.editor = make_editor()
+        self.course = make_course(self.editor)
+        self.lesson = Lesson.objects.get(topic__course=self.course)
+        self.task = LessonContent.objects.create(
+            lesson=self.lesson, content_type='task', task_answer_type='text', task_correct_answer='x', order=0
+        )
+        self.open = LessonContent.objects.create(lesson=self.lesson, content_type='open', order=1)
+        self.student = make_user()
+        UserAnswer.objects.create(user=self.student, content=self.task, answer='=HYPERLINK("x")', is_correct=False)
+        OpenAnswerAttempt.objects.create(user=self.student, content=self.open, answer_text='@SUM(A1)')
+        OpenAnswerAttempt.objects.create(
+            user=self.student, content=self.open, attempt_number=2, answer_text='+1', status='graded', total_score=7
+        )
+        LessonProgress.objects.create(user=self.student, lesson=self.lesson, completed_count=1, total_score=7)
+
+        # Ответы в другом курсе не попадают в выгрузку
+        other_lesson = Lesson.objects.get(topic__course=make_course(self.editor))
+        other_block = LessonContent.objects.create(lesson=other_lesson, content_type='task', order=0)
+        UserAnswer.objects.create(user=self.student, content=other_block, answer='1')
+
+
+class ExportRowsTests(ExportTestCase):
+    def test_rows_for_each_source(self):
+        rows = list(export_rows(self.course.id, chunk_size=1))
+        self.assertEqual([row['record'] for row in rows], ['answer', 'open_attempt', 'open_attempt', 'progress'])
+        for row in rows:
+            self.assertEqual(list(row), FIELDS)
+            self.assertEqual((row['user_id'], row['user_email']), (self.student.id, self.student.email))
+            self.assertEqual((row['lesson_id'], row['lesson_title']), (self.lesson.id, self.lesson.title))
+
+        answer, pending, graded, progress = rows
+        self.assertEqual(
+            (answer['block_id'], answer['block_type'], answer['answer'], answer['is_correct']),
+            (self.task.id, 'task', '=HYPERLINK("x")', False),
+        )
+        self.assertEqual((pending['attempt'], pending['status'], pending['score']), (1, 'pending', None))
+        self.assertEqual((graded['attempt'], graded['status'], graded['score']), (2, 'graded', 7))
+        self.assertEqual(graded['block_type'], 'open')
+        # В уроке два блока с ответом, пройден один
+        self.assertEqual(
+            (progress['completed_count'], progress['total_blocks'], progress['progress'], progress['score']),
+            (1, 2, 50, 7),
+        )
+        self.assertIsNone(progress['block_id'])
+
+    def test_csv_escapes_formulas(self):
+        content = ''.join(export_lines(self.course.id, 'csv'))
+        self.assertTrue(content.startswith('﻿'))
+        rows = list(csv.DictReader(StringIO(content.lstrip('﻿'))))
+        self.assertEqual(list(rows[0]), FIELDS)
+        self.assertEqual([row['answer'] for row in rows], ["'=HYPERLINK(\"x\")", "'@SUM(A1)", "'+1", ''])
+        for value in ('-1', '\tcmd', 'обычный ответ'):
+            with self.subTest(value=value):
+                UserAnswer.objects.filter(content=self.task).update(answer=value)
+                row = next(csv.DictReader(StringIO(''.join(export_lines(self.course.id, 'csv')).lstrip('﻿'))))
+                self.assertEqual(row['answer'], value if value == 'обычный ответ' else "'" + value)
+        # Пустые значения — пустые ячейки, а не None
+        self.assertEqual(rows[0]['score'], '')
+
+    def test_jsonl(self):
+        lines = list(export_lines(self.course.id, 'jsonl'))
+        self.assertTrue(all(line.endswith('\n') for line in lines))
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row['record'] for row in rows], ['answer', 'open_attempt', 'open_attempt', 'progress'])
+        # В JSONL значения не экранируются, типы сохраняются
+        self.assertEqual(rows[0]['answer'], '=HYPERLINK("x")')
+        self.assertIs(rows[0]['is_correct'], False)
+        self.assertIsNone(rows[1]['score'])
+        self.assertEqual(rows[2]['score'], 7)
+        self.assertIn(self.student.email, lines[0])
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            export_lines(self.course.id, 'xlsx')
+
+
+class ExportViewTests(ExportTestCase):
+    def _get(self, user, **params):
+        self.client.force_login(user)
+        return self.client.get(reverse('export_course_results', args=[self.course.id]), params)
+
+    def test_editor_of_course_downloads_csv(self):
+        response = self._get(self.editor)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(
+            response['Content-Disposition'], f'attachment; filename="course_{self.course.id}_results.csv"'
+        )
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(len(list(csv.reader(StringIO(content)))), 5)
+
+    def test_jsonl_format(self):
+        response = self._get(make_user(is_superuser=True), format='jsonl')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 4)
+        self.assertEqual(self._get(self.editor, format='xlsx').status_code, 400)
+
+    def test_access_is_limited_to_course_editor(self):
+        # Не редактор уходит на страницу отказа, чужой редактор получает 403
+        response = self._get(self.student)
+        self.assertRedirects(response, reverse('access_denied'), fetch_redirect_response=False)
+        self.assertEqual(self._get(make_editor()).status_code, 403)
+        self.client.logout()
+        self.assertEqual(
+            self.client.get(reverse('export_course_results', args=[self.course.id])).status_code, 302
+        )
+
+
+class ExportCommandTests(ExportTestCase):
+    def test_writes_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'results.jsonl')
+        call_command('export_course_results', self.course.id, format='jsonl', output=path, chunk_size=1)
+        with open(path, encoding='utf-8') as output:
+            self.assertEqual(len(output.readlines()), 4)
+
+    def test_stdout_and_missing_course(self):
+        out = StringIO()
+        call_command('export_course_results', self.course.id, stdout=out)
+        self.assertIn("'=HYPERLINK", out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('export_course_results', 0)
@@ -0,0 +1,100 @@
+import ast
+from itertools import count
+
+from django.test import SimpleTestCase
+
+from ..models import LessonContent
+from ..services.grading import FormulaError, _compile_node, compile_formula, grade, parse_number
+
+_ids = count(1_000_000)
+
+
+def task(correct, answer_type='text'):
+    # Проверяющая функция кэшируется по id блока, поэтому у каждого блока свой id
+    return LessonContent(id=next(_ids), content_type='task', task_answer_type=answer_type, task_correct_answer=correct)
+
+
+class GradeTests(SimpleTestCase):
+    def test_text(self):
+        content = task('Ёлка')
+        self.assertTrue(grade(content, '  елка. '))
+        self.assertFalse(grade(content, 'ель'))
+        quiz = LessonContent(id=next(_ids), content_type='quiz', quiz_correct_answer='B')
+        self.assertTrue(grade(quiz, 'b'))
+
+    def test_number(self):
+        self.assertTrue(grade(task('0,5', 'number'), '1/2'))
+        self.assertTrue(grade(task('3.14 ± 0.01', 'number'), '3.145'))
+        self.assertFalse(grade(task('3.14 ± 0.01', 'number'), '3.2'))
+        self.assertFalse(grade(task('2', 'number'), 'x'))
+
+    def test_formula(self):
+        content = task('(x+1)^2', 'formula')
+        self.assertTrue(grade(content, 'x^2 + 2x + 1'))
+        self.assertTrue(grade(content, '(1+x)(x+1)'))
+        self.assertFalse(grade(content, 'x^2 + 1'))
+        self.assertFalse(grade(content, 'y^2 + 2y + 1'))
+        self.assertTrue(grade(task('sin(x)^2 + cos(x)^2', 'formula'), '1'))
+
+    def test_nothing_to_grade(self):
+        self.assertIsNone(grade(task(''), 'x'))
+        self.assertIsNone(grade(task('1'), None))
+        self.assertIsNone(grade(LessonContent(id=next(_ids), content_type='text'), 'x'))
+
+    def test_invalid_answer_is_wrong(self):
+        self.assertFalse(grade(task('x', 'formula'), "__import__('os')"))
+        self.assertFalse(grade(task('1', 'number'), '2**1000'))
+
+
+class SafeCompilerTests(SimpleTestCase):
+    """В формулах допустимы только числа, переменные, + - * / ^ и функции из FUNCTIONS."""
+
+    def assertRejected(self, source):
+        with self.assertRaises(FormulaError):
+            _compile_node(ast.parse(source, mode='eval'), set())
+
+    def test_disallowed_nodes(self):
+        for source in (
+            "__import__('os')",
+            'open(x)',
+            '().__class__',
+            'x.real',
+            '[1][0]',
+            '{1}',
+            "'text'",
+            'True',
+            'x < 1',
+            '(lambda: 1)()',
+            'x if x else 1',
+            'x and y',
+            'x // 2',
+            'x % 2',
+            'x @ y',
+            '~x',
+            'not x',
+            'sin(x, y)',
+            'sin(x=1)',
+            'sin',
+            '[x for x in y]',
+            'f(x)',
+        ):
+            with self.subTest(source=source):
+                self.assertRejected(source)
+
+    def test_allowed_nodes(self):
+        function = _compile_node(ast.parse('-x + 2*y - sqrt(x)/pi ** 2', mode='eval'), variables := set())
+        self.assertEqual(variables, {'x', 'y'})
+        self.assertAlmostEqual(function({'x': 4, 'y': 1}), -4 + 2 - 2 / 3.141592653589793 ** 2)
+
+    def test_compile_formula_rejects_input(self):
+        for source in ('', 'x' * 201, '1 +', "__import__('os').system('true')", 'lambda: 1'):
+            with self.subTest(source=source):
+                with self.assertRaises(FormulaError):
+                    compile_formula(source)
+
+    def test_large_exponent_is_not_evaluated(self):
+        function, _ = compile_formula('x^1000')
+        with self.assertRaises(FormulaError):
+            function({'x': 2.0})
+        with self.assertRaises(FormulaError):
+            parse_number('9^9^9')
@@ -0,0 +1,63 @@
+import json
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Lesson, LessonContent, OpenAnswerAttempt
+from .utils import make_course, make_editor, make_user
+
+
+class SaveLessonContentTests(TestCase):
+    def setUp(self):
+        self.editor = make_editor()
+        self.course = make_course(self.editor)
+        self.lesson = Lesson.objects.get(topic__course=self.course)
+        self.client.force_login(self.editor)
+
+    def _save(self, blocks):
+        response = self.client.post(
+            reverse('save_lesson_content', args=[self.lesson.id]),
+            json.dumps({'blocks': blocks}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_open_block_and_attempts_survive_save(self):
+        block = LessonContent.objects.create(
+            lesson=self.lesson, content_type='open', open_title='Вопрос',
+            open_criteria=[{'criterion': 'Полнота', 'points': 2}], open_max_attempts=2,
+        )
+        OpenAnswerAttempt.objects.create(user=make_user(), content=block, answer_text='Ответ')
+        self._save([
+            {'id': 'new_1', 'type': 'text', 'data': {'text': 'Новый текст'}},
+            {'id': block.id, 'type': 'open', 'data': {
+                'title': 'Вопрос (исправлен)', 'description': '',
+                'criteria': [{'criterion': 'Полнота', 'points': 2}], 'maxAttempts': 2,
+            }},
+        ])
+        block.refresh_from_db()
+        self.assertEqual(block.open_title, 'Вопрос (исправлен)')
+        self.assertEqual(block.order, 1)
+        self.assertEqual(OpenAnswerAttempt.objects.filter(content=block).count(), 1)
+
+    def test_unknown_block_type_is_kept(self):
+        block = LessonContent.objects.create(lesson=self.lesson, content_type='open', open_title='Вопрос')
+        self._save([{'id': block.id, 'type': 'future-type', 'data': {}}])
+        self.assertTrue(LessonContent.objects.filter(id=block.id, open_title='Вопрос').exists())
+
+    def _delete_queries(self, blocks):
+        LessonContent.objects.bulk_create(
+            [LessonContent(lesson=self.lesson, content_type='text', text='x', order=i) for i in range(blocks)]
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self._save([])
+        self.assertFalse(LessonContent.objects.filter(lesson=self.lesson).exists())
+        return len(queries)
+
+    def test_delete_does_not_scale_with_block_count(self):
+        few = self._delete_queries(2)
+        many = self._delete_queries(30)
+        self.assertEqual(few, many)
@@ -0,0 +1,93 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from ..models import Lesson, LessonContent, PurchasedLesson
+from ..services.outline import invalidate_course_outline
+from .utils import make_course, make_editor, make_user
+
+
+class LessonPayloadTests(TestCase):
+    def setUp(self):
+        self.editor = make_editor()
+        self.course = make_course(self.editor)
+        self.lesson = Lesson.objects.get(topic__course=self.course)
+        self.block = LessonContent.objects.create(
+            lesson=self.lesson, content_type='task', task_title='Задача', task_answer_type='number',
+            task_correct_answer='42', order=0,
+        )
+        self.student = make_user()
+        PurchasedLesson.objects.create(user=self.student, lesson=self.lesson)
+        self.url = reverse('lesson_payload', args=[self.lesson.id])
+
+    def _get(self, user, **headers):
+        self.client.force_login(user)
+        return self.client.get(self.url, headers=headers)
+
+    def test_access_is_denied_without_purchase(self):
+        self.assertEqual(self._get(make_user()).status_code, 403)
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_correct_answers_are_hidden_from_learners(self):
+        learner = self._get(self.student).json()
+        self.assertNotIn('correctAnswer', learner['content'][0]['data'])
+        self.assertNotIn(b'42', self._get(self.student).content)
+
+        editor = self._get(self.editor).json()
+        self.assertEqual(editor['content'][0]['data']['correctAnswer'], '42')
+        self.assertEqual(self._get(make_user(is_superuser=True)).json()['content'][0]['data']['correctAnswer'], '42')
+
+    def test_if_none_match_returns_304(self):
+        response = self._get(self.student)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        revalidated = self._get(self.student, if_none_match=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.content, b'')
+        self.assertEqual(self._get(self.student, if_none_match='"stale"').status_code, 200)
+        # У ученика и редактора разные тела — и разные ETag
+        self.assertNotEqual(self._get(self.editor)['ETag'], response['ETag'])
+
+    def test_if_modified_since(self):
+        last_modified = self._get(self.student)['Last-Modified']
+        self.assertEqual(self._get(self.student, if_modified_since=last_modified).status_code, 304)
+        earlier = http_date((timezone.now() - timedelta(days=1)).timestamp())
+        self.assertEqual(self._get(self.student, if_modified_since=earlier).status_code, 200)
+
+    def test_last_modified_is_stable_across_cache_rebuilds(self):
+        first = self._get(self.student)
+        cache.clear()
+        later = timezone.now() + timedelta(hours=1)
+        with mock.patch('accounts.services.lesson_payload.timezone.now', return_value=later):
+            rebuilt = self._get(self.student)
+        self.assertEqual((rebuilt['ETag'], rebuilt['Last-Modified']), (first['ETag'], first['Last-Modified']))
+        self.lesson.refresh_from_db()
+        self.assertEqual(len(self.lesson.content_hash), 64)
+
+    def test_content_change_moves_etag_and_last_modified(self):
+        first = self._get(self.student)
+        later = timezone.now() + timedelta(hours=1)
+        LessonContent.objects.filter(id=self.block.id).update(task_title='Другая задача')
+        invalidate_course_outline(self.course.id)
+        with mock.patch('accounts.services.lesson_payload.timezone.now', return_value=later):
+            changed = self._get(self.student)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+        self.assertEqual(changed['Last-Modified'], http_date(later.replace(microsecond=0).timestamp()))
+        self.assertEqual(self._get(self.student, if_none_match=first['ETag']).status_code, 200)
+
+    def test_answer_change_moves_last_modified_for_learners_too(self):
+        first = self._get(self.student)
+        later = timezone.now() + timedelta(hours=1)
+        LessonContent.objects.filter(id=self.block.id).update(task_correct_answer='43')
+        invalidate_course_outline(self.course.id)
+        with mock.patch('accounts.services.lesson_payload.timezone.now', return_value=later):
+            changed = self._get(self.student)
+        # Тело ученика не изменилось, но содержимое урока — да
+        self.assertEqual(changed['ETag'], first['ETag'])
+        self.assertNotEqual(changed['Last-Modified'], first['Last-Modified'])
@@ -0,0 +1,382 @@
+import json
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+from PIL import Image
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from educational_platform.media import IMMUTABLE_MAX_AGE
+
+from ..models import Lesson, LessonContent, LessonPdfPage, PurchasedLesson
+from ..services import images, pdf_preview
+from ..services.media import collect_garbage
+from ..services.search import search
+from ..storage import content_storage
+from .utils import make_course, make_editor, make_user
+
+
+def _png(color='red'):
+    buffer = BytesIO()
+    Image.new('RGB', (800, 400), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def _pdf(*texts):
+    """PDF со страницей на каждый текст (латиница: шрифт Helvetica без кодировки)."""
+    writer = PdfWriter()
+    for text in texts:
+        page = writer.add_blank_page(612, 792)
+        font = DictionaryObject({
+            NameObject('/Type'): NameObject('/Font'),
+            NameObject('/Subtype'): NameObject('/Type1'),
+            NameObject('/BaseFont'): NameObject('/Helvetica'),
+        })
+        page[NameObject('/Resources')] = DictionaryObject({
+            NameObject('/Font'): DictionaryObject({NameObject('/F1'): writer._add_object(font)}),
+        })
+        stream = DecodedStreamObject()
+        stream.set_data(f'BT /F1 24 Tf 72 720 Td ({text}) Tj ET'.encode())
+        page[NameObject('/Contents')] = writer._add_object(stream)
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+class MediaTestCase(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.editor = make_editor()
+        self.lesson = Lesson.objects.get(topic__course=make_course(self.editor))
+
+    def _task(self, data, name='task.png'):
+        return LessonContent.objects.create(
+            lesson=self.lesson, content_type='task', task_image=content_storage.save(name, ContentFile(data))
+        )
+
+
+class ImageRenditionTests(MediaTestCase):
+    def test_builds_renditions(self):
+        content = self._task(_png())
+        self.assertTrue(images.process_content_images(content.id))
+        content.refresh_from_db()
+        renditions = content.image_renditions['task_image']
+        self.assertEqual(set(renditions['webp']), {'320', '640', '800'})
+        self.assertTrue(content.task_image_sources)
+
+    def test_undecodable_image_is_not_retried(self):
+        content = self._task(b'not an image', name='broken.png')
+        self.assertTrue(images.needs_renditions(content))
+        with self.assertLogs('accounts.services.images', 'ERROR'):
+            images.process_content_images(content.id)
+        content.refresh_from_db()
+        self.assertEqual(content.image_renditions['task_image']['source'], content.task_image.name)
+        self.assertIn('error', content.image_renditions['task_image'])
+        self.assertIsNone(content.task_image_sources)
+
+        with mock.patch.object(images, 'build_renditions') as build:
+            self.assertFalse(images.process_content_images(content.id))
+            self.assertEqual(images.pending_image_contents(), [])
+        build.assert_not_called()
+
+
+class PdfPreviewTests(MediaTestCase):
+    def _pdf_block(self, data, name='notes.pdf'):
+        return LessonContent.objects.create(
+            lesson=self.lesson, content_type='pdf', pdf_file=content_storage.save(name, ContentFile(data))
+        )
+
+    def test_extracts_page_count_and_text(self):
+        content = self._pdf_block(_pdf('Discriminant formula', 'Vieta theorem'))
+        self.assertTrue(pdf_preview.needs_pdf_preview(content))
+        self.assertTrue(pdf_preview.process_pdf_preview(content.id))
+        content.refresh_from_db()
+        self.assertEqual(content.pdf_preview['source'], content.pdf_file.name)
+        self.assertEqual(content.pdf_preview['pages'], 2)
+        self.assertEqual(content.pdf_preview['excerpt'], 'Discriminant formula')
+        # Картинок на странице нет — превью только текстовое
+        self.assertIsNone(content.pdf_preview['thumbnail'])
+        self.assertEqual(
+            list(LessonPdfPage.objects.filter(content=content).values_list('number', 'text')),
+            [(1, 'Discriminant formula'), (2, 'Vieta theorem')],
+        )
+        self.assertFalse(pdf_preview.process_pdf_preview(content.id))
+
+    def test_page_text_feeds_search(self):
+        content = self._pdf_block(_pdf('Intro', 'Discriminant formula'))
+        pdf_preview.process_pdf_preview(content.id)
+        found = [(document.kind, document.object_id) for document, _ in search('discriminant', user=self.editor)]
+        self.assertEqual(found, [('content', content.id)])
+
+    def test_thumbnail_from_first_page_image(self):
+        buffer = BytesIO()
+        Image.new('RGB', (800, 1000), 'blue').save(buffer, 'PDF')
+        content = self._pdf_block(buffer.getvalue(), name='scan.pdf')
+        pdf_preview.process_pdf_preview(content.id)
+        content.refresh_from_db()
+        thumbnail = content.pdf_preview['thumbnail']
+        self.assertTrue(thumbnail.startswith(f'pdf_previews/{content.pdf_preview["hash"][:2]}/'))
+        with default_storage.open(thumbnail) as file, Image.open(file) as image:
+            self.assertEqual((image.format, image.width), ('JPEG', settings.PDF_THUMBNAIL_WIDTH))
+
+    def test_twin_is_reused_by_hash(self):
+        data = _pdf('Discriminant formula')
+        first = self._pdf_block(data)
+        pdf_preview.process_pdf_preview(first.id)
+        first.refresh_from_db()
+
+        second = self._pdf_block(data, name='copy.pdf')
+        with mock.patch.object(pdf_preview, 'extract_pdf_preview') as extract:
+            self.assertTrue(pdf_preview.process_pdf_preview(second.id))
+        extract.assert_not_called()
+        second.refresh_from_db()
+        self.assertEqual(second.pdf_preview, first.pdf_preview)
+        self.assertEqual(
+            list(LessonPdfPage.objects.filter(content=second).values_list('text', flat=True)), ['Discriminant formula']
+        )
+
+    def test_broken_file_is_not_retried(self):
+        content = self._pdf_block(b'not a pdf', name='broken.pdf')
+        with self.assertLogs('accounts.services.pdf_preview', 'ERROR'), self.assertLogs('pypdf', 'WARNING'):
+            self.assertFalse(pdf_preview.process_pdf_preview(content.id))
+        content.refresh_from_db()
+        self.assertEqual(content.pdf_preview['source'], content.pdf_file.name)
+        self.assertIn('error', content.pdf_preview)
+        self.assertFalse(LessonPdfPage.objects.filter(content=content).exists())
+
+        with mock.patch.object(pdf_preview, 'extract_pdf_preview') as extract:
+            self.assertFalse(pdf_preview.process_pdf_preview(content.id))
+            self.assertEqual(pdf_preview.pending_pdf_contents(), [])
+        extract.assert_not_called()
+
+    def test_saved_block_is_processed_in_background(self):
+        executor = mock.Mock()
+        executor.submit.side_effect = lambda job, *args: job(*args)
+        # Задача выполняется сразу; соединения теста не закрываем
+        with mock.patch.object(pdf_preview, '_get_executor', return_value=executor), \
+                mock.patch.object(pdf_preview, 'connections'):
+            with self.captureOnCommitCallbacks(execute=True):
+                content = self._pdf_block(_pdf('Discriminant formula'))
+        executor.submit.assert_called_once_with(pdf_preview._run_job, content.id)
+        content.refresh_from_db()
+        self.assertEqual(content.pdf_preview['pages'], 1)
+
+
+class CollectGarbageTests(MediaTestCase):
+    def test_unreferenced_renditions_are_collected(self):
+        kept = self._task(_png('red'))
+        dropped = self._task(_png('blue'))
+        images.process_content_images(kept.id)
+        images.process_content_images(dropped.id)
+        kept.refresh_from_db()
+        dropped.refresh_from_db()
+        kept_files = [kept.task_image.name, *kept.image_renditions['task_image']['webp'].values()]
+        dropped_files = [dropped.task_image.name, *dropped.image_renditions['task_image']['jpeg'].values()]
+
+        dropped.delete()
+        removed, _ = collect_garbage(grace_seconds=0)
+
+        # Картинка и по три копии в WebP и JPEG
+        self.assertEqual(removed, 7)
+        for name in kept_files:
+            self.assertTrue(default_storage.exists(name), name)
+        for name in dropped_files:
+            self.assertFalse(default_storage.exists(name), name)
+
+    def test_grace_period_keeps_fresh_renditions(self):
+        content = self._task(_png())
+        images.process_content_images(content.id)
+        content.delete()
+        self.assertEqual(collect_garbage(grace_seconds=60 * 60), (0, 0))
+
+
+class MediaAccessTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.buyer = make_user()
+        PurchasedLesson.objects.create(user=self.buyer, lesson=self.lesson)
+        self.content = self._task(_png())
+        images.process_content_images(self.content.id)
+        self.content.refresh_from_db()
+
+    def _get(self, user, name):
+        self.client.logout()
+        if user is not None:
+            self.client.force_login(user)
+        response = self.client.get(settings.MEDIA_URL + name)
+        if response.streaming:
+            # Дочитываем ответ: так тестовый клиент закрывает файл
+            response.getvalue()
+        return response
+
+    def test_lesson_file_requires_access(self):
+        name = self.content.task_image.name
+        self.assertEqual(self._get(None, name).status_code, 403)
+        self.assertEqual(self._get(make_user(), name).status_code, 403)
+        for user in (self.buyer, self.editor, make_user(is_superuser=True)):
+            with self.subTest(user=user):
+                response = self._get(user, name)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response['Cache-Control'].startswith('private,'))
+                self.assertIn('Cookie', response['Vary'])
+
+    def test_field_stored_as_url(self):
+        LessonContent.objects.filter(id=self.content.id).update(
+            task_image=settings.MEDIA_URL + self.content.task_image.name
+        )
+        self.assertEqual(self._get(self.buyer, self.content.task_image.name).status_code, 200)
+
+    def test_renditions_are_public(self):
+        rendition = self.content.image_renditions['task_image']['webp']['320']
+        response = self._get(None, rendition)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], f'public, max-age={IMMUTABLE_MAX_AGE}, immutable')
+        # Путь через renditions/ не открывает файлы из других каталогов
+        self.assertEqual(self._get(None, f'renditions/../{self.content.task_image.name}').status_code, 403)
+
+    def test_unreferenced_file_is_visible_to_editors_only(self):
+        name = content_storage.save('draft.png', ContentFile(_png('green')))
+        self.assertEqual(self._get(self.buyer, name).status_code, 403)
+        self.assertEqual(self._get(self.editor, name).status_code, 200)
+
+    def test_file_saved_into_block_opens_immediately(self):
+        name = content_storage.save('draft.png', ContentFile(_png('green')))
+        # Отказ по ещё ничейному файлу не кэшируется
+        self.assertEqual(self._get(self.buyer, name).status_code, 403)
+        LessonContent.objects.create(lesson=self.lesson, content_type='task', task_image=name)
+        self.assertEqual(self._get(self.buyer, name).status_code, 200)
+
+    def test_saving_block_resets_cached_access(self):
+        name = content_storage.save('shared.png', ContentFile(_png('green')))
+        other_lesson = Lesson.objects.get(topic__course=make_course(make_editor()))
+        other_buyer = make_user()
+        PurchasedLesson.objects.create(user=other_buyer, lesson=other_lesson)
+        LessonContent.objects.create(lesson=other_lesson, content_type='task', task_image=name)
+        self.assertEqual(self._get(other_buyer, name).status_code, 200)
+        self.assertEqual(self._get(self.buyer, name).status_code, 403)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            LessonContent.objects.create(lesson=self.lesson, content_type='open', open_image=name)
+        self.assertEqual(self._get(self.buyer, name).status_code, 200)
+
+    def test_lesson_editor_resets_replaced_files(self):
+        old_name = self.content.task_image.name
+        new_name = content_storage.save('new.png', ContentFile(_png('green')))
+        self.assertEqual(self._get(self.buyer, old_name).status_code, 200)
+
+        self.client.force_login(self.editor)
+        body = {'blocks': [{'id': self.content.id, 'type': 'task', 'data': {'image': new_name}}]}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('save_lesson_content', args=[self.lesson.id]), json.dumps(body), content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 200)
+        # bulk_update не отправляет сигналов: кэш старого файла сбрасывает сам редактор
+        self.assertEqual(self._get(self.buyer, old_name).status_code, 403)
+        self.assertEqual(self._get(self.buyer, new_name).status_code, 200)
+
+
+class ServeMediaTests(MediaTestCase):
+    DATA = bytes(range(256)) * 40
+
+    def setUp(self):
+        super().setUp()
+        # Аватары публичны: проверяем отдачу без прав доступа
+        self.name = default_storage.save('avatars/data.bin', ContentFile(self.DATA))
+        self.url = settings.MEDIA_URL + self.name
+
+    def _get(self, url=None, **headers):
+        response = self.client.get(url or self.url, headers=headers)
+        body = response.getvalue() if response.streaming else response.content
+        return response, body
+
+    def test_full_file(self):
+        response, body = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.DATA)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}')
+
+    def test_ranges(self):
+        size = len(self.DATA)
+        for header, start, end in (
+            ('bytes=100-199', 100, 199),
+            ('bytes=-500', size - 500, size - 1),
+            ('bytes=10000-', 10000, size - 1),
+            ('bytes=10000-99999', 10000, size - 1),
+        ):
+            with self.subTest(header=header):
+                response, body = self._get(range=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response['Content-Range'], f'bytes {start}-{end}/{size}')
+                self.assertEqual(response['Content-Length'], str(end - start + 1))
+                self.assertEqual(body, self.DATA[start:end + 1])
+
+    def test_unsatisfiable_range(self):
+        for header in (f'bytes={len(self.DATA)}-', 'bytes=-0', 'bytes=500-100'):
+            with self.subTest(header=header):
+                response, _ = self._get(range=header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response['Content-Range'], f'bytes */{len(self.DATA)}')
+
+    def test_unsupported_range_returns_whole_file(self):
+        for header in ('bytes=0-1,5-6', 'items=0-5'):
+            with self.subTest(header=header):
+                response, body = self._get(range=header)
+                self.assertEqual((response.status_code, body), (200, self.DATA))
+
+    def test_if_range(self):
+        response, _ = self._get()
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(self._get(range='bytes=0-9', if_range=etag)[0].status_code, 206)
+        self.assertEqual(self._get(range='bytes=0-9', if_range=last_modified)[0].status_code, 206)
+        # Файл изменился с тех пор: вместо диапазона весь файл
+        stale, body = self._get(range='bytes=0-9', if_range='"stale"')
+        self.assertEqual((stale.status_code, body), (200, self.DATA))
+        earlier = http_date(os.stat(default_storage.path(self.name)).st_mtime - 3600)
+        self.assertEqual(self._get(range='bytes=0-9', if_range=earlier)[0].status_code, 200)
+
+    def test_not_modified(self):
+        response, _ = self._get()
+        self.assertEqual(self._get(if_none_match=response['ETag'])[0].status_code, 304)
+        self.assertEqual(self._get(if_modified_since=response['Last-Modified'])[0].status_code, 304)
+        self.assertEqual(self._get(if_none_match='"stale"')[0].status_code, 200)
+
+    def test_head_and_methods(self):
+        response = self.client.head(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Length'], str(len(self.DATA)))
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+        self.assertEqual(self._get(settings.MEDIA_URL + 'avatars/missing.bin')[0].status_code, 404)
+
+    def test_sendfile(self):
+        content = LessonContent.objects.create(
+            lesson=self.lesson, content_type='pdf', pdf_file=content_storage.save('notes.pdf', ContentFile(b'%PDF'))
+        )
+        name = content.pdf_file.name
+        self.client.force_login(make_user(is_superuser=True))
+        with override_settings(MEDIA_SENDFILE='x-sendfile'):
+            response, body = self._get(settings.MEDIA_URL + name)
+            self.assertEqual(response['X-Sendfile'], os.path.join(settings.MEDIA_ROOT, name))
+            self.assertEqual(body, b'')
+            # Остальные файлы Django отдаёт сам
+            self.assertNotIn('X-Sendfile', self._get()[0])
+        with override_settings(MEDIA_SENDFILE='x-accel-redirect', MEDIA_ACCEL_REDIRECT_PREFIX='/protected/'):
+            response, body = self._get(settings.MEDIA_URL + name)
+            self.assertEqual(response['X-Accel-Redirect'], '/protected/' + name)
+            self.assertEqual(response['Content-Type'], 'application/pdf')
+            self.assertEqual(response['Cache-Control'], f'private, max-age={IMMUTABLE_MAX_AGE}, immutable')
@@ -0,0 +1,58 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .utils import make_course, make_editor, make_user
+
+
+class CourseOutlineQueryCountTests(TestCase):
+    """Число запросов страниц курса не зависит от числа тем, уроков и блоков."""
+
+    def setUp(self):
+        self.editor = make_editor()
+        self.learner = make_user()
+
+    def _course_detail_queries(self, course):
+        self.client.force_login(self.learner)
+        cache.clear()
+        with self.assertNumQueries(COURSE_DETAIL_QUERIES):
+            response = self.client.get(reverse('course_detail_user', args=[course.id]))
+        self.assertEqual(response.status_code, 200)
+
+    def _step3_queries(self, course):
+        self.client.force_login(self.editor)
+        session = self.client.session
+        session['course_id'] = course.id
+        session.save()
+        cache.clear()
+        with self.assertNumQueries(STEP3_QUERIES):
+            response = self.client.get(reverse('step3'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_course_detail_small_course(self):
+        self._course_detail_queries(make_course(self.editor, topics=2, lessons_per_topic=2))
+
+    def test_course_detail_large_course(self):
+        self._course_detail_queries(make_course(self.editor, topics=40, lessons_per_topic=5))
+
+    def test_step3_small_course(self):
+        self._step3_queries(make_course(self.editor, topics=2, lessons_per_topic=2, blocks_per_lesson=2))
+
+    def test_step3_large_course(self):
+        self._step3_queries(make_course(self.editor, topics=40, lessons_per_topic=5, blocks_per_lesson=3))
+
+    def test_cached_outline_skips_structure_queries(self):
+        course = make_course(self.editor, topics=10, lessons_per_topic=3)
+        self.client.force_login(self.learner)
+        self.client.get(reverse('course_detail_user', args=[course.id]))
+        with self.assertNumQueries(COURSE_DETAIL_CACHED_QUERIES):
+            self.client.get(reverse('course_detail_user', args=[course.id]))
+
+
+# Сессия, пользователь, курс (теги — из строки tags), структура (темы + уроки),
+# купленные уроки, баланс токенов для шапки
+COURSE_DETAIL_QUERIES = 7
+# Структура и баланс уже в кэше
+COURSE_DETAIL_CACHED_QUERIES = 4
+# Сессия, пользователь, курс, структура с блоками (темы + уроки + блоки)
+STEP3_QUERIES = 6
@@ -0,0 +1,151 @@
+import base64
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.html import escape
+
+from ..models import Course
+from ..services.pagination import InvalidCursor, paginate_keyset
+from ..views.courses import COURSES_PER_PAGE
+from .utils import make_editor, make_user
+
+
+def _course(editor, **fields):
+    values = {'title': 'Курс', 'subject': 'math', 'tags': 'алгебра', 'level': 'easy'}
+    values.update(fields)
+    return Course.objects.create(editor=editor, **values)
+
+
+class PaginateKeysetTests(TestCase):
+    def setUp(self):
+        editor = make_editor()
+        levels = ['easy', 'medium', 'hard']
+        # Уровни повторяются: порядок по level неоднозначен без id
+        self.courses = [_course(editor, level=levels[number % 3]) for number in range(25)]
+
+    def _walk(self, ordering, page_size):
+        """Проходит выдачу вперёд до конца и обратно до начала, возвращает страницы."""
+        queryset = Course.objects.all()
+        forward = [paginate_keyset(queryset, ordering, None, page_size)]
+        while forward[-1].has_next():
+            forward.append(paginate_keyset(queryset, ordering, forward[-1].next_cursor, page_size))
+        backward = [forward[-1]]
+        while backward[-1].has_previous():
+            backward.append(paginate_keyset(queryset, ordering, backward[-1].previous_cursor, page_size))
+        return forward, backward[::-1]
+
+    def _ids(self, pages):
+        return [[course.id for course in page] for page in pages]
+
+    def test_forward_and_backward_cover_every_row_once(self):
+        forward, backward = self._walk(['id'], 10)
+        expected = [course.id for course in self.courses]
+        self.assertEqual(self._ids(forward), [expected[:10], expected[10:20], expected[20:]])
+        self.assertEqual(self._ids(backward), self._ids(forward))
+
+    def test_page_boundaries(self):
+        first, *_, last = self._walk(['id'], 10)[0]
+        self.assertFalse(first.has_previous())
+        self.assertIsNone(first.previous_cursor)
+        self.assertTrue(first.has_next())
+        self.assertTrue(last.has_previous())
+        self.assertFalse(last.has_next())
+        self.assertIsNone(last.next_cursor)
+
+        # Ровно page_size строк — следующей страницы нет
+        exact = paginate_keyset(Course.objects.all(), ['id'], None, 25)
+        self.assertEqual((len(exact), exact.has_next(), exact.next_cursor), (25, False, None))
+        empty = paginate_keyset(Course.objects.none(), ['id'], None, 10)
+        self.assertEqual((len(empty), empty.has_other_pages()), (0, False))
+
+    def test_ties_on_non_unique_key(self):
+        for ordering in (['level', 'id'], ['-level', 'id'], ['level', '-id']):
+            with self.subTest(ordering=ordering):
+                expected = list(Course.objects.order_by(*ordering).values_list('id', flat=True))
+                # Размер страницы 4 режет группы одинаковых уровней посередине
+                forward, backward = self._walk(ordering, 4)
+                self.assertEqual(sum(self._ids(forward), []), expected)
+                self.assertEqual(self._ids(backward), self._ids(forward))
+
+    def test_invalid_cursor_is_rejected(self):
+        valid = paginate_keyset(Course.objects.all(), ['id'], None, 10).next_cursor
+
+        def encode(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+        for cursor in (
+            'мусор',
+            'not-base64!',
+            valid[:-3],
+            encode({'v': [1], 'd': 'sideways'}),
+            encode({'v': [1, 2], 'd': 'next'}),
+            encode({'v': ['abc'], 'd': 'next'}),
+            encode([1]),
+        ):
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(InvalidCursor):
+                    paginate_keyset(Course.objects.all(), ['id'], cursor, 10)
+
+
+class CourseCatalogTests(TestCase):
+    def setUp(self):
+        self.editor = make_editor()
+        self.other_editor = make_editor()
+        self.client.force_login(make_user(is_superuser=True))
+        self.url = reverse('course_list_superuser')
+
+    def _ids(self, response):
+        return [course.id for course in response.context['courses']]
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        courses = [_course(self.editor) for _ in range(COURSES_PER_PAGE + 3)]
+        response = self.client.get(self.url, {'cursor': 'подделка'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._ids(response), [course.id for course in courses[:COURSES_PER_PAGE]])
+        self.assertFalse(response.context['courses'].has_previous())
+
+    def test_filters(self):
+        algebra = _course(self.editor, tags='Алгебра, Геометрия')
+        physics = _course(self.editor, subject='phys', level='hard', tags='механика')
+        published = _course(self.other_editor, tags='алгебра', is_draft=False, is_approved=True)
+
+        for params, expected in (
+            ({'subject': 'phys'}, [physics]),
+            ({'level': 'hard'}, [physics]),
+            ({'is_draft': 'false'}, [published]),
+            ({'is_approved': '0'}, [algebra, physics]),
+            ({'editor': str(self.other_editor.id)}, [published]),
+            ({'tag': '  АЛГЕБРА '}, [algebra, published]),
+            ({'tag': 'геометрия', 'subject': 'math'}, [algebra]),
+            ({'tag': 'нет такого'}, []),
+            # Некорректные значения игнорируются
+            ({'subject': 'chem', 'level': 'x', 'is_draft': 'maybe', 'editor': 'abc'}, [algebra, physics, published]),
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(self._ids(self.client.get(self.url, params)), [course.id for course in expected])
+
+    def test_tag_filter_follows_course_edits(self):
+        course = _course(self.editor, tags='алгебра')
+        course.tags = 'геометрия'
+        course.save()
+        self.assertEqual(self._ids(self.client.get(self.url, {'tag': 'алгебра'})), [])
+        self.assertEqual(self._ids(self.client.get(self.url, {'tag': 'геометрия'})), [course.id])
+
+    def test_filters_survive_in_cursor_links(self):
+        tagged = [_course(self.editor, subject='eco', tags='финансы') for _ in range(COURSES_PER_PAGE + 2)]
+        _course(self.editor, subject='eco', tags='налоги')
+        params = {'subject': 'eco', 'tag': 'финансы'}
+
+        first = self.client.get(self.url, params)
+        page = first.context['courses']
+        self.assertEqual(first.context['filter_query'], 'subject=eco&tag=%D1%84%D0%B8%D0%BD%D0%B0%D0%BD%D1%81%D1%8B')
+        self.assertContains(first, f'?{escape(first.context["filter_query"])}&cursor={page.next_cursor}')
+
+        second = self.client.get(self.url, {**params, 'cursor': page.next_cursor})
+        self.assertEqual(self._ids(second), [course.id for course in tagged[COURSES_PER_PAGE:]])
+        # В ссылках второй страницы старый курсор не дублируется
+        self.assertEqual(second.context['filter_query'], first.context['filter_query'])
+        self.assertContains(
+            second, f'?{escape(first.context["filter_query"])}&cursor={second.context["courses"].previous_cursor}'
+        )
@@ -0,0 +1,113 @@
+import json
+from importlib import import_module
+
+from django.apps import apps
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Lesson, LessonContent, LessonProgress, LessonStats, PurchasedLesson
+from ..services.analytics import refresh_lesson_stats
+from .utils import make_course, make_editor, make_user
+
+
+class AnswerableProgressTests(TestCase):
+    """Текст, PDF и видео не входят в total_blocks: урок проходится ответами."""
+
+    def setUp(self):
+        self.lesson = Lesson.objects.get(topic__course=make_course(make_editor(), blocks_per_lesson=2))
+        LessonContent.objects.create(lesson=self.lesson, content_type='video', order=2)
+        self.quiz = LessonContent.objects.create(
+            lesson=self.lesson, content_type='quiz', quiz_question='2+2?', quiz_correct_answer='4', order=3
+        )
+        self.task = LessonContent.objects.create(
+            lesson=self.lesson, content_type='task', task_answer_type='number', task_correct_answer='5', order=4
+        )
+        self.student = make_user()
+        PurchasedLesson.objects.create(user=self.student, lesson=self.lesson)
+        self.client.force_login(self.student)
+
+    def _answer(self, answers):
+        response = self.client.post(
+            reverse('save_answers_batch'), json.dumps({'answers': answers}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_answering_every_question_completes_lesson(self):
+        data = self._answer([
+            {'block_id': self.quiz.id, 'answer': '4'},
+            {'block_id': self.task.id, 'answer': '5'},
+        ])
+        self.assertEqual(data['progress'], {str(self.lesson.id): 100})
+        progress = LessonProgress.objects.get(user=self.student, lesson=self.lesson)
+        self.assertEqual((progress.completed_count, progress.total_blocks), (2, 2))
+        self.assertTrue(progress.is_completed)
+
+        refresh_lesson_stats([self.lesson.id])
+        stats = LessonStats.objects.get(lesson=self.lesson)
+        self.assertEqual((stats.learners, stats.completed), (1, 1))
+
+    def test_text_blocks_do_not_count(self):
+        self._answer([{'block_id': self.quiz.id, 'answer': '4'}])
+        text = LessonContent.objects.filter(lesson=self.lesson, content_type='text').first()
+        response = self.client.post(
+            reverse('save_answer'),
+            json.dumps({'block_id': text.id, 'block_type': 'text', 'answer': 'прочитано'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.json()['progress'], 50)
+
+    def test_refresh_counters_ignores_new_text_blocks(self):
+        self._answer([{'block_id': self.quiz.id, 'answer': '4'}])
+        with self.captureOnCommitCallbacks(execute=True):
+            LessonContent.objects.create(lesson=self.lesson, content_type='text', text='Ещё текст', order=5)
+            LessonContent.objects.create(lesson=self.lesson, content_type='open', open_title='Вопрос', order=6)
+        progress = LessonProgress.objects.get(user=self.student, lesson=self.lesson)
+        self.assertEqual((progress.completed_count, progress.total_blocks), (1, 3))
+
+    def test_single_answers_complete_lesson(self):
+        for block, answer, completed in ((self.quiz, '4', False), (self.task, '5', True)):
+            response = self.client.post(
+                reverse('save_answer'),
+                json.dumps({'block_id': block.id, 'block_type': block.content_type, 'answer': answer}),
+                content_type='application/json',
+            )
+            self.assertEqual(response.status_code, 200, response.content)
+            progress = LessonProgress.objects.get(user=self.student, lesson=self.lesson)
+            self.assertEqual(progress.is_completed, completed)
+
+    def test_changing_block_type_refreshes_counters(self):
+        self._answer([
+            {'block_id': self.quiz.id, 'answer': '4'},
+            {'block_id': self.task.id, 'answer': '5'},
+        ])
+        text = LessonContent.objects.filter(lesson=self.lesson, content_type='text').first()
+
+        # Текстовый блок стал задачей: урок больше не пройден
+        text.content_type = 'task'
+        with self.captureOnCommitCallbacks(execute=True):
+            text.save()
+        progress = LessonProgress.objects.get(user=self.student, lesson=self.lesson)
+        self.assertEqual((progress.completed_count, progress.total_blocks, progress.is_completed), (2, 3, False))
+
+        text.content_type = 'text'
+        with self.captureOnCommitCallbacks(execute=True):
+            text.save()
+        progress = LessonProgress.objects.get(user=self.student, lesson=self.lesson)
+        self.assertEqual((progress.completed_count, progress.total_blocks, progress.is_completed), (2, 2, True))
+
+    def test_migration_fills_is_completed(self):
+        self._answer([
+            {'block_id': self.quiz.id, 'answer': '4'},
+            {'block_id': self.task.id, 'answer': '5'},
+        ])
+        # Значения до миграции: поле не обновлялось или выставлено вручную
+        LessonProgress.objects.filter(user=self.student).update(is_completed=False)
+        other = LessonProgress.objects.create(user=make_user(), lesson=self.lesson, is_completed=True)
+
+        migration = import_module('accounts.migrations.0020_lessonprogress_is_completed')
+        migration.fill_is_completed(apps, None)
+        self.assertEqual(
+            dict(LessonProgress.objects.values_list('user_id', 'is_completed')),
+            {self.student.id: True, other.user_id: False},
+        )
@@ -0,0 +1,129 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Lesson, PurchasedLesson, TokenPurchase
+from ..views.clear_token_history import HISTORY_PAGE_SIZE, MAX_HISTORY_PAGE_SIZE
+from .utils import make_course, make_editor, make_user
+
+
+class HistoryPagingMixin:
+    """Общие проверки для обеих историй; url, items, key и _expected задаёт наследник."""
+    url = None
+    items = None
+    key = None
+
+    def _get(self, **params):
+        response = self.client.get(reverse(self.url), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def _walk(self, page_size):
+        pages = [self._get(page_size=page_size)]
+        while pages[-1]['next_cursor']:
+            pages.append(self._get(page_size=page_size, cursor=pages[-1]['next_cursor']))
+        backward = [pages[-1]]
+        while backward[-1]['previous_cursor']:
+            backward.append(self._get(page_size=page_size, cursor=backward[-1]['previous_cursor']))
+        return pages, backward[::-1]
+
+    def test_response_shape(self):
+        data = self._get()
+        self.assertEqual(set(data), {self.items, 'next_cursor', 'previous_cursor'})
+        self.assertEqual(len(data[self.items]), HISTORY_PAGE_SIZE)
+        self.assertIsNone(data['previous_cursor'])
+        self.assertIsNotNone(data['next_cursor'])
+
+    def test_pages_have_no_duplicates_or_gaps(self):
+        forward, backward = self._walk(page_size=7)
+        rows = [row for page in forward for row in page[self.items]]
+        self.assertEqual([row[self.key] for row in rows], self._expected())
+        self.assertEqual(backward, forward)
+        # Новые записи сверху
+        dates = [row['date'] for row in rows]
+        self.assertEqual(dates, sorted(dates, reverse=True))
+
+    def test_page_size_is_capped(self):
+        self.assertEqual(len(self._get(page_size=1000)[self.items]), MAX_HISTORY_PAGE_SIZE)
+        self.assertEqual(len(self._get(page_size=0)[self.items]), 1)
+        self.assertEqual(len(self._get(page_size='abc')[self.items]), HISTORY_PAGE_SIZE)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse(self.url), {'cursor': 'подделка'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_other_users_rows_are_hidden(self):
+        self.client.force_login(self.other)
+        data = self._get(page_size=MAX_HISTORY_PAGE_SIZE)
+        self.assertEqual(len(data[self.items]), 1)
+        self.assertIsNone(data['next_cursor'])
+
+    def test_anonymous_is_redirected(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse(self.url)).status_code, 302)
+
+
+class PurchaseHistoryTests(HistoryPagingMixin, TestCase):
+    url = 'get_purchase_history'
+    items = 'history'
+    key = 'amount'
+    total = 110
+
+    def setUp(self):
+        self.user = make_user()
+        self.other = make_user()
+        now = timezone.now()
+        purchases = TokenPurchase.objects.bulk_create(
+            TokenPurchase(user=self.user, amount=number + 1, price=number) for number in range(self.total)
+        )
+        for number, purchase in enumerate(purchases):
+            # По три покупки с одинаковым временем: порядок внутри группы задаёт id
+            purchase.purchased_at = now - timedelta(minutes=number // 3)
+        TokenPurchase.objects.bulk_update(purchases, ['purchased_at'])
+        TokenPurchase.objects.create(user=self.other, amount=1, price=1)
+        self.client.force_login(self.user)
+
+    def _expected(self):
+        purchases = TokenPurchase.objects.filter(user=self.user).order_by('-purchased_at', '-id')
+        return list(purchases.values_list('amount', flat=True))
+
+    def test_rows(self):
+        row = self._get(page_size=1)['history'][0]
+        self.assertEqual(set(row), {'amount', 'price', 'date'})
+        # Среди одновременных покупок первой идёт последняя созданная
+        self.assertEqual(row['amount'], 3)
+
+
+class PurchasedLessonsTests(HistoryPagingMixin, TestCase):
+    url = 'get_purchased_lessons'
+    items = 'lessons'
+    key = 'lesson_id'
+    total = 105
+
+    def setUp(self):
+        self.user = make_user()
+        self.other = make_user()
+        self.course = make_course(make_editor(), topics=1, lessons_per_topic=self.total)
+        lessons = list(Lesson.objects.filter(topic__course=self.course).order_by('id'))
+        now = timezone.now()
+        purchases = PurchasedLesson.objects.bulk_create(
+            PurchasedLesson(user=self.user, lesson=lesson) for lesson in lessons
+        )
+        for number, purchase in enumerate(purchases):
+            purchase.purchased_at = now - timedelta(minutes=number // 3)
+        PurchasedLesson.objects.bulk_update(purchases, ['purchased_at'])
+        PurchasedLesson.objects.create(user=self.other, lesson=lessons[0])
+        self.client.force_login(self.user)
+
+    def _expected(self):
+        purchases = PurchasedLesson.objects.filter(user=self.user).order_by('-purchased_at', '-id')
+        return list(purchases.values_list('lesson_id', flat=True))
+
+    def test_rows(self):
+        row = self._get(page_size=1)['lessons'][0]
+        lesson = Lesson.objects.filter(topic__course=self.course).order_by('id')[2]
+        self.assertEqual(row['lesson_id'], lesson.id)
+        self.assertEqual(row['title'], lesson.title)
+        self.assertEqual((row['course_id'], row['course_title']), (self.course.id, self.course.title))
@@ -0,0 +1,133 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Course, Lesson, LessonContent, SearchDocument
+from ..services.russian_stemmer import stem
+from ..services.search import search
+from .utils import make_course, make_editor, make_user
+
+
+class StemmerTests(TestCase):
+    def test_word_forms_share_a_stem(self):
+        for forms in (
+            ('уравнение', 'уравнения', 'уравнением', 'уравнениях'),
+            ('квадратный', 'квадратная', 'квадратными'),
+            ('дробь', 'дроби', 'дробями'),
+        ):
+            with self.subTest(forms=forms):
+                self.assertEqual(len({stem(form) for form in forms}), 1)
+
+    def test_yo_and_latin_words(self):
+        self.assertEqual(stem('ёлка'), stem('елка'))
+        self.assertEqual(stem('Python'), 'python')
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.editor = make_editor()
+        self.user = make_user()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course = make_course(self.editor)
+            Course.objects.filter(id=self.course.id).update(is_draft=False, is_approved=True)
+            self.lesson = Lesson.objects.get(topic__course=self.course)
+            self.lesson.title = 'Квадратные уравнения'
+            self.lesson.save()
+
+    def _found(self, query, user=None):
+        return {(document.kind, document.object_id) for document, _ in search(query, user=user)}
+
+    def test_stemmed_form_finds_lesson(self):
+        self.assertIn(('lesson', self.lesson.id), self._found('уравнением'))
+        # Префикс основы тоже находит
+        self.assertIn(('lesson', self.lesson.id), self._found('квадр'))
+
+    def test_all_words_must_match(self):
+        self.assertIn(('lesson', self.lesson.id), self._found('квадратное уравнение'))
+        self.assertNotIn(('lesson', self.lesson.id), self._found('линейное уравнение'))
+
+    def test_renamed_lesson_is_found_by_new_title(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lesson.title = 'Тригонометрия'
+            self.lesson.save()
+        self.assertIn(('lesson', self.lesson.id), self._found('тригонометрии'))
+        self.assertNotIn(('lesson', self.lesson.id), self._found('уравнения'))
+
+    def test_block_text_is_indexed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            block = LessonContent.objects.create(
+                lesson=self.lesson, content_type='text', text='Дискриминант равен нулю', order=0
+            )
+        documents = search('дискриминанта')
+        self.assertEqual([(document.kind, document.object_id) for document, _ in documents], [('content', block.id)])
+        self.assertEqual(documents[0][0].lesson_id, self.lesson.id)
+
+    def test_title_match_ranks_above_body_match(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            title_block = LessonContent.objects.create(
+                lesson=self.lesson, content_type='task', task_title='Теорема Виета', order=0
+            )
+            body_block = LessonContent.objects.create(
+                lesson=self.lesson, content_type='text', text='Здесь пригодится теорема Виета', order=1
+            )
+        ranked = [document.object_id for document, _ in search('виета')]
+        self.assertEqual(ranked, [title_block.id, body_block.id])
+
+    def test_draft_course_is_not_returned(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            draft = make_course(self.editor)
+            draft_lesson = Lesson.objects.get(topic__course=draft)
+            draft_lesson.title = 'Квадратные неравенства'
+            draft_lesson.save()
+        Course.objects.filter(id=draft.id).update(is_draft=False, is_approved=False)
+
+        self.assertNotIn(('lesson', draft_lesson.id), self._found('квадратные', self.user))
+        self.assertNotIn(('lesson', draft_lesson.id), self._found('квадратные'))
+        self.assertIn(('lesson', draft_lesson.id), self._found('квадратные', self.editor))
+        self.assertIn(('lesson', draft_lesson.id), self._found('квадратные', make_user(is_superuser=True)))
+        # Скрытые документы не занимают место в limit
+        self.assertEqual(
+            [(document.kind, document.object_id) for document, _ in search('квадратные', limit=1, user=self.user)],
+            [('lesson', self.lesson.id)],
+        )
+
+    def test_search_api_hides_drafts_from_other_users(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            draft = make_course(self.editor)
+            Lesson.objects.filter(topic__course=draft).update(title='Квадратные неравенства')
+            draft_lesson = Lesson.objects.get(topic__course=draft)
+            draft_lesson.save()
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('search_api'), {'q': 'квадратные'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({result['lesson_id'] for result in response.json()['results']}, {self.lesson.id})
+
+    def test_rebuild_search_index_command(self):
+        SearchDocument.objects.all().delete()
+        self.assertEqual(search('уравнения'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn(f'Проиндексировано документов: {SearchDocument.objects.count()}', out.getvalue())
+        self.assertIn(('lesson', self.lesson.id), self._found('уравнения'))
+
+    def test_fts_triggers_follow_document_rows(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Триггеры FTS5 есть только в SQLite')
+
+        def fts_rows():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT count(*) FROM accounts_search_fts')
+                return cursor.fetchone()[0]
+
+        self.assertEqual(fts_rows(), SearchDocument.objects.count())
+        document = SearchDocument.objects.get(kind='lesson', object_id=self.lesson.id)
+        document.title_stems = stem('геометрия')
+        document.save()
+        self.assertIn(('lesson', self.lesson.id), self._found('геометрия'))
+        self.assertNotIn(('lesson', self.lesson.id), self._found('уравнения'))
+        document.delete()
+        self.assertEqual(fts_rows(), SearchDocument.objects.count())
+        self.assertNotIn(('lesson', self.lesson.id), self._found('геометрия'))
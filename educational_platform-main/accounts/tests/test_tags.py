@@ -0,0 +1,80 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Course, CourseTag, Tag
+from ..services.tags import parse_tags, sync_course_tags
+from .utils import make_editor, make_user
+
+
+def _course_tags(course):
+    return list(CourseTag.objects.filter(course=course).order_by('position').values_list('tag__slug', 'position'))
+
+
+class CourseTagSyncTests(TestCase):
+    def setUp(self):
+        self.editor = make_editor()
+
+    def _course(self, tags):
+        return Course.objects.create(editor=self.editor, title='Курс', subject='math', tags=tags, level='easy')
+
+    def test_parse_tags(self):
+        self.assertEqual(
+            parse_tags(' Алгебра ,  линейные   уравнения, алгебра,, '),
+            [('алгебра', 'Алгебра'), ('линейные уравнения', 'линейные уравнения')],
+        )
+        self.assertEqual(parse_tags(None), [])
+
+    def test_tags_follow_course_saves(self):
+        course = self._course('Алгебра, Геометрия')
+        self.assertEqual(_course_tags(course), [('алгебра', 0), ('геометрия', 1)])
+
+        course.tags = 'геометрия, тригонометрия'
+        course.save()
+        self.assertEqual(_course_tags(course), [('геометрия', 0), ('тригонометрия', 1)])
+        course.tags = ''
+        course.save()
+        self.assertEqual(_course_tags(course), [])
+
+    def test_unchanged_tags_cost_one_query(self):
+        course = self._course('алгебра, геометрия')
+        course.tags = ' Алгебра,геометрия '
+        with self.assertNumQueries(1):
+            sync_course_tags(course)
+
+    def test_tags_are_shared_between_courses(self):
+        first = self._course('Алгебра')
+        second = self._course('алгебра, логика')
+        self.assertEqual(Tag.objects.filter(slug='алгебра').count(), 1)
+        # Имя тега — от первого курса, где он встретился
+        self.assertEqual(Tag.objects.get(slug='алгебра').name, 'Алгебра')
+        self.assertEqual(set(Tag.objects.get(slug='алгебра').courses.all()), {first, second})
+
+    def test_populate_migration(self):
+        first = self._course('Алгебра, геометрия, алгебра')
+        second = self._course(' ГЕОМЕТРИЯ ,, логика')
+        empty = self._course('')
+        expected = {course.id: _course_tags(course) for course in (first, second, empty)}
+        CourseTag.objects.all().delete()
+        Tag.objects.all().delete()
+
+        migration = import_module('accounts.migrations.0006_populate_course_tags')
+        migration.populate_course_tags(apps, None)
+        self.assertEqual({course.id: _course_tags(course) for course in (first, second, empty)}, expected)
+        self.assertEqual(
+            sorted(Tag.objects.values_list('slug', 'name')),
+            [('алгебра', 'Алгебра'), ('геометрия', 'геометрия'), ('логика', 'логика')],
+        )
+
+    def test_course_page_does_not_query_tags(self):
+        course = self._course('Алгебра, Геометрия')
+        self.client.force_login(make_user())
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('course_detail_user', args=[course.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Геометрия')
+        self.assertFalse([query for query in queries if 'accounts_coursetag' in query['sql']])
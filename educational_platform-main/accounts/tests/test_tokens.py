@@ -0,0 +1,181 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.admin.sites import site
+from django.core.cache import cache
+from django.db import OperationalError, connection, connections
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from ..models import Lesson, PurchasedLesson, TokenLedgerEntry, TokenPurchase, UserToken
+from ..services.tokens import (
+    InsufficientTokens, InvalidAmount, LessonAlreadyPurchased, credit_tokens, get_balance, invalidate_balance,
+    purchase_lesson_with_tokens,
+)
+from .utils import make_course, make_editor, make_user
+
+PARALLEL_PURCHASES = 100
+
+
+class CreditTokensTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+
+    def test_credit_writes_purchase_and_ledger(self):
+        self.assertEqual(credit_tokens(self.user, '10', '99.90'), Decimal(10))
+        purchase = TokenPurchase.objects.get(user=self.user)
+        self.assertEqual((purchase.amount, purchase.price), (10, Decimal('99.90')))
+        entry = TokenLedgerEntry.objects.get(user=self.user)
+        self.assertEqual((entry.amount, entry.balance_after, entry.reason), (10, 10, 'token_purchase'))
+
+    def test_invalid_amounts_are_rejected(self):
+        for amount in (None, 'abc', '', True, [], {}, 'NaN', 'Infinity', '10.5', 2.5, '1e10', 0, -5):
+            with self.subTest(amount=amount):
+                with self.assertRaises(InvalidAmount):
+                    credit_tokens(self.user, amount, 100)
+        for price in (-1, '1.001', 'abc', None):
+            with self.subTest(price=price):
+                with self.assertRaises(InvalidAmount):
+                    credit_tokens(self.user, 10, price)
+        self.assertFalse(TokenPurchase.objects.exists())
+        self.assertFalse(TokenLedgerEntry.objects.exists())
+
+    def test_purchase_token_view_returns_400_on_bad_input(self):
+        self.client.force_login(self.user)
+        for body in ({'amount': 'abc', 'price': 10}, {'amount': 10}, [1, 2], 'not json'):
+            with self.subTest(body=body):
+                response = self.client.post(
+                    reverse('purchase_token'),
+                    body if isinstance(body, str) else json.dumps(body),
+                    content_type='application/json',
+                )
+                self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            reverse('purchase_token'), json.dumps({'amount': 5, 'price': 50}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(response.json()['new_balance']), 5)
+
+
+class PurchaseLessonTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.lesson = Lesson.objects.get(topic__course=make_course(make_editor()))
+
+    def test_purchase_debits_balance_once(self):
+        credit_tokens(self.user, 15, 150)
+        self.assertEqual(purchase_lesson_with_tokens(self.user, self.lesson), Decimal(5))
+        with self.assertRaises(LessonAlreadyPurchased):
+            purchase_lesson_with_tokens(self.user, self.lesson)
+        self.assertEqual(UserToken.objects.get(user=self.user).balance, Decimal(5))
+
+    def test_insufficient_tokens_roll_back(self):
+        credit_tokens(self.user, 5, 50)
+        with self.assertRaises(InsufficientTokens):
+            purchase_lesson_with_tokens(self.user, self.lesson)
+        self.assertFalse(PurchasedLesson.objects.exists())
+        self.assertEqual(get_balance(self.user)[0], Decimal(5))
+
+
+class BalanceCacheTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        cache.clear()
+
+    def test_balance_is_cached_until_commit(self):
+        self.assertEqual(get_balance(self.user), (0, False))
+        self.assertEqual(get_balance(self.user), (0, True))
+        with self.captureOnCommitCallbacks(execute=True):
+            credit_tokens(self.user, 10, 100)
+        self.assertEqual(get_balance(self.user), (10, False))
+
+    def test_rolled_back_operation_keeps_cache(self):
+        get_balance(self.user)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            credit_tokens(self.user, 10, 100)
+        # Колбэки не выполнены — как при откате: кэш не сброшен
+        self.assertTrue(callbacks)
+        self.assertEqual(get_balance(self.user), (0, True))
+
+    def test_operation_during_read_is_not_overwritten(self):
+        real_get_or_create = UserToken.objects.get_or_create
+
+        def read_then_credit(**kwargs):
+            # Баланс прочитан, и сразу после этого коммитится зачисление
+            stale = real_get_or_create(**kwargs)
+            UserToken.objects.filter(user=self.user).update(balance=10)
+            invalidate_balance(self.user.id)
+            return stale
+
+        with mock.patch.object(UserToken.objects, 'get_or_create', read_then_credit):
+            self.assertEqual(get_balance(self.user), (0, False))
+        self.assertEqual(get_balance(self.user), (10, False))
+
+
+class TokenLedgerAdminTests(TestCase):
+    def test_ledger_is_read_only(self):
+        model_admin = site._registry[TokenLedgerEntry]
+        request = RequestFactory().get('/')
+        request.user = make_user(is_superuser=True, is_staff=True)
+        self.assertFalse(model_admin.has_add_permission(request))
+        self.assertFalse(model_admin.has_change_permission(request))
+        self.assertFalse(model_admin.has_delete_permission(request))
+
+
+class ParallelPurchaseTests(TransactionTestCase):
+    """
+    PARALLEL_PURCHASES одновременных покупок уроков по 1 токену при балансе
+    вдвое меньше: итог должен совпасть с последовательным выполнением.
+    На SQLite покупки ждут друг друга по busy_timeout, а не падают с
+    database is locked.
+    """
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('SQLite в памяти не ждёт блокировку; нужна файловая тестовая база')
+        self.user = make_user()
+        course = make_course(make_editor(), topics=1, lessons_per_topic=PARALLEL_PURCHASES)
+        Lesson.objects.update(price_in_tokens=1)
+        self.lessons = list(Lesson.objects.filter(topic__course=course))
+        credit_tokens(self.user, PARALLEL_PURCHASES // 2, 0)
+
+    def _run_parallel(self, lessons):
+        barrier = threading.Barrier(len(lessons))
+
+        def purchase(lesson):
+            barrier.wait()
+            try:
+                purchase_lesson_with_tokens(self.user, lesson)
+                return 'ok'
+            except (InsufficientTokens, LessonAlreadyPurchased, OperationalError) as e:
+                return type(e).__name__
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=len(lessons)) as executor:
+            return list(executor.map(purchase, lessons))
+
+    def _assert_consistent(self, succeeded):
+        purchases = TokenLedgerEntry.objects.filter(user=self.user, reason='lesson_purchase')
+        self.assertEqual(purchases.count(), succeeded)
+        self.assertEqual(PurchasedLesson.objects.filter(user=self.user).count(), succeeded)
+        balance = UserToken.objects.get(user=self.user).balance
+        self.assertEqual(balance, PARALLEL_PURCHASES // 2 - succeeded)
+        self.assertGreaterEqual(balance, 0)
+        last_entry = TokenLedgerEntry.objects.filter(user=self.user).latest('id')
+        self.assertEqual(last_entry.balance_after, balance)
+
+    def test_parallel_purchases_of_different_lessons(self):
+        results = self._run_parallel(self.lessons)
+        self.assertEqual(results.count('ok'), PARALLEL_PURCHASES // 2)
+        self.assertEqual(results.count('InsufficientTokens'), PARALLEL_PURCHASES // 2)
+        self._assert_consistent(PARALLEL_PURCHASES // 2)
+
+    def test_parallel_purchases_of_one_lesson(self):
+        results = self._run_parallel([self.lessons[0]] * PARALLEL_PURCHASES)
+        self.assertEqual(results.count('ok'), 1)
+        self.assertEqual(results.count('LessonAlreadyPurchased'), PARALLEL_PURCHASES - 1)
+        self._assert_consistent(1)
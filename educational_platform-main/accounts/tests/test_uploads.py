@@ -0,0 +1,105 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import ChunkedUpload, Lesson, LessonContent
+from ..services import uploads
+from ..services.uploads import OffsetMismatch, UploadError, append_chunk, init_upload, temp_path
+from .utils import make_course, make_editor
+
+DATA = b'%PDF-1.4\n' + bytes(range(256)) * 4
+
+
+class UploadTestCase(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=f'{root}/media', CHUNKED_UPLOAD_DIR=f'{root}/upload_tmp')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        editor = make_editor()
+        lesson = Lesson.objects.get(topic__course=make_course(editor))
+        self.upload = init_upload(editor, lesson, 'notes.pdf', len(DATA), hashlib.sha256(DATA).hexdigest())
+
+    def _part(self):
+        with open(temp_path(self.upload), 'rb') as part:
+            return part.read()
+
+
+class AppendChunkTests(UploadTestCase):
+    def test_chunks_are_appended_in_order(self):
+        self.assertEqual(append_chunk(self.upload, 0, BytesIO(DATA[:500]), 500), 500)
+        self.assertEqual(append_chunk(self.upload, 500, BytesIO(DATA[500:]), len(DATA) - 500), len(DATA))
+        self.assertEqual(self._part(), DATA)
+        content = uploads.complete_upload(ChunkedUpload.objects.get(id=self.upload.id))
+        self.assertEqual(content.content_type, 'pdf')
+
+    def test_stale_duplicate_does_not_touch_file(self):
+        stale = ChunkedUpload.objects.get(id=self.upload.id)
+        append_chunk(self.upload, 0, BytesIO(DATA[:500]), 500)
+        # Повтор той же части с устаревшим received: смещение уже занято
+        with self.assertRaises(OffsetMismatch) as raised:
+            append_chunk(stale, 0, BytesIO(b'x' * 100), 100)
+        self.assertEqual(raised.exception.upload.received, 500)
+        self.assertEqual(self._part(), DATA[:500])
+
+    def test_failed_copy_releases_offset(self):
+        with mock.patch.object(uploads.shutil, 'copyfileobj', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                append_chunk(self.upload, 0, BytesIO(DATA[:500]), 500)
+        self.assertEqual(ChunkedUpload.objects.get(id=self.upload.id).received, 0)
+        self.assertEqual(append_chunk(ChunkedUpload.objects.get(id=self.upload.id), 0, BytesIO(DATA[:500]), 500), 500)
+
+    def test_short_or_corrupt_chunk_is_rejected(self):
+        with self.assertRaises(UploadError):
+            append_chunk(self.upload, 0, BytesIO(DATA[:100]), 500)
+        with self.assertRaises(UploadError):
+            append_chunk(self.upload, 0, BytesIO(DATA[:500]), 500, hashlib.sha256(b'other').hexdigest())
+        self.assertEqual(ChunkedUpload.objects.get(id=self.upload.id).received, 0)
+        self.assertEqual(self._part(), b'')
+
+
+class CompleteUploadTests(UploadTestCase):
+    def setUp(self):
+        super().setUp()
+        append_chunk(self.upload, 0, BytesIO(DATA), len(DATA))
+
+    def test_second_complete_is_rejected(self):
+        stale = ChunkedUpload.objects.get(id=self.upload.id)
+        uploads.complete_upload(self.upload)
+        # Повтор клиента с тем же состоянием загрузки: файл уже перенесён
+        with self.assertRaisesMessage(UploadError, 'Временный файл загрузки не найден'):
+            uploads.complete_upload(stale)
+        self.assertEqual(LessonContent.objects.filter(content_type='pdf').count(), 1)
+
+    def test_concurrent_complete_creates_one_block(self):
+        stale = ChunkedUpload.objects.get(id=self.upload.id)
+        # Второй вызов успел проверить файл до того, как первый его перенёс
+        with mock.patch.object(uploads, '_file_sha256', wraps=uploads._file_sha256) as file_sha256:
+            def complete_first(path):
+                digest = hashlib.sha256(DATA).hexdigest()
+                file_sha256.side_effect = None
+                uploads.complete_upload(self.upload)
+                return digest
+
+            file_sha256.side_effect = complete_first
+            with self.assertRaisesMessage(UploadError, 'Загрузка уже завершена'):
+                uploads.complete_upload(stale)
+        self.assertEqual(LessonContent.objects.filter(content_type='pdf').count(), 1)
+        self.assertFalse(ChunkedUpload.objects.filter(id=self.upload.id).exists())
+
+    def test_missing_temp_file_is_a_client_error(self):
+        os.remove(temp_path(self.upload))
+        self.client.force_login(self.upload.user)
+        response = self.client.post(
+            reverse('pdf_upload_complete', args=[self.upload.id]), '{}', content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Временный файл загрузки не найден')
+        self.assertFalse(LessonContent.objects.filter(content_type='pdf').exists())
@@ -0,0 +1,37 @@
+from itertools import count
+
+from django.core.cache import cache
+
+from ..models import Course, CourseTopic, CustomUser, Lesson, LessonContent
+
+_sequence = count(1)
+
+
+def make_user(**extra):
+    number = next(_sequence)
+    return CustomUser.objects.create_user(
+        username=f'user{number}',
+        email=f'user{number}@example.com',
+        phone=f'+7900000{number:04d}',
+        password='password',
+        **extra,
+    )
+
+
+def make_editor(**extra):
+    return make_user(is_editor=True, **extra)
+
+
+def make_course(editor, topics=1, lessons_per_topic=1, blocks_per_lesson=0):
+    """Курс с темами, уроками и текстовыми блоками; кэш структуры сбрасывается."""
+    course = Course.objects.create(editor=editor, title='Курс', subject='math', tags='алгебра', level='easy')
+    for topic_order in range(topics):
+        topic = CourseTopic.objects.create(course=course, title=f'Тема {topic_order}', order=topic_order)
+        for lesson_order in range(lessons_per_topic):
+            lesson = Lesson.objects.create(
+                topic=topic, title=f'Урок {topic_order}.{lesson_order}', price_in_tokens=10, order=lesson_order
+            )
+            for block_order in range(blocks_per_lesson):
+                LessonContent.objects.create(lesson=lesson, content_type='text', text='Текст', order=block_order)
+    cache.clear()
+    return course
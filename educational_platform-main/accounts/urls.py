@@ -4,13 +4,20 @@ from django.contrib.auth.views import LogoutView
 from .views.auth import register_view, CustomLoginView, new_first, login_again, access_denied
 from .views.courses import course_list_superuser, create_course, delete_course, save_course_structure, step2, \
     course_detail_user, step3
-from .views.lessons import lesson_content, purchase_lesson, lesson_detail, step3_user
+from .views.lessons import lesson_content, purchase_lesson, lesson_detail, step3_user, lesson_payload
 from .views.content import edit_lesson_content, save_lesson_content, upload_pdf, upload_task_image, save_task_answer, \
     save_quiz_answer
-from .views.api import save_answer, save_grades
+from .views.api import save_answer, save_grades, save_answers_batch, grading_queue
+from .views.grading import grading_page
 from .views.buy_course import buy_course
 from .views.personal_page import personal_page
-from .views.clear_token_history import purchase_token, clear_history, get_token_balance, get_purchase_history
+from .views.clear_token_history import purchase_token, clear_history, get_token_balance, get_purchase_history, \
+    get_purchased_lessons
+from .views.search import search_api
+from .views.export import export_course_results
+from .views.analytics import course_analytics_api
+from .views.uploads import pdf_upload_init, pdf_upload_status, pdf_upload_chunk, pdf_upload_complete, \
+    pdf_upload_cancel
 
 
 
@@ -34,6 +41,9 @@ urlpatterns = [
     path('step2/', step2, name='step2'),
     path('step3/', step3, name='step3'),
     path('course/<int:course_id>/', course_detail_user, name='course_detail_user'),
+    path('course/<int:course_id>/export/', export_course_results, name='export_course_results'),
+    path('api/course/<int:course_id>/analytics/', course_analytics_api, name='course_analytics'),
+    path('grading/', grading_page, name='grading_page'),
 
     # Lesson URLs
     # ВАЖНО: step3_user идёт ДО lesson_detail, чтобы маршрут /view/ обрабатывался правильно
@@ -41,20 +51,29 @@ urlpatterns = [
     path('lesson/<int:lesson_id>/', lesson_detail, name='lesson_detail'),
     path('lesson/<int:lesson_id>/content/', lesson_content, name='lesson_content'),
     path('purchase_lesson/<int:lesson_id>/', purchase_lesson, name='purchase_lesson'),
+    path('api/lesson/<int:lesson_id>/payload/', lesson_payload, name='lesson_payload'),
 
     # Content URLs
     path('edit_lesson_content/<int:lesson_id>/', edit_lesson_content, name='edit_lesson_content'),
     path('save_lesson_content/<int:lesson_id>/', save_lesson_content, name='save_lesson_content'),
     path('upload_pdf/', upload_pdf, name='upload_pdf'),
     path('upload_task_image/', upload_task_image, name='upload_task_image'),
+    path('api/pdf-upload/', pdf_upload_init, name='pdf_upload_init'),
+    path('api/pdf-upload/<uuid:upload_id>/', pdf_upload_status, name='pdf_upload_status'),
+    path('api/pdf-upload/<uuid:upload_id>/chunk/', pdf_upload_chunk, name='pdf_upload_chunk'),
+    path('api/pdf-upload/<uuid:upload_id>/complete/', pdf_upload_complete, name='pdf_upload_complete'),
+    path('api/pdf-upload/<uuid:upload_id>/cancel/', pdf_upload_cancel, name='pdf_upload_cancel'),
 
     # API URLs
     path('api/save-answer/', save_answer, name='save_answer'),
     path('api/save-grades/', save_grades, name='save_grades'),
+    path('api/save-answers/', save_answers_batch, name='save_answers_batch'),
+    path('api/grading-queue/', grading_queue, name='grading_queue'),
     path('api/save-lesson-content/<int:lesson_id>/', save_lesson_content, name='save_lesson_content_api'),
     # <-- Переименован для уникальности
     path('api/save-task-answer/', save_task_answer, name='save_task_answer'),
     path('api/save-quiz-answer/', save_quiz_answer, name='save_quiz_answer'),
+    path('api/search/', search_api, name='search_api'),
 
     # User Pages and Actions
     path('buy_course/', buy_course, name='buy_course'),
@@ -63,6 +82,7 @@ urlpatterns = [
     path('api/clear-history/', clear_history, name='clear_history'),
     path('api/get-token-balance/', get_token_balance, name='get_token_balance'),
     path('api/get-purchase-history/', get_purchase_history, name='get_purchase_history'),
+    path('api/get-purchased-lessons/', get_purchased_lessons, name='get_purchased_lessons'),
 
     # Auth URLs (Logout должен быть в конце, но перед app-specific)
     path('logout/', LogoutView.as_view(next_page='page'), name='logout'),
@@ -0,0 +1,25 @@
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from ..decorators import editor_required
+from ..models import Course
+from ..services.analytics import course_analytics
+from ..services.outline import get_course_outline
+from educational_platform.db_router import replica_reads
+
+
+@editor_required
+@replica_reads
+def course_analytics_api(request, course_id):
+    """
+    Сводка курса из таблиц аналитики: покупки и прохождение по урокам и темам,
+    доля верных ответов по блокам. Данные обновляет refresh_course_analytics.
+    """
+    course = get_object_or_404(Course, id=course_id)
+    if course.editor_id != request.user.id and not request.user.is_superuser:
+        return JsonResponse({'success': False, 'error': 'Недостаточно прав'}, status=403)
+
+    return JsonResponse({
+        'success': True,
+        'course_id': course.id,
+        **course_analytics(get_course_outline(course)),
+    })
@@ -2,9 +2,26 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from ..decorators import editor_required
+from ..models import LessonContent, LessonProgress, OpenAnswerAttempt, UserAnswer
+from ..services.entitlements import get_entitlements
+from ..services.grading import grade
+from ..services.open_answers import (
+    AttemptConflict, AttemptsExhausted, grade_attempts, grading_queue_page, submit_open_answer,
+)
+from ..services.pagination import InvalidCursor
+from ..services.progress import record_completions
 
 import json
 
+MAX_BATCH_ANSWERS = 200
+BATCH_ANSWER_TYPES = ('quiz', 'task')
+MAX_BATCH_GRADES = 200
+GRADING_QUEUE_PAGE_SIZE = 20
+MAX_GRADING_QUEUE_PAGE_SIZE = 100
+
 @login_required
 @require_POST
 @csrf_exempt
@@ -19,76 +36,184 @@ def save_answer(request):
             return JsonResponse({'success': False, 'error': 'Не все необходимые данные предоставлены'})
 
         # Получаем или создаем прогресс урока
-        content_block = LessonContent.objects.get(id=block_id)
+        content_block = LessonContent.objects.select_related('lesson__topic__course').get(id=block_id)
         lesson = content_block.lesson
+        is_editor = lesson.topic.course.editor_id == request.user.id
+        if not is_editor and not get_entitlements(request).has_access(lesson.id):
+            return JsonResponse({'success': False, 'error': 'Урок не куплен'}, status=403)
         progress, created = LessonProgress.objects.get_or_create(
             user=request.user,
             lesson=lesson
         )
 
-        # Сохраняем ответ в зависимости от типа блока
+        # Открытый ответ уходит преподавателю в очередь проверки
+        attempt = None
         if block_type == 'open':
-            question = OpenQuestion.objects.get(id=block_id)
-            answer_obj, created = OpenQuestionAnswer.objects.get_or_create(
-                user=request.user,
-                question=question,
-                defaults={'answer': answer}
-            )
-            if not created:
-                answer_obj.answer = answer
-                answer_obj.save()
+            if content_block.content_type != 'open':
+                return JsonResponse({'success': False, 'error': 'Неверный тип блока'}, status=400)
+            attempt = submit_open_answer(request.user, content_block, str(answer))
 
-        # Обновляем прогресс
-        progress.update_progress(block_id)
+        # Обновляем прогресс: текст, PDF и видео в него не входят
+        if content_block.content_type in LessonContent.ANSWERABLE_TYPES:
+            progress.update_progress(content_block.id)
         current_progress = progress.calculate_progress()
 
-        return JsonResponse({
+        response = {
             'success': True,
             'progress': current_progress
-        })
-
+        }
+        if attempt is not None:
+            response['attempt'] = attempt.attempt_number
+            response['attempts_left'] = content_block.open_max_attempts - attempt.attempt_number
+        return JsonResponse(response)
+
+    except AttemptsExhausted as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except AttemptConflict as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=409)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
-@login_required
+@editor_required
+def grading_queue(request):
+    """
+    Непроверенные открытые ответы по всем курсам преподавателя,
+    старые сначала. Листается курсором ?cursor=...
+    """
+    try:
+        page_size = min(int(request.GET.get('page_size', GRADING_QUEUE_PAGE_SIZE)), MAX_GRADING_QUEUE_PAGE_SIZE)
+        page = grading_queue_page(request.user, cursor=request.GET.get('cursor'), page_size=max(page_size, 1))
+    except (ValueError, InvalidCursor) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'attempts': [
+            {
+                'id': attempt.id,
+                'user': attempt.user.email,
+                'course': attempt.content.lesson.topic.course.title,
+                'lesson': attempt.content.lesson.title,
+                'block_id': attempt.content_id,
+                'title': attempt.content.open_title,
+                'criteria': attempt.content.open_criteria or [],
+                'answer': attempt.answer_text,
+                'attempt': attempt.attempt_number,
+                'created_at': attempt.created_at.isoformat(),
+            }
+            for attempt in page
+        ],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
+
+@editor_required
 @require_POST
 @csrf_exempt
 def save_grades(request):
+    """
+    Оценки пачкой: {"grades": [{"attempt_id": 1, "scores": [2, 1]}, ...]},
+    scores — баллы по критериям open_criteria в их порядке.
+    """
     try:
         data = json.loads(request.body)
-        block_id = data.get('block_id')
-        grades = data.get('grades')
+        items = data.get('grades') if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            return JsonResponse({'success': False, 'error': 'Не все необходимые данные предоставлены'}, status=400)
+        if len(items) > MAX_BATCH_GRADES:
+            return JsonResponse({'success': False, 'error': f'Не больше {MAX_BATCH_GRADES} оценок за запрос'}, status=400)
+
+        grades = {}
+        for item in items:
+            if not isinstance(item, dict):
+                return JsonResponse({'success': False, 'error': 'Каждая оценка должна быть объектом'}, status=400)
+            if item.get('attempt_id') is None:
+                return JsonResponse({'success': False, 'error': 'Не все необходимые данные предоставлены'}, status=400)
+            grades[int(item['attempt_id'])] = item.get('scores')
+
+        attempts = grade_attempts(request.user, grades)
 
-        if not all([block_id, grades]):
-            return JsonResponse({'success': False, 'error': 'Не все необходимые данные предоставлены'})
+        return JsonResponse({
+            'success': True,
+            'graded': len(attempts),
+            'total_scores': {attempt.id: attempt.total_score for attempt in attempts},
+        })
 
-        # Проверяем, является ли пользователь преподавателем
-        if not request.user.is_staff:
-            return JsonResponse({'success': False, 'error': 'Недостаточно прав'})
-
-        # Получаем ответ и обновляем оценки
-        question = OpenQuestion.objects.get(id=block_id)
-        answer = OpenQuestionAnswer.objects.get(question=question)
-        
-        # Валидация оценок
-        max_scores = {criterion['id']: criterion['points'] for criterion in question.criteria}
-        for criterion_id, score in grades.items():
-            if score > max_scores.get(criterion_id, 0):
-                return JsonResponse({
-                    'success': False,
-                    'error': f'Оценка превышает максимально возможную для критерия {criterion_id}'
-                })
-
-        answer.grades = grades
-        answer.is_graded = True
-        answer.save()
-
-        # Обновляем общий прогресс урока
-        progress = LessonProgress.objects.get(user=answer.user, lesson=question.lesson)
-        progress.total_score = answer.calculate_total_score()
-        progress.save()
-
-        return JsonResponse({'success': True})
+    except OpenAnswerAttempt.DoesNotExist as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=404)
+    except PermissionDenied as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=403)
+    except (ValueError, TypeError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
-    except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)}) 
\ No newline at end of file
+@login_required
+@require_POST
+@csrf_exempt
+def save_answers_batch(request):
+    """
+    Сохраняет ответы на несколько блоков за один запрос:
+    {"answers": [{"block_id": 1, "answer": "..."}, ...]}.
+    Правильность проверяется на сервере, все UserAnswer пишутся одним
+    bulk upsert, в ответе — результаты проверки и прогресс по урокам.
+    """
+    try:
+        data = json.loads(request.body)
+        items = data.get('answers') if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            return JsonResponse({'success': False, 'error': 'Не все необходимые данные предоставлены'}, status=400)
+        if len(items) > MAX_BATCH_ANSWERS:
+            return JsonResponse({'success': False, 'error': f'Не больше {MAX_BATCH_ANSWERS} ответов за запрос'}, status=400)
+
+        answers = {}
+        for item in items:
+            if not isinstance(item, dict):
+                return JsonResponse({'success': False, 'error': 'Каждый ответ должен быть объектом'}, status=400)
+            block_id, answer = item.get('block_id'), item.get('answer')
+            if block_id is None or answer is None:
+                return JsonResponse({'success': False, 'error': 'Не все необходимые данные предоставлены'}, status=400)
+            # Если блок пришёл дважды, сохраняем последний ответ
+            answers[int(block_id)] = item
+
+        contents = LessonContent.objects.select_related('lesson__topic__course').in_bulk(answers.keys())
+        missing = answers.keys() - contents.keys()
+        if missing:
+            return JsonResponse({'success': False, 'error': f'Блоки не найдены: {sorted(missing)}'}, status=404)
+
+        entitlements = get_entitlements(request)
+        for content in contents.values():
+            if content.content_type not in BATCH_ANSWER_TYPES:
+                return JsonResponse({'success': False, 'error': f'Неверный тип блока {content.id}'}, status=400)
+            is_editor = content.lesson.topic.course.editor_id == request.user.id
+            if not is_editor and not entitlements.has_access(content.lesson_id):
+                return JsonResponse({'success': False, 'error': f'Урок блока {content.id} не куплен'}, status=403)
+
+        user_answers = [
+            UserAnswer(
+                user=request.user,
+                content=contents[block_id],
+                answer=str(item['answer']),
+                is_correct=grade(contents[block_id], item['answer']),
+            )
+            for block_id, item in answers.items()
+        ]
+        with transaction.atomic():
+            UserAnswer.objects.bulk_create(
+                user_answers,
+                update_conflicts=True,
+                unique_fields=['user', 'content'],
+                update_fields=['answer', 'is_correct', 'updated_at'],
+            )
+            progress = record_completions(request.user, list(contents.values()))
+
+        return JsonResponse({
+            'success': True,
+            'saved': len(user_answers),
+            'results': {user_answer.content_id: user_answer.is_correct for user_answer in user_answers},
+            'progress': {
+                lesson_id: lesson_progress.calculate_progress()
+                for lesson_id, lesson_progress in progress.items()
+            },
+        })
+
+    except (ValueError, TypeError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
@@ -1,31 +1,29 @@
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
-from decimal import Decimal
 import json
-from accounts.models import TokenPurchase, UserToken
+from accounts.models import PurchasedLesson, TokenPurchase
+from accounts.services.pagination import InvalidCursor, paginate_keyset
+from accounts.services.tokens import credit_tokens, get_balance
+from educational_platform.db_router import replica_reads
+
+HISTORY_PAGE_SIZE = 20
+MAX_HISTORY_PAGE_SIZE = 100
 
 @login_required
 @csrf_exempt
 def purchase_token(request):
     if request.method == 'POST':
-        data = json.loads(request.body)
-        amount = data.get('amount')
-        price = data.get('price')
-
-        # Создаем запись о покупке
-        TokenPurchase.objects.create(
-            user=request.user,
-            amount=amount,
-            price=price
-        )
+        try:
+            data = json.loads(request.body)
+            if not isinstance(data, dict):
+                raise ValueError('Ожидается объект JSON')
+            # Создаем запись о покупке и зачисляем токены одной транзакцией
+            new_balance = credit_tokens(request.user, data.get('amount'), data.get('price'))
+        except ValueError as e:
+            return JsonResponse({'status': 'error', 'error': str(e)}, status=400)
 
-        # Обновляем баланс пользователя
-        user_token, created = UserToken.objects.get_or_create(user=request.user)
-        user_token.balance += Decimal(amount)  # Преобразуем amount в Decimal
-        user_token.save()
-
-        return JsonResponse({'status': 'success', 'new_balance': user_token.balance})
+        return JsonResponse({'status': 'success', 'new_balance': new_balance})
     return JsonResponse({'status': 'error'}, status=400)
 
 @login_required
@@ -38,18 +36,77 @@ def clear_history(request):
 
 @login_required
 def get_token_balance(request):
-    user_token, created = UserToken.objects.get_or_create(user=request.user)
-    return JsonResponse({'balance': user_token.balance})
+    balance, from_cache = get_balance(request.user)
+    response = JsonResponse({'balance': balance})
+    # Для мониторинга доли попаданий в кэш
+    response['X-Cache'] = 'HIT' if from_cache else 'MISS'
+    return response
+
+def _page_size(request):
+    try:
+        page_size = int(request.GET.get('page_size', HISTORY_PAGE_SIZE))
+    except ValueError:
+        page_size = HISTORY_PAGE_SIZE
+    return max(1, min(page_size, MAX_HISTORY_PAGE_SIZE))
 
 @login_required
+@replica_reads
 def get_purchase_history(request):
-    purchases = TokenPurchase.objects.filter(user=request.user).order_by('-purchased_at')
+    purchases = TokenPurchase.objects.filter(user=request.user).only('amount', 'price', 'purchased_at')
+    try:
+        page = paginate_keyset(
+            purchases,
+            ['-purchased_at', '-id'],
+            cursor=request.GET.get('cursor'),
+            page_size=_page_size(request),
+        )
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
     history = [
         {
             'amount': purchase.amount,
-            U'price': purchase.price,
+            'price': purchase.price,
+            'date': purchase.purchased_at.isoformat()
+        }
+        for purchase in page
+    ]
+    return JsonResponse({
+        'history': history,
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
+
+@login_required
+@replica_reads
+def get_purchased_lessons(request):
+    purchases = PurchasedLesson.objects.filter(user=request.user).select_related('lesson__topic__course').only(
+        'purchased_at',
+        'lesson__title',
+        'lesson__topic__course__title',
+    )
+    try:
+        page = paginate_keyset(
+            purchases,
+            ['-purchased_at', '-id'],
+            cursor=request.GET.get('cursor'),
+            page_size=_page_size(request),
+        )
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    lessons = [
+        {
+            'lesson_id': purchase.lesson_id,
+            'title': purchase.lesson.title,
+            'course_id': purchase.lesson.topic.course_id,
+            'course_title': purchase.lesson.topic.course.title,
             'date': purchase.purchased_at.isoformat()
         }
-        for purchase in purchases
+        for purchase in page
     ]
-    return JsonResponse(history, safe=False)  # safe=False для списка
\ No newline at end of file
+    return JsonResponse({
+        'lessons': lessons,
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
@@ -2,7 +2,14 @@ from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
-from ..models import Lesson, LessonContent, OpenAnswerAttempt, UserAnswer
+from django.db import transaction
+from ..models import Lesson, LessonContent, LessonProgress, OpenAnswerAttempt, UserAnswer, bulk_content_changes
+from ..services.outline import invalidate_course_outline
+from ..services.grading import grade
+from ..services.images import enqueue_lesson_images
+from ..services.media import content_media_names, invalidate_media_lessons
+from ..services.pdf_preview import enqueue_lesson_pdfs
+from ..services.search import index_lesson_tree
 import json
 
 @login_required
@@ -14,67 +21,144 @@ def edit_lesson_content(request, lesson_id):
         'content': content
     })
 
+# Поля LessonContent, которые заполняет редактор для каждого типа блока
+EDITOR_BLOCK_FIELDS = {
+    'text': lambda d: {
+        'text': d.get('text', ''),
+    },
+    'pdf': lambda d: {
+        'pdf_title': d.get('title', ''),
+        'pdf_file': d.get('file', ''),
+    },
+    'video': lambda d: {
+        'video_title': d.get('title', ''),
+        'video_url': d.get('url', ''),
+        'video_description': d.get('description', ''),
+    },
+    'quiz': lambda d: {
+        'quiz_title': d.get('title', ''),
+        'quiz_question': d.get('question', ''),
+        'quiz_options': d.get('options', []),
+        'quiz_correct_answer': d.get('correctAnswer', ''),
+        'quiz_explanation': d.get('explanation', ''),
+    },
+    'task': lambda d: {
+        'task_title': d.get('title', ''),
+        'task_description': d.get('description', ''),
+        'task_image': d.get('image', ''),
+        'task_image_description': d.get('imageDescription', ''),
+        'task_answer_type': d.get('answerType', ''),
+        'task_correct_answer': d.get('correctAnswer', ''),
+        'task_hint': d.get('hint', ''),
+    },
+    'open': lambda d: {
+        'open_title': d.get('title', ''),
+        'open_description': d.get('description', ''),
+        'open_image': d.get('image', ''),
+        'open_criteria': d.get('criteria', []),
+        'open_max_attempts': d.get('maxAttempts', 1),
+    },
+}
+EDITOR_UPDATE_FIELDS = ['order'] + sorted({
+    field for build in EDITOR_BLOCK_FIELDS.values() for field in build({})
+})
+
+
+def _field_value(obj, name):
+    value = getattr(obj, name)
+    # FileField/ImageField сравниваем по имени файла
+    return getattr(value, 'name', value) or ''
+
+
+def _parse_block_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
 @csrf_exempt
 @login_required
 def save_lesson_content(request, lesson_id):
-    lesson = get_object_or_404(Lesson, id=lesson_id)
+    """
+    Сохраняет блоки урока как дифф относительно текущих:
+    блоки с известным id обновляются (только если изменились),
+    новые вставляются одним bulk_create, отсутствующие удаляются.
+    Ответы учеников на сохранённые блоки не теряются.
+    В ответе — соответствие временных id редактора новым id блоков.
+    """
+    lesson = get_object_or_404(Lesson.objects.select_related('topic'), id=lesson_id)
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
             blocks = data.get('blocks', [])
-            # Удаляем старое содержимое
-            lesson.contents.all().delete()
-            # Сохраняем новые блоки
+            existing = {content.id: content for content in lesson.contents.all()}
+            # Файлы блоков до правки: заменённые и удалённые тоже сбрасываются в кэше доступа
+            media_names = set().union(*(content_media_names(content) for content in existing.values()))
+
+            to_create, created_client_ids, to_update, kept_ids = [], [], [], set()
+            order = 0
             for block in blocks:
                 block_type = block.get('type')
-                block_data = block.get('data', {})
-                if block_type == 'text':
-                    LessonContent.objects.create(
-                        lesson=lesson,
-                        content_type='text',
-                        text=block_data.get('text', ''),
-                    )
-                elif block_type == 'pdf':
-                    LessonContent.objects.create(
-                        lesson=lesson,
-                        content_type='pdf',
-                        pdf_title=block_data.get('title', ''),
-                        pdf_file=block_data.get('file', ''),
-                    )
-                elif block_type == 'video':
-                    LessonContent.objects.create(
-                        lesson=lesson,
-                        content_type='video',
-                        video_title=block_data.get('title', ''),
-                        video_url=block_data.get('url', ''),
-                        video_description=block_data.get('description', ''),
-                    )
-                elif block_type in ['test', 'quiz']:
-                    LessonContent.objects.create(
-                        lesson=lesson,
-                        content_type='quiz',
-                        quiz_title=block_data.get('title', ''),
-                        quiz_question=block_data.get('question', ''),
-                        quiz_options=block_data.get('options', []),
-                        quiz_correct_answer=block_data.get('correctAnswer', ''),
-                        quiz_explanation=block_data.get('explanation', ''),
-                    )
-                elif block_type == 'task':
-                    LessonContent.objects.create(
-                        lesson=lesson,
-                        content_type='task',
-                        task_title=block_data.get('title', ''),
-                        task_description=block_data.get('description', ''),
-                        task_image=block_data.get('image', ''),
-                        task_image_description=block_data.get('imageDescription', ''),
-                        task_answer_type=block_data.get('answerType', ''),
-                        task_correct_answer=block_data.get('correctAnswer', ''),
-                        task_hint=block_data.get('hint', ''),
-                    )
-                # Можно добавить обработку других типов блоков при необходимости
-                else:
+                if block_type == 'test':
+                    block_type = 'quiz'
+                content = existing.get(_parse_block_id(block.get('id')))
+                if block_type not in EDITOR_BLOCK_FIELDS:
+                    # Тип, который редактор не умеет менять: блок (и ответы на него)
+                    # сохраняется как есть, меняется только порядок
+                    if content is not None and content.id not in kept_ids:
+                        kept_ids.add(content.id)
+                        if content.order != order:
+                            content.order = order
+                            to_update.append(content)
+                        order += 1
+                    continue
+                fields = EDITOR_BLOCK_FIELDS[block_type](block.get('data', {}))
+                fields['order'] = order
+                order += 1
+
+                if content is None or content.content_type != block_type or content.id in kept_ids:
+                    to_create.append(LessonContent(lesson=lesson, content_type=block_type, **fields))
+                    created_client_ids.append(block.get('id'))
                     continue
-            return JsonResponse({'success': True})
+
+                kept_ids.add(content.id)
+                changed = False
+                for name, value in fields.items():
+                    if _field_value(content, name) != (value or ''):
+                        setattr(content, name, value)
+                        changed = True
+                if changed:
+                    to_update.append(content)
+
+            to_delete = [content_id for content_id in existing if content_id not in kept_ids]
+            with transaction.atomic():
+                if to_delete:
+                    # Кэш структуры и счётчики прогресса сбрасываются ниже один раз на урок
+                    with bulk_content_changes():
+                        LessonContent.objects.filter(id__in=to_delete).delete()
+                if to_update:
+                    LessonContent.objects.bulk_update(to_update, EDITOR_UPDATE_FIELDS)
+                if to_create:
+                    LessonContent.objects.bulk_create(to_create)
+                # bulk-операции не отправляют сигналы, сбрасываем кэш и индекс явно
+                transaction.on_commit(lambda: invalidate_course_outline(lesson.topic.course_id))
+                transaction.on_commit(lambda: index_lesson_tree(lesson.id))
+                transaction.on_commit(lambda: LessonProgress.refresh_counters(lesson.id))
+                transaction.on_commit(lambda: enqueue_lesson_images(lesson.id))
+                transaction.on_commit(lambda: enqueue_lesson_pdfs(lesson.id))
+                for content in to_update + to_create:
+                    media_names |= content_media_names(content)
+                transaction.on_commit(lambda: invalidate_media_lessons(media_names))
+
+            return JsonResponse({
+                'success': True,
+                'ids': {
+                    str(client_id): content.id
+                    for client_id, content in zip(created_client_ids, to_create)
+                    if client_id is not None
+                },
+            })
         except Exception as e:
             return JsonResponse({'success': False, 'error': str(e)}, status=400)
     return JsonResponse({'success': False, 'error': 'Метод не поддерживается'}, status=400)
@@ -138,14 +222,15 @@ def save_task_answer(request):
             if content.content_type != 'task':
                 return JsonResponse({'success': False, 'error': 'Неверный тип блока'}, status=400)
 
-            # Создаем или обновляем ответ пользователя
+            # Создаем или обновляем ответ пользователя, правильность проверяем на сервере
+            is_correct = grade(content, answer)
             user_answer, created = UserAnswer.objects.update_or_create(
                 user=request.user,
                 content=content,
-                defaults={'answer': answer}
+                defaults={'answer': answer, 'is_correct': is_correct}
             )
 
-            return JsonResponse({'success': True})
+            return JsonResponse({'success': True, 'is_correct': is_correct})
         except Exception as e:
             return JsonResponse({'success': False, 'error': str(e)}, status=400)
     return JsonResponse({'success': False, 'error': 'Метод не поддерживается'}, status=400)
@@ -158,13 +243,13 @@ def save_quiz_answer(request):
             data = json.loads(request.body)
             block_id = data.get('block_id')
             answer = data.get('answer')
-            is_correct = data.get('is_correct')
 
             content = get_object_or_404(LessonContent, id=block_id)
             if content.content_type != 'quiz':
                 return JsonResponse({'success': False, 'error': 'Неверный тип блока'}, status=400)
 
-            # Создаем или обновляем ответ пользователя
+            # is_correct от клиента не принимаем — проверяем ответ на сервере
+            is_correct = grade(content, answer)
             user_answer, created = UserAnswer.objects.update_or_create(
                 user=request.user,
                 content=content,
@@ -174,7 +259,7 @@ def save_quiz_answer(request):
                 }
             )
 
-            return JsonResponse({'success': True})
+            return JsonResponse({'success': True, 'is_correct': is_correct})
         except Exception as e:
             return JsonResponse({'success': False, 'error': str(e)}, status=400)
     return JsonResponse({'success': False, 'error': 'Метод не поддерживается'}, status=400)
\ No newline at end of file
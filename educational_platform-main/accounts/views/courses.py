@@ -2,15 +2,61 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse, HttpResponseBadRequest
-from ..models import Course, CourseTopic, Lesson
+from django.db import transaction
+from django.db.models import Prefetch
+from ..models import Course, CourseTopic, Lesson, Tag, bulk_content_changes
 from ..forms import CourseForm, CourseStructureForm
 from ..decorators import editor_required
+from ..services.entitlements import get_entitlements
+from ..services.outline import get_course_outline, invalidate_course_outline
+from ..services.pagination import InvalidCursor, paginate_keyset
+from ..services.search import index_course_tree
+from educational_platform.db_router import replica_reads
 import json
 
+COURSES_PER_PAGE = 12
+BOOLEAN_FILTER_VALUES = {'1': True, 'true': True, '0': False, 'false': False}
+
+
+def _filter_courses(queryset, params):
+    """Фильтры каталога из GET-параметров; некорректные значения игнорируются."""
+    subject = params.get('subject')
+    if subject in dict(Course.SUBJECT_CHOICES):
+        queryset = queryset.filter(subject=subject)
+    level = params.get('level')
+    if level in dict(Course.LEVEL_CHOICES):
+        queryset = queryset.filter(level=level)
+    for flag in ('is_draft', 'is_approved'):
+        value = BOOLEAN_FILTER_VALUES.get(params.get(flag, '').lower())
+        if value is not None:
+            queryset = queryset.filter(**{flag: value})
+    editor = params.get('editor')
+    if editor and editor.isdigit():
+        queryset = queryset.filter(editor_id=int(editor))
+    tag = params.get('tag')
+    if tag:
+        # Поиск по индексу CourseTag(tag, course), а не LIKE по строке tags
+        queryset = queryset.filter(course_tags__tag__slug=Tag.normalize(tag))
+    return queryset
+
+
 @login_required
+@replica_reads
 def course_list_superuser(request):
-    courses = Course.objects.all()
-    return render(request, 'accounts/course_list_superuser.html', {'courses': courses})
+    courses = _filter_courses(Course.objects.select_related('editor'), request.GET)
+    try:
+        page = paginate_keyset(courses, ['id'], request.GET.get('cursor'), COURSES_PER_PAGE)
+    except InvalidCursor:
+        page = paginate_keyset(courses, ['id'], None, COURSES_PER_PAGE)
+
+    # Фильтры сохраняются в ссылках на соседние страницы
+    filter_query = request.GET.copy()
+    filter_query.pop('cursor', None)
+
+    return render(request, 'accounts/course_list_superuser.html', {
+        'courses': page,
+        'filter_query': filter_query.urlencode(),
+    })
 
 @editor_required
 def create_course(request):
@@ -49,33 +95,101 @@ def save_course_structure(request):
         course = Course.objects.get(id=course_id)
         data = json.loads(request.body)
         
-        # Удаляем существующие темы и уроки
-        CourseTopic.objects.filter(course=course).delete()
-        
-        # Сохраняем темы
-        for topic_data in data.get('topics', []):
-            topic = CourseTopic.objects.create(
-                course=course,
-                title=topic_data['title']
-            )
-            
-            # Сохраняем уроки для темы
-            for lesson_data in topic_data.get('lessons', []):
-                Lesson.objects.create(
-                    topic=topic,
-                    title=lesson_data['title'],
-                    price_in_tokens=lesson_data['price']
-                )
+        with transaction.atomic():
+            _upsert_course_structure(course, data.get('topics', []))
+        # bulk-операции не отправляют сигналы, сбрасываем кэш и индекс явно
+        invalidate_course_outline(course.id)
+        index_course_tree(course.id)
         
         return JsonResponse({
             'success': True
         })
+    except (CourseStructureError, json.JSONDecodeError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
     except Exception as e:
         return JsonResponse({
             'success': False, 
             'error': str(e)
         })
 
+
+class CourseStructureError(ValueError):
+    pass
+
+
+def _parse_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_price(value):
+    """Цена урока — целое число токенов >= 0; 10.0 принимается, 10.5 и '10' — нет."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise CourseStructureError(f'Некорректная стоимость урока: {value!r}')
+    return value
+
+
+def _upsert_course_structure(course, topics_data):
+    """
+    Сопоставляет темы и уроки с существующими по id, порядок берёт из позиции в списке.
+    Уроки сохраняют свои id (а значит и PurchasedLesson), даже если переехали в другую тему.
+    Всё пишется bulk-запросами: вставка, обновление, удаление лишнего.
+    """
+    existing_topics = {topic.id: topic for topic in CourseTopic.objects.select_for_update().filter(course=course)}
+    existing_lessons = {lesson.id: lesson for lesson in Lesson.objects.filter(topic__course=course)}
+
+    topics_to_create, topics_to_update, kept_topic_ids = [], [], set()
+    topic_lessons = []
+    for topic_order, topic_data in enumerate(topics_data):
+        topic = existing_topics.get(_parse_id(topic_data.get('id')))
+        if topic is None or topic.id in kept_topic_ids:
+            topic = CourseTopic(course=course, title=topic_data['title'], order=topic_order)
+            topics_to_create.append(topic)
+        else:
+            kept_topic_ids.add(topic.id)
+            topic.title = topic_data['title']
+            topic.order = topic_order
+            topics_to_update.append(topic)
+        topic_lessons.append((topic, topic_data.get('lessons', [])))
+
+    CourseTopic.objects.bulk_create(topics_to_create)
+    CourseTopic.objects.bulk_update(topics_to_update, ['title', 'order'])
+
+    lessons_to_create, lessons_to_update, kept_lesson_ids = [], [], set()
+    for topic, lessons_data in topic_lessons:
+        for lesson_order, lesson_data in enumerate(lessons_data):
+            lesson = existing_lessons.get(_parse_id(lesson_data.get('id')))
+            if lesson is None or lesson.id in kept_lesson_ids:
+                lessons_to_create.append(Lesson(
+                    topic=topic,
+                    title=lesson_data['title'],
+                    price_in_tokens=_parse_price(lesson_data.get('price')),
+                    order=lesson_order,
+                ))
+                continue
+            kept_lesson_ids.add(lesson.id)
+            lesson.topic = topic
+            lesson.title = lesson_data['title']
+            lesson.price_in_tokens = _parse_price(lesson_data.get('price'))
+            lesson.order = lesson_order
+            lessons_to_update.append(lesson)
+
+    Lesson.objects.bulk_create(lessons_to_create)
+    Lesson.objects.bulk_update(lessons_to_update, ['topic', 'title', 'price_in_tokens', 'order'])
+
+    # Кэш структуры save_course_structure сбрасывает сам, один раз на курс
+    with bulk_content_changes():
+        stale_lesson_ids = existing_lessons.keys() - kept_lesson_ids
+        if stale_lesson_ids:
+            Lesson.objects.filter(id__in=stale_lesson_ids).delete()
+        stale_topic_ids = existing_topics.keys() - kept_topic_ids
+        if stale_topic_ids:
+            CourseTopic.objects.filter(id__in=stale_topic_ids).delete()
+
 @editor_required
 def step2(request):
     course_id = request.session.get('course_id')
@@ -93,23 +207,39 @@ def step2(request):
     else:
         form = CourseStructureForm()
     
+    # Текущая структура с id: при сохранении уроки сопоставляются с существующими
+    structure = [
+        {
+            'id': topic.id,
+            'title': topic.title,
+            'lessons': [
+                {'id': lesson.id, 'title': lesson.title, 'price': lesson.price_in_tokens}
+                for lesson in topic.lessons.all()
+            ],
+        }
+        for topic in course.topics.prefetch_related(
+            Prefetch('lessons', queryset=Lesson.objects.order_by('order', 'id'))
+        ).order_by('order', 'id')
+    ]
+
     return render(request, 'accounts/step2.html', {
         'form': form,
-        'course': course
+        'course': course,
+        'structure': structure,
     })
 
 @login_required
+@replica_reads
 def course_detail_user(request, course_id):
-    course = get_object_or_404(Course, id=course_id)
-    topics = course.topics.all().order_by('order')
-    
-    # Получаем список ID купленных уроков
-    purchased_lessons = request.user.purchased_lessons.values_list('lesson_id', flat=True)
+    # Теги на странице берутся из строки tags: отдельный запрос к CourseTag не нужен
+    course = get_object_or_404(Course.objects.select_related('editor'), id=course_id)
+    outline = get_course_outline(course)
     
     return render(request, 'accounts/step2_user.html', {
         'course': course,
-        'topics': topics,
-        'purchased_lessons': [str(lesson_id) for lesson_id in purchased_lessons]
+        'outline': outline,
+        'topics': outline.topics,
+        'purchased_lessons': get_entitlements(request)
     })
 
 @editor_required
@@ -119,9 +249,10 @@ def step3(request):
         return redirect('create_course')
     
     course = get_object_or_404(Course, id=course_id)
-    topics = course.topics.all()
+    outline = get_course_outline(course, with_contents=True)
     
     return render(request, 'accounts/step3.html', {
         'course': course,
-        'topics': topics
+        'outline': outline,
+        'topics': outline.topics
     }) 
\ No newline at end of file
@@ -0,0 +1,27 @@
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from ..decorators import editor_required
+from ..models import Course
+from ..services.export import EXPORT_FORMATS, export_lines
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+@editor_required
+def export_course_results(request, course_id):
+    """Потоковая выгрузка результатов учеников курса: ?format=csv|jsonl."""
+    course = get_object_or_404(Course.objects.only('id', 'editor_id'), id=course_id)
+    if course.editor_id != request.user.id and not request.user.is_superuser:
+        return JsonResponse({'success': False, 'error': 'Недостаточно прав'}, status=403)
+
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'success': False, 'error': 'Формат должен быть csv или jsonl'}, status=400)
+
+    response = StreamingHttpResponse(export_lines(course.id, export_format), content_type=CONTENT_TYPES[export_format])
+    response['Content-Disposition'] = f'attachment; filename="course_{course.id}_results.{export_format}"'
+    response['Cache-Control'] = 'no-store'
+    return response
@@ -0,0 +1,20 @@
+from django.shortcuts import render
+from ..decorators import editor_required
+from ..services.open_answers import grading_queue_page
+from ..services.pagination import InvalidCursor
+
+GRADING_PAGE_SIZE = 20
+
+
+@editor_required
+def grading_page(request):
+    """
+    Очередь проверки открытых ответов для преподавателя.
+    Оценки уходят в /api/save-grades/ пачкой {"grades": [{"attempt_id", "scores"}]}.
+    """
+    try:
+        page = grading_queue_page(request.user, cursor=request.GET.get('cursor'), page_size=GRADING_PAGE_SIZE)
+    except InvalidCursor:
+        page = grading_queue_page(request.user, page_size=GRADING_PAGE_SIZE)
+
+    return render(request, 'accounts/grading.html', {'attempts': page})
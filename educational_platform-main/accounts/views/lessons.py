@@ -2,30 +2,34 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
 from django.views.decorators.http import require_POST
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
 from ..models import Lesson, LessonContent, PurchasedLesson, UserToken
+from ..services.entitlements import get_entitlements
+from ..services.lesson_payload import get_lesson_payload
+from ..services.outline import get_lesson_contents
+from ..services.tokens import InsufficientTokens, LessonAlreadyPurchased, purchase_lesson_with_tokens
+from educational_platform.db_router import replica_reads
 
 @login_required
+@replica_reads
 def lesson_detail(request, lesson_id):
-    lesson = get_object_or_404(Lesson, id=lesson_id)
-    is_purchased = PurchasedLesson.objects.filter(
-        user=request.user,
-        lesson=lesson
-    ).exists()
+    lesson = get_object_or_404(Lesson.objects.select_related('topic'), id=lesson_id)
+    is_purchased = get_entitlements(request).has_access(lesson.id)
     
     return render(request, 'accounts/lesson_detail.html', {
         'lesson': lesson,
+        'contents': get_lesson_contents(lesson),
         'is_purchased': is_purchased
     })
 
 @login_required
+@replica_reads
 def lesson_content(request, lesson_id):
     lesson = get_object_or_404(Lesson, id=lesson_id)
     content = lesson.contents.all()
-    is_purchased = PurchasedLesson.objects.filter(
-        user=request.user,
-        lesson=lesson
-    ).exists()
+    is_purchased = get_entitlements(request).has_access(lesson.id)
     
     return render(request, 'accounts/lesson_content.html', {
         'lesson': lesson,
@@ -39,27 +43,18 @@ def lesson_content(request, lesson_id):
 def purchase_lesson(request, lesson_id):
     try:
         lesson = get_object_or_404(Lesson, id=lesson_id)
-        user_token = request.user.tokens
+        new_balance = purchase_lesson_with_tokens(request.user, lesson)
         
-        if user_token.balance >= lesson.price_in_tokens:
-            user_token.balance -= lesson.price_in_tokens
-            user_token.save()
-            
-            PurchasedLesson.objects.create(
-                user=request.user,
-                lesson=lesson
-            )
-            
-            return JsonResponse({
-                'status': 'success',
-                'message': 'Урок успешно куплен',
-                'new_balance': float(user_token.balance)
-            })
-        else:
-            return JsonResponse({
-                'status': 'error',
-                'message': 'Недостаточно токенов'
-            }, status=400)
+        return JsonResponse({
+            'status': 'success',
+            'message': 'Урок успешно куплен',
+            'new_balance': float(new_balance)
+        })
+    except (InsufficientTokens, LessonAlreadyPurchased) as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=400)
     except Exception as e:
         return JsonResponse({
             'status': 'error',
@@ -68,26 +63,51 @@ def purchase_lesson(request, lesson_id):
 
 
 @login_required
+@replica_reads
 def step3_user(request, lesson_id):
-    lesson = get_object_or_404(Lesson, id=lesson_id)
+    lesson = get_object_or_404(Lesson.objects.select_related('topic__course'), id=lesson_id)
 
 
-    is_purchased = PurchasedLesson.objects.filter(
-        user=request.user,
-        lesson=lesson
-    ).exists()
+    is_purchased = get_entitlements(request).has_access(lesson.id)
 
 
-    is_course_editor = (lesson.topic.course.editor == request.user)
+    is_course_editor = (lesson.topic.course.editor_id == request.user.id)
 
 
     if not is_purchased and not is_course_editor:
         return redirect('login', lesson_id=lesson_id)
 
 
-    contents = LessonContent.objects.filter(lesson=lesson).order_by('order')
+    contents = get_lesson_contents(lesson)
 
     return render(request, 'accounts/step3_user.html', {
         'lesson': lesson,
         'contents': contents
-    }) 
\ No newline at end of file
+    }) 
+
+@login_required
+@replica_reads
+def lesson_payload(request, lesson_id):
+    """
+    JSON с блоками урока для плеера и редактора.
+    Отвечает 304, если у клиента актуальная версия (If-None-Match / If-Modified-Since).
+    """
+    lesson = get_object_or_404(Lesson.objects.select_related('topic__course'), id=lesson_id)
+    is_course_editor = (lesson.topic.course.editor_id == request.user.id) or request.user.is_superuser
+    if not is_course_editor and not get_entitlements(request).has_access(lesson.id):
+        return JsonResponse({'success': False, 'error': 'Урок не куплен'}, status=403)
+
+    payload = get_lesson_payload(lesson, include_answers=is_course_editor)
+    response = get_conditional_response(
+        request,
+        etag=payload.etag,
+        last_modified=int(payload.last_modified.timestamp()),
+    )
+    if response is None:
+        response = HttpResponse(payload.body, content_type='application/json')
+    response['ETag'] = payload.etag
+    response['Last-Modified'] = http_date(payload.last_modified.timestamp())
+    # Данные зависят от пользователя: кэшировать можно только в браузере и с ревалидацией
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
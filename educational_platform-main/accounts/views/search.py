@@ -0,0 +1,42 @@
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.urls import reverse
+from ..services.search import search
+from educational_platform.db_router import replica_reads
+
+MAX_SEARCH_RESULTS = 50
+
+
+def _result_url(document):
+    if document.kind == 'course':
+        return reverse('course_detail_user', args=[document.course_id])
+    return reverse('lesson_detail', args=[document.lesson_id])
+
+
+@login_required
+@replica_reads
+def search_api(request):
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = min(int(request.GET.get('limit', 20)), MAX_SEARCH_RESULTS)
+    except ValueError:
+        limit = 20
+    if not query or limit <= 0:
+        return JsonResponse({'query': query, 'results': []})
+
+    # Отдаём только заголовки: текст блоков доступен после покупки урока.
+    # Черновики и неодобренные курсы видят только их редактор и суперпользователь
+    results = [
+        {
+            'kind': document.kind,
+            'title': document.title,
+            'course_id': document.course_id,
+            'course_title': document.course.title,
+            'lesson_id': document.lesson_id,
+            'content_id': document.content_id,
+            'rank': rank,
+            'url': _result_url(document),
+        }
+        for document, rank in search(query, limit, user=request.user)
+    ]
+    return JsonResponse({'query': query, 'results': results})
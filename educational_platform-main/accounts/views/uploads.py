@@ -0,0 +1,114 @@
+import json
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET, require_POST
+from ..decorators import editor_required
+from ..models import ChunkedUpload, Lesson
+from ..services.uploads import (
+    OffsetMismatch,
+    UploadError,
+    append_chunk,
+    complete_upload,
+    discard_upload,
+    init_upload,
+)
+
+
+# --------------------------------------
+# 📦 API загрузки PDF частями
+# --------------------------------------
+# POST api/pdf-upload/                         {lesson_id, file_name, size, sha256?} → upload_id
+# POST api/pdf-upload/<id>/chunk/?offset=N      тело — байты части (application/octet-stream)
+# GET  api/pdf-upload/<id>/                     сколько уже получено — для докачки
+# POST api/pdf-upload/<id>/complete/            {sha256?} → такой же ответ, как у upload_pdf
+# POST api/pdf-upload/<id>/cancel/
+
+def _can_edit_lesson(user, lesson):
+    return user.is_superuser or lesson.topic.course.editor_id == user.id
+
+
+def _get_upload(request, upload_id):
+    return get_object_or_404(ChunkedUpload.objects.select_related('lesson'), id=upload_id, user=request.user)
+
+
+def _upload_state(upload):
+    return {
+        'success': True,
+        'upload_id': str(upload.id),
+        'size': upload.size,
+        'received': upload.received,
+        'chunk_size': settings.CHUNKED_UPLOAD_MAX_CHUNK,
+    }
+
+
+@editor_required
+@require_POST
+def pdf_upload_init(request):
+    try:
+        data = json.loads(request.body)
+        lesson = get_object_or_404(Lesson.objects.select_related('topic__course'), id=data.get('lesson_id'))
+        if not _can_edit_lesson(request.user, lesson):
+            return JsonResponse({'success': False, 'error': 'Недостаточно прав'}, status=403)
+        upload = init_upload(
+            request.user,
+            lesson,
+            str(data.get('file_name', '')),
+            int(data.get('size', 0)),
+            data.get('sha256', ''),
+        )
+    except (json.JSONDecodeError, TypeError, ValueError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    return JsonResponse(_upload_state(upload), status=201)
+
+
+@editor_required
+@require_GET
+def pdf_upload_status(request, upload_id):
+    return JsonResponse(_upload_state(_get_upload(request, upload_id)))
+
+
+@editor_required
+@require_POST
+def pdf_upload_chunk(request, upload_id):
+    """
+    Тело запроса не разбирается как форма: Django не читает его в request.POST,
+    и append_chunk копирует его во временный файл блоками прямо из потока.
+    """
+    upload = _get_upload(request, upload_id)
+    try:
+        offset = int(request.GET.get('offset', ''))
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+        received = append_chunk(upload, offset, request, length, request.headers.get('X-Chunk-SHA256', ''))
+    except OffsetMismatch as e:
+        # Клиент продолжает с received: часть уже была записана или пришла не по порядку
+        return JsonResponse({**_upload_state(e.upload), 'success': False, 'error': str(e)}, status=409)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    return JsonResponse({'success': True, 'received': received})
+
+
+@editor_required
+@require_POST
+def pdf_upload_complete(request, upload_id):
+    upload = _get_upload(request, upload_id)
+    try:
+        data = json.loads(request.body or '{}')
+        content = complete_upload(upload, data.get('sha256', ''))
+    except (json.JSONDecodeError, UploadError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    return JsonResponse({
+        'success': True,
+        'content_id': content.id,
+        'file_url': content.pdf_file.url,
+        'file_name': content.pdf_file.name,
+        'file_size': content.pdf_file.size
+    })
+
+
+@editor_required
+@require_POST
+def pdf_upload_cancel(request, upload_id):
+    discard_upload(_get_upload(request, upload_id))
+    return JsonResponse({'success': True})
@@ -0,0 +1,35 @@
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+import django
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+# --------------------------------------
+# ⏱️ Окружение для бенчмарков
+# --------------------------------------
+# Скрипты из benchmarks/ запускаются напрямую (python benchmarks/<имя>.py)
+# и работают с временной тестовой базой, рабочая база не трогается.
+
+def setup():
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'educational_platform.settings')
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """Тестовая база на время бенчмарка, как у manage.py test."""
+    from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+    setup_test_environment(debug=True)
+    databases = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(databases, verbosity=0)
+        teardown_test_environment()
@@ -0,0 +1,83 @@
+"""
+Сохранение структуры курса: старый подход (удалить все темы и создать
+заново по одной строке) против пакетного upsert из save_course_structure.
+
+    python benchmarks/course_structure.py [--topics 30] [--lessons 10]
+"""
+import argparse
+import time
+
+from _django import setup, test_database
+
+setup()
+
+from django.db import connection, transaction  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+from accounts.models import Course, CourseTopic, CustomUser, Lesson  # noqa: E402
+from accounts.views.courses import _upsert_course_structure  # noqa: E402
+
+
+def legacy_save(course, topics_data):
+    """Прежняя реализация save_course_structure."""
+    CourseTopic.objects.filter(course=course).delete()
+    for topic_data in topics_data:
+        topic = CourseTopic.objects.create(course=course, title=topic_data['title'])
+        for lesson_data in topic_data.get('lessons', []):
+            Lesson.objects.create(topic=topic, title=lesson_data['title'], price_in_tokens=lesson_data['price'])
+
+
+def build_payload(topics, lessons):
+    return [
+        {'title': f'Тема {t}', 'lessons': [{'title': f'Урок {t}.{l}', 'price': 10} for l in range(lessons)]}
+        for t in range(topics)
+    ]
+
+
+def current_payload(course):
+    """То, что отправляет страница step2: текущая структура с id, порядок тем перевёрнут."""
+    topics = CourseTopic.objects.filter(course=course).prefetch_related('lessons')
+    return [
+        {
+            'id': topic.id,
+            'title': topic.title + ' *',
+            'lessons': [
+                {'id': lesson.id, 'title': lesson.title, 'price': lesson.price_in_tokens}
+                for lesson in topic.lessons.all()
+            ],
+        }
+        for topic in reversed(list(topics))
+    ]
+
+
+def measure(save, course, payload):
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        with transaction.atomic():
+            save(course, payload)
+        elapsed = time.perf_counter() - started
+    return len(queries), elapsed * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--topics', type=int, default=30)
+    parser.add_argument('--lessons', type=int, default=10)
+    args = parser.parse_args()
+
+    with test_database():
+        editor = CustomUser.objects.create_user(
+            username='editor', email='editor@example.com', phone='+79000000000', password='x', is_editor=True
+        )
+        payload = build_payload(args.topics, args.lessons)
+        print(f'{args.topics} тем x {args.lessons} уроков, {connection.vendor}')
+        for label, save in (('старый: delete + create', legacy_save), ('новый: bulk upsert', _upsert_course_structure)):
+            course = Course.objects.create(editor=editor, title='Курс', subject='math', tags='', level='easy')
+            first = measure(save, course, payload)
+            resave = measure(save, course, current_payload(course))
+            print(f'{label:26} новый курс: {first[0]:4} запросов {first[1]:7.1f} мс; '
+                  f'повторное сохранение: {resave[0]:4} запросов {resave[1]:7.1f} мс')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Проверка ответов services.grading: время на ответ для каждого типа
+с холодным кэшем (правильный ответ разбирается заново) и с тёплым.
+
+    python benchmarks/grading.py [--answers 10000]
+"""
+import argparse
+import random
+import time
+
+from _django import setup
+
+setup()
+
+from accounts.models import LessonContent  # noqa: E402
+from accounts.services import grading  # noqa: E402
+
+CASES = {
+    'text': ('Фотосинтез', ['фотосинтез', 'Фотосинтез.', 'хемосинтез']),
+    'number': ('3.14 ± 0.01', ['3,14', '3.145', '22/7', '3']),
+    'formula': ('(x+1)^2 - 2y', ['x^2 + 2x + 1 - 2y', '(1+x)(x+1) - y*2', 'x^2 + 1']),
+}
+
+
+def run(answer_type, correct, answers, count, cold):
+    contents = [
+        LessonContent(id=i, content_type='task', task_answer_type=answer_type, task_correct_answer=correct)
+        for i in range(count)
+    ]
+    stream = [random.choice(answers) for _ in range(count)]
+    grading._checker.cache_clear()
+    grading.compile_formula.cache_clear()
+    if not cold:
+        # Один блок на все ответы: разобранный правильный ответ берётся из кэша
+        contents = [contents[0]] * count
+        grading.grade(contents[0], stream[0])
+    started = time.perf_counter()
+    for content, answer in zip(contents, stream):
+        grading.grade(content, answer)
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--answers', type=int, default=10000)
+    args = parser.parse_args()
+    random.seed(1)
+
+    print(f'{args.answers} ответов, мкс на ответ')
+    for answer_type, (correct, answers) in CASES.items():
+        cold = run(answer_type, correct, answers, args.answers, cold=True)
+        warm = run(answer_type, correct, answers, args.answers, cold=False)
+        print(f'{answer_type:8} холодный кэш: {cold:7.1f}   тёплый кэш: {warm:7.1f}')
+
+
+if __name__ == '__main__':
+    main()
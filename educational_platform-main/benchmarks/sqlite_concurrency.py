@@ -0,0 +1,134 @@
+"""
+Конкурентная запись в SQLite с SQLITE_TUNING и без: несколько процессов
+отправляют ответы в api/save-answers/ (по одному ответу за запрос),
+пока другие процессы читают api/lesson/<id>/payload/. База — файл,
+для каждого режима создаётся заново (WAL сохраняется в файле базы).
+
+    python benchmarks/sqlite_concurrency.py [--writers 8] [--readers 4] [--requests 150]
+"""
+import argparse
+import json
+import multiprocessing
+import time
+
+from _django import setup, test_database
+
+setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import OperationalError, connection, connections  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from accounts.models import (  # noqa: E402
+    Course, CourseTopic, CustomUser, Lesson, LessonContent, PurchasedLesson,
+)
+
+BLOCKS = 10
+READS_PER_READER = 300
+
+
+def create_fixture(users):
+    editor = CustomUser.objects.create_user(
+        username='editor', email='editor@example.com', phone='+79000000000', password='password', is_editor=True
+    )
+    course = Course.objects.create(editor=editor, title='Курс', subject='math', tags='', level='easy')
+    topic = CourseTopic.objects.create(course=course, title='Тема', order=0)
+    lesson = Lesson.objects.create(topic=topic, title='Урок', price_in_tokens=1, order=0)
+    blocks = [
+        LessonContent.objects.create(
+            lesson=lesson, content_type='task', task_answer_type='number', task_correct_answer=str(order), order=order
+        )
+        for order in range(BLOCKS)
+    ]
+    user_ids = []
+    for number in range(users):
+        user = CustomUser.objects.create_user(
+            username=f'user{number}', email=f'user{number}@example.com', phone=f'+7900100{number:04d}',
+            password='password',
+        )
+        PurchasedLesson.objects.create(user=user, lesson=lesson)
+        user_ids.append(user.id)
+    return lesson.id, [block.id for block in blocks], user_ids
+
+
+def worker(database, tuning, role, user_id, lesson_id, block_ids, requests, barrier, results):
+    settings.SQLITE_TUNING = tuning
+    connections['default'].settings_dict['NAME'] = database
+    setup_test_environment()
+    client = Client()
+    client.force_login(CustomUser.objects.get(id=user_id))
+    payload_url = reverse('lesson_payload', args=[lesson_id])
+    answers_url = reverse('save_answers_batch')
+
+    barrier.wait()
+    started = time.perf_counter()
+    ok = errors = 0
+    for number in range(requests):
+        try:
+            if role == 'writer':
+                block_id = block_ids[number % len(block_ids)]
+                body = json.dumps({'answers': [{'block_id': block_id, 'answer': str(number % 3)}]})
+                response = client.post(answers_url, body, content_type='application/json')
+            else:
+                response = client.get(payload_url)
+        except OperationalError:
+            # database is locked: писатель не дождался блокировки
+            errors += 1
+            continue
+        if response.status_code == 200:
+            ok += 1
+        else:
+            errors += 1
+    results.put((role, ok, errors, started, time.perf_counter()))
+    connections.close_all()
+
+
+def run(tuning, writers, readers, requests):
+    settings.SQLITE_TUNING = tuning
+    with test_database():
+        lesson_id, block_ids, user_ids = create_fixture(writers + readers)
+        database = connection.settings_dict['NAME']
+        connections.close_all()
+
+        context = multiprocessing.get_context('spawn')
+        barrier = context.Barrier(writers + readers)
+        results = context.Queue()
+        processes = [
+            context.Process(target=worker, args=(
+                database, tuning, 'writer' if number < writers else 'reader', user_id, lesson_id, block_ids,
+                requests if number < writers else READS_PER_READER, barrier, results,
+            ))
+            for number, user_id in enumerate(user_ids)
+        ]
+        for process in processes:
+            process.start()
+        rows = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    # perf_counter в Linux общий для процессов (CLOCK_MONOTONIC)
+    writer_rows = [row for row in rows if row[0] == 'writer']
+    wall = max(row[4] for row in writer_rows) - min(row[3] for row in rows)
+    writes = sum(row[1] for row in writer_rows)
+    errors = sum(row[2] for row in rows)
+    return writes / wall, wall, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=150, help='запросов на процесс-писатель')
+    args = parser.parse_args()
+
+    print(f'{args.writers} писателей × {args.requests} запросов, {args.readers} читателей × {READS_PER_READER}')
+    for tuning in (False, True):
+        rate, wall, errors = run(tuning, args.writers, args.readers, args.requests)
+        label = 'SQLITE_TUNING=True ' if tuning else 'SQLITE_TUNING=False'
+        print(f'{label}  записей/с: {rate:6.1f}   время: {wall:5.1f} с   ошибок: {errors}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+# --------------------------------------
+# 🗃️ Основная база и реплика для чтения
+# --------------------------------------
+# Запись всегда идёт в default. Чтение уходит в реплику только внутри
+# представлений, помеченных @replica_reads (каталог, структура курса,
+# плеер урока, история), и только если реплика настроена.
+# Данные, которые кладутся в кэш или проверяются перед записью
+# (купленные уроки, баланс), читаются из основной базы через primary_reads():
+# иначе отставание реплики попадёт в кэш на всё время его жизни.
+
+PRIMARY_DB = 'default'
+REPLICA_DB = 'replica'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_available():
+    return REPLICA_DB in settings.DATABASES
+
+
+def replica_reads(view_func):
+    """Декоратор для представлений, которые только читают."""
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        token = _replica_reads.set(True)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+    return _wrapped_view
+
+
+@contextmanager
+def primary_reads():
+    """Временно читать из основной базы даже внутри @replica_reads."""
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and replica_available():
+            return REPLICA_DB
+        return PRIMARY_DB
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика — копия основной базы, объекты из обеих можно связывать
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схему реплики меняет репликация, а не migrate
+        return db == PRIMARY_DB
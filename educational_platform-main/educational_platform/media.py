@@ -0,0 +1,183 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied, SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from accounts.services.entitlements import get_entitlements
+from accounts.services.media import media_lessons
+
+# --------------------------------------
+# 🎞️ Отдача медиафайлов
+# --------------------------------------
+# Работает и при DEBUG=False. Поддерживает:
+# - ETag / Last-Modified и ответ 304 на If-None-Match / If-Modified-Since;
+# - Range: одиночный диапазон (перемотка видео, постраничная загрузка PDF);
+#   несколько диапазонов не поддерживаются — тогда отдаётся весь файл, как разрешает RFC 9110;
+# - передачу PDF и видео фронтовому серверу (MEDIA_SENDFILE): Django только
+#   проверяет путь и ставит заголовки, а файл и диапазоны отдаёт nginx/Apache.
+#
+# Файлы уроков (PDF, картинки заданий, превью PDF) отдаются только тем, кто
+# видит урок в плеере: купившим его, редактору курса и суперпользователю —
+# как lesson_payload. Кэшируются они только в браузере (private).
+# Публичны только копии картинок и аватары.
+
+# Имена в этих каталогах зависят от содержимого файла: файл по имени не меняется
+IMMUTABLE_PREFIXES = ('blobs/', 'renditions/', 'pdf_previews/')
+PUBLIC_PREFIXES = ('renditions/', 'avatars/')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+def _etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _cache_control(path):
+    scope = 'public' if path.startswith(PUBLIC_PREFIXES) else 'private'
+    if path.startswith(IMMUTABLE_PREFIXES):
+        return f'{scope}, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return f'{scope}, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+
+
+def _has_access(request, path):
+    if path.startswith(PUBLIC_PREFIXES):
+        return True
+    user = request.user
+    if not user.is_authenticated:
+        return False
+    if user.is_superuser:
+        return True
+    lessons = media_lessons(path)
+    if not lessons:
+        # Файл ещё не сохранён в блоке (только что загружен в редакторе) или уже ничей
+        return user.is_editor
+    entitlements = get_entitlements(request)
+    return any(editor_id == user.id or entitlements.has_access(lesson_id) for lesson_id, editor_id in lessons)
+
+
+def _parse_range(header, size):
+    """(start, end) включительно, None — отдать весь файл, False — диапазон вне файла."""
+    match = RANGE_PATTERN.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        # bytes=-500: последние 500 байт
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _if_range_matches(request, etag, mtime):
+    """If-Range: диапазон действует, только если файл не изменился с тех пор."""
+    value = request.headers.get('If-Range')
+    if not value:
+        return True
+    if value.startswith(('"', 'W/')):
+        return value == etag
+    if_range_time = parse_http_date_safe(value)
+    return if_range_time is not None and int(mtime) <= if_range_time
+
+
+def _iter_range(file, start, length):
+    try:
+        file.seek(start)
+        while length > 0:
+            block = file.read(min(STREAM_BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+    finally:
+        file.close()
+
+
+def _offload_response(path, content_type):
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        # nginx: location /protected-media/ { internal; alias <MEDIA_ROOT>/; }
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path)
+    else:
+        response['X-Sendfile'] = os.path.join(settings.MEDIA_ROOT, path)
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    # Проверяем нормализованное имя: renditions/../blobs/... — это файл из blobs/
+    path = os.path.relpath(full_path, os.path.abspath(settings.MEDIA_ROOT)).replace(os.sep, '/')
+    if not _has_access(request, path):
+        raise PermissionDenied
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    etag = _etag(stat)
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        response = _file_response(request, path, full_path, stat, etag)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = _cache_control(path)
+    response['Accept-Ranges'] = 'bytes'
+    if not path.startswith(PUBLIC_PREFIXES):
+        patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def _file_response(request, path, full_path, stat, etag):
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    size = stat.st_size
+
+    if settings.MEDIA_SENDFILE and os.path.splitext(path)[1].lower() in settings.MEDIA_SENDFILE_EXTENSIONS:
+        return _offload_response(path, content_type)
+
+    byte_range = None
+    if 'Range' in request.headers and _if_range_matches(request, etag, stat.st_mtime):
+        byte_range = _parse_range(request.headers['Range'], size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+        response['Content-Length'] = str(size)
+    elif byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _iter_range(open(full_path, 'rb'), start, end - start + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    else:
+        # FileResponse отдаёт файл через wsgi.file_wrapper (sendfile), если сервер его поддерживает
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
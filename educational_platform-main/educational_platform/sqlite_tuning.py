@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# --------------------------------------
+# ⚙️ Настройка SQLite для установок на одном сервере
+# --------------------------------------
+# Включается SQLITE_TUNING=True. WAL позволяет читать, пока идёт запись,
+# synchronous=NORMAL в режиме WAL не теряет целостность при сбое процесса,
+# busy_timeout заставляет писателей ждать блокировку, а не падать сразу.
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not settings.SQLITE_TUNING:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT)}')
+        cursor.execute(f'PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}')
+        # Отрицательное значение — размер кэша в КиБ, а не в страницах
+        cursor.execute(f'PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}')
+        cursor.execute('PRAGMA temp_store=MEMORY')
@@ -0,0 +1,20 @@
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+# --------------------------------------
+# 🧱 Статика через Whitenoise
+# --------------------------------------
+# Файлы из STATIC_ROOT (после collectstatic) отдаются прямо из middleware,
+# минуя URL-маршруты и представления. Хэшированные имена из манифеста
+# Whitenoise отдаёт с Cache-Control: max-age=315360000, immutable,
+# остальные — с WHITENOISE_MAX_AGE. Сжатые .gz/.br версии готовит collectstatic.
+
+CUSTOM_IMAGES_ROOT = settings.BASE_DIR / 'custom_images'
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """Whitenoise, который отдаёт ещё и /custom_images/ (картинки главной страницы вне static/)."""
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        self.add_files(CUSTOM_IMAGES_ROOT, prefix='custom_images/')
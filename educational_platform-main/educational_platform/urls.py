@@ -17,18 +17,13 @@ Including another URLconf
 # educational_platform/urls.py
 from django.contrib import admin
 from django.conf import settings
-from django.conf.urls.static import static
 from django.urls import path, include
-from django.views.static import serve
-
-CUSTOM_IMAGES_ROOT = settings.BASE_DIR / 'custom_images'
+from .media import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('accounts.urls')),
-    path('custom_images/<path:path>', serve, {'document_root': CUSTOM_IMAGES_ROOT}),
+    # /custom_images/ и /static/ отдаёт Whitenoise (educational_platform/static_files.py)
+    path(f'{settings.MEDIA_URL.lstrip("/")}<path:path>', serve_media, name='media'),
     # Теперь все маршруты приложения accounts снова без префикса /accounts/
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file